@@ -1,7 +1,10 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from typing import Dict, Any
 from ..services.interview_service import InterviewService
+from ..services.call_policy import LLMCallError, retry_after_header
 from ..models.schemas import JobType
+from ..utils.sse import sse_stream, SSE_HEADERS
 
 router = APIRouter(prefix="/interview", tags=["模拟面试"])
 interview_service = InterviewService()
@@ -13,7 +16,7 @@ async def create_interview_session(job_type: JobType, user_background: str):
     创建新的面试会话
     """
     try:
-        session = interview_service.create_interview_session(job_type, user_background)
+        session = await interview_service.create_interview_session(job_type, user_background)
         return {
             "session_id": session.session_id,
             "job_type": session.job_type.value,
@@ -21,6 +24,8 @@ async def create_interview_session(job_type: JobType, user_background: str):
             "start_time": session.start_time.isoformat(),
             "message": "面试会话创建成功"
         }
+    except LLMCallError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": retry_after_header(e)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"创建面试会话失败: {str(e)}")
 
@@ -54,7 +59,7 @@ async def submit_answer(session_id: str, answer: str):
     提交面试回答
     """
     try:
-        result = interview_service.submit_answer(session_id, answer)
+        result = await interview_service.submit_answer(session_id, answer)
         
         if not result["success"]:
             raise HTTPException(status_code=400, detail=result["error"])
@@ -72,7 +77,7 @@ async def evaluate_interview(session_id: str):
     评估面试表现
     """
     try:
-        evaluation = interview_service.evaluate_interview(session_id)
+        evaluation = await interview_service.evaluate_interview(session_id)
         
         if "error" in evaluation:
             raise HTTPException(status_code=400, detail=evaluation["error"])
@@ -80,10 +85,30 @@ async def evaluate_interview(session_id: str):
         return evaluation
     except HTTPException:
         raise
+    except LLMCallError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": retry_after_header(e)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"评估面试失败: {str(e)}")
 
 
+@router.post("/session/{session_id}/evaluate/stream")
+async def evaluate_interview_stream(session_id: str):
+    """
+    流式评估面试表现（Server-Sent Events）
+
+    事件：evaluation（单题评估，按完成顺序）、result（汇总结果）、error（模型服务不可用时含retry_after）
+    """
+    summary = interview_service.get_session_summary(session_id)
+    if "error" in summary:
+        raise HTTPException(status_code=404, detail=summary["error"])
+    
+    return StreamingResponse(
+        sse_stream(interview_service.evaluate_interview_stream(session_id)),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
 @router.get("/session/{session_id}/summary")
 async def get_session_summary(session_id: str):
     """
@@ -121,17 +146,10 @@ async def get_session_questions(session_id: str):
     获取面试会话的所有问题
     """
     try:
-        summary = interview_service.get_session_summary(session_id)
-        
-        if "error" in summary:
-            raise HTTPException(status_code=404, detail=summary["error"])
-        
-        # 获取会话数据
-        session_data = interview_service.active_sessions.get(session_id)
-        if not session_data:
+        session = interview_service.get_session(session_id)
+        if not session:
             raise HTTPException(status_code=404, detail="会话不存在")
         
-        session = session_data['session']
         questions = []
         
         for i, question in enumerate(session.questions):
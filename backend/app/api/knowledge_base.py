@@ -0,0 +1,32 @@
+from fastapi import APIRouter, HTTPException
+from ..services.knowledge_base_service import KnowledgeBaseService, KnowledgeBaseSyncInProgressError
+from ..services.call_policy import LLMCallError, retry_after_header
+
+router = APIRouter(prefix="/knowledge-base", tags=["知识库"])
+knowledge_base_service = KnowledgeBaseService()
+
+
+@router.post("/sync")
+async def sync_knowledge_base(verify_hashes: bool = False):
+    """
+    增量同步知识库目录到向量库
+    """
+    try:
+        return await knowledge_base_service.sync(verify_hashes=verify_hashes)
+    except KnowledgeBaseSyncInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except LLMCallError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": retry_after_header(e)})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"知识库同步失败: {str(e)}")
+
+
+@router.get("/stats")
+async def get_knowledge_base_stats():
+    """
+    获取知识库统计信息
+    """
+    try:
+        return knowledge_base_service.get_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取知识库统计失败: {str(e)}")
@@ -1,27 +1,103 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi.responses import StreamingResponse
 from typing import Optional
 import os
-import aiofiles
+from ..utils.upload import save_upload, UploadTooLargeError
 from ..services.resume_service import ResumeService
-from ..models.schemas import ResumeAnalysisRequest, ResumeAnalysisResponse
+from ..services.parse_executor import parse_executor, ParseQueueFullError
+from ..services.call_policy import LLMCallError, retry_after_header
+from ..services.ranking_service import RankingService
+from ..utils.sse import sse_stream, SSE_HEADERS
+from ..models.schemas import (
+    AnalysisMode, ResumeAnalysisRequest, ResumeAnalysisResponse, ResumeRankRequest, ResumeRankResponse
+)
 from ..core.config import settings
+from ..core.tracing import span
 
 router = APIRouter(prefix="/resume", tags=["简历分析"])
 resume_service = ResumeService()
+ranking_service = RankingService(resume_service)
+
+
+async def _resolve_resume_text(request: ResumeAnalysisRequest, filename: Optional[str],
+                               digest: Optional[str]) -> ResumeAnalysisRequest:
+    """通过已上传文件名或内容摘要引用简历时，从解析缓存读取简历文本"""
+    if digest:
+        parsed = resume_service.get_cached_document(digest)
+        if parsed is None:
+            raise HTTPException(status_code=404, detail="未找到该摘要对应的解析结果")
+    elif filename:
+        file_path = os.path.join(settings.uploads_path, os.path.basename(filename))
+        if not os.path.exists(file_path):
+            raise HTTPException(status_code=404, detail="文件不存在")
+        try:
+            parsed = await resume_service.get_parsed_document(file_path)
+        except ParseQueueFullError as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+        if not parsed["success"]:
+            raise HTTPException(status_code=400, detail=parsed["error"])
+    elif not request.resume_text.strip():
+        raise HTTPException(status_code=400, detail="请提供简历文本、文件名或摘要")
+    else:
+        return request
+    
+    request.resume_text = parsed["full_text"]
+    return request
 
 
 @router.post("/analyze", response_model=ResumeAnalysisResponse)
-async def analyze_resume(request: ResumeAnalysisRequest):
+async def analyze_resume(request: ResumeAnalysisRequest, fresh: bool = False,
+                         filename: Optional[str] = None, digest: Optional[str] = None,
+                         mode: AnalysisMode = AnalysisMode.FULL):
     """
     分析简历与岗位的匹配度
+
+    fresh=true 时跳过缓存，强制重新调用模型；
+    提供filename（已上传文件名）或digest（上传返回的sha256）时使用已解析的简历文本；
+    mode=fast 时只用本地信号计算总体评分、章节评分和关键词，不调用对话模型
     """
+    request = await _resolve_resume_text(request, filename, digest)
     try:
-        result = resume_service.analyze_resume(request)
+        if mode == AnalysisMode.FAST:
+            return await resume_service.analyze_resume_fast(request)
+        result = await resume_service.analyze_resume(request, use_cache=not fresh)
         return result
+    except LLMCallError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": retry_after_header(e)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/analyze/stream")
+async def analyze_resume_stream(request: ResumeAnalysisRequest, fresh: bool = False,
+                                filename: Optional[str] = None, digest: Optional[str] = None):
+    """
+    流式分析简历与岗位的匹配度（Server-Sent Events）
+
+    事件：token（模型输出片段）、partial（已解析出的字段）、result（最终ResumeAnalysisResponse）、
+    error（模型服务不可用，含retry_after）
+    """
+    request = await _resolve_resume_text(request, filename, digest)
+    return StreamingResponse(
+        sse_stream(resume_service.analyze_resume_stream(request, use_cache=not fresh)),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+@router.post("/rank", response_model=ResumeRankResponse)
+async def rank_resumes(request: ResumeRankRequest):
+    """
+    按岗位描述对所有已上传简历排序
+
+    先用本地向量相似度和技能BM25评分为全部简历打分，再对前deep_analysis名调用模型深度分析
+    """
+    try:
+        return await ranking_service.rank(request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"简历排序失败: {str(e)}")
+
+
 @router.post("/upload")
 async def upload_resume(file: UploadFile = File(...)):
     """
@@ -38,16 +114,25 @@ async def upload_resume(file: UploadFile = File(...)):
                 detail=f"不支持的文件格式。支持格式: {', '.join(allowed_extensions)}"
             )
         
-        # 保存文件
-        upload_path = os.path.join(settings.uploads_path, file.filename)
-        os.makedirs(settings.uploads_path, exist_ok=True)
+        # 分块保存文件，超过大小限制立即中止
+        upload_path = os.path.join(settings.uploads_path, os.path.basename(file.filename))
+        try:
+            with span("upload"):
+                saved = await save_upload(
+                    file,
+                    upload_path,
+                    max_bytes=settings.upload_max_bytes,
+                    chunk_size=settings.upload_chunk_size,
+                    keep_bytes=settings.upload_inline_parse_bytes
+                )
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
         
-        async with aiofiles.open(upload_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
-        
-        # 处理文件
-        result = resume_service.process_uploaded_file(upload_path)
+        # 读取解析缓存，未命中时在解析执行器中处理，小文件直接解析内存中的内容
+        try:
+            result = await resume_service.get_parsed_document(saved.path, saved.content, saved.sha256)
+        except ParseQueueFullError as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
         
         if not result["success"]:
             raise HTTPException(status_code=400, detail=result["error"])
@@ -55,6 +140,7 @@ async def upload_resume(file: UploadFile = File(...)):
         return {
             "filename": file.filename,
             "file_size": result["file_size"],
+            "sha256": saved.sha256,
             "sections": result["sections"],
             "message": "文件上传成功"
         }
@@ -71,17 +157,21 @@ async def get_resume_summary(filename: str):
     获取简历摘要信息
     """
     try:
-        file_path = os.path.join(settings.uploads_path, filename)
+        file_path = os.path.join(settings.uploads_path, os.path.basename(filename))
         
         if not os.path.exists(file_path):
             raise HTTPException(status_code=404, detail="文件不存在")
         
-        # 读取文件内容
-        async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
-            content = await f.read()
+        # 读取解析结果（同一内容只解析一次）
+        try:
+            parsed = await resume_service.get_parsed_document(file_path)
+        except ParseQueueFullError as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+        if not parsed["success"]:
+            raise HTTPException(status_code=400, detail=parsed["error"])
         
         # 获取摘要
-        summary = resume_service.get_resume_summary(content)
+        summary = resume_service.get_resume_summary(parsed["full_text"], parsed["sections"])
         
         if "error" in summary:
             raise HTTPException(status_code=400, detail=summary["error"])
@@ -109,6 +199,14 @@ async def get_improvement_suggestions(resume_text: str, target_job: str):
         raise HTTPException(status_code=500, detail=f"获取建议失败: {str(e)}")
 
 
+@router.get("/parser-stats")
+async def get_parser_stats():
+    """
+    获取文档解析执行器统计（队列深度、等待时间、解析耗时）
+    """
+    return parse_executor.stats()
+
+
 @router.get("/supported-formats")
 async def get_supported_formats():
     """
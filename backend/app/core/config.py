@@ -1,5 +1,5 @@
 import os
-from typing import Optional
+from typing import Dict, Optional
 from pydantic import BaseSettings
 
 
@@ -16,12 +16,105 @@ class Settings(BaseSettings):
     openai_api_key: str
     openai_model: str = "gpt-3.5-turbo"
     openai_embedding_model: str = "text-embedding-ada-002"
+    # 兼容OpenAI接口的服务地址（如压测用的本地桩服务 http://127.0.0.1:9000/v1），为空时使用官方地址
+    openai_base_url: Optional[str] = None
+    
+    # LLM连接池配置
+    llm_max_connections: int = 200
+    llm_max_keepalive_connections: int = 50
+    llm_keepalive_expiry: float = 30.0
+    llm_connect_timeout: float = 5.0
+    llm_timeout: float = 60.0
+    
+    # 模型调用策略：截止时间（秒，含重试与退避；流式调用指收到响应头之前），未单独配置的调用类型使用llm_deadline
+    llm_deadline: float = 60.0
+    llm_operation_deadlines: Dict[str, float] = {
+        "analyze_resume": 45.0,
+        "analyze_resume_stream": 20.0,
+        "generate_interview_questions": 30.0,
+        "personalize_interview_questions": 20.0,
+        "evaluate_interview_answer": 30.0,
+        "embedding": 15.0
+    }
+    # 可重试错误（超时、连接错误、429、5xx）的重试次数与带抖动的指数退避（秒），openai客户端自身不再重试
+    llm_max_retries: int = 2
+    llm_retry_base_delay: float = 0.5
+    llm_retry_max_delay: float = 8.0
+    # 对冲请求：单次请求超过该调用类型近期延迟的百分位仍未返回时再发一个相同请求（会增加上游调用量）
+    llm_hedge_enabled: bool = False
+    llm_hedge_percentile: float = 95.0
+    llm_hedge_min_delay: float = 0.5
+    llm_hedge_min_samples: int = 20
+    # 熔断：连续失败的调用数（重试不重复计数）达到阈值后暂停调用reset_timeout秒（0为不熔断）
+    llm_breaker_failure_threshold: int = 5
+    llm_breaker_reset_timeout: float = 30.0
+    
+    # 合并相同的并发模型调用（同一worker内共享一次调用；设置锁文件后跨worker等待并复用响应缓存）
+    llm_coalesce_enabled: bool = True
+    llm_coalesce_lock_path: Optional[str] = None
     
     # 数据库路径配置
     vector_db_path: str = "./data/vector_db"
     knowledge_base_path: str = "./data/knowledge_base"
     uploads_path: str = "./data/uploads"
     
+    # 上传配置（不超过upload_inline_parse_bytes的文件直接从内存解析）
+    upload_max_bytes: int = 10 * 1024 * 1024
+    upload_chunk_size: int = 64 * 1024
+    upload_inline_parse_bytes: int = 1024 * 1024
+    
+    # 文档解析执行器配置（thread 或 process；排队任务超过队列长度时返回503）
+    parse_executor_mode: str = "thread"
+    parse_executor_workers: int = 4
+    parse_executor_queue_size: int = 32
+    
+    # 解析结果缓存配置（按文件内容SHA-256缓存）
+    parse_cache_enabled: bool = True
+    parse_cache_path: str = "./data/cache/parsed"
+    parse_cache_memory_items: int = 256
+    
+    # 简历排序配置（本地评分 = 向量相似度 * ranking_embedding_weight + 技能BM25评分 * 其余权重）
+    ranking_embedding_weight: float = 0.6
+    ranking_embed_max_tokens: int = 2000
+    ranking_llm_concurrency: int = 4
+    ranking_jd_cache_items: int = 128
+    
+    # 快速评分配置（综合评分 = 向量相似度 * fast_score_embedding_weight
+    # + 关键词覆盖率 * fast_score_keyword_weight + 章节完整度 * 其余权重）
+    fast_score_embedding_weight: float = 0.4
+    fast_score_keyword_weight: float = 0.4
+    # 缓存未命中时等待向量化的秒数，超时后忽略相似度，向量化在后台完成并写入缓存
+    fast_score_embed_timeout: float = 0.05
+    
+    # 会话存储配置（memory: 单进程内存；sqlite: 多worker共享）
+    session_store_backend: str = "memory"
+    session_store_path: str = "./data/sessions.sqlite3"
+    session_store_flush_interval: float = 0.002
+    # 会话超过该秒数未更新即过期，写入时顺带清理；0表示永不过期
+    session_ttl: int = 604800
+    
+    # 面试题池配置（按岗位类型预生成题目，低于低水位时后台补充到高水位）
+    # 岗位类型首次被请求时才开始补充，每个worker每个用到的岗位类型至多生成high_watermark套
+    question_pool_enabled: bool = True
+    question_pool_low_watermark: int = 2
+    question_pool_high_watermark: int = 5
+    question_pool_refill_concurrency: int = 2
+    question_pool_personalize: bool = True
+    
+    # 运行指标配置（各worker的计数写入metrics_path下的共享文件，/metrics 汇总全部worker）
+    metrics_enabled: bool = True
+    metrics_path: str = "./data/metrics"
+    
+    # 请求阶段耗时（Server-Timing响应头；trace_log_path非空时把每个请求的阶段以JSON行写入该文件）
+    server_timing_enabled: bool = True
+    trace_log_path: Optional[str] = None
+    trace_log_min_duration_ms: float = 0.0
+    
+    # 采样剖析（仅在设置profiling_token时启用；请求头X-Profile-Token与之一致时剖析该请求并返回折叠栈）
+    profiling_token: Optional[str] = None
+    profiling_interval_ms: float = 5.0
+    profiling_max_seconds: float = 120.0
+    
     # 服务配置
     backend_host: str = "0.0.0.0"
     backend_port: int = 8000
@@ -31,6 +124,28 @@ class Settings(BaseSettings):
     chunk_size: int = 512
     chunk_overlap: int = 50
     top_k_retrieval: int = 5
+    prompt_token_budget: int = 6000
+    prompt_context_share: float = 0.3
+    embedding_batch_size: int = 256
+    vector_db_compact_ratio: float = 0.3
+    
+    # PDF解析配置（pdf_process_workers > 1 时页数较多的PDF使用进程池并行提取）
+    pdf_max_pages: int = 200
+    pdf_max_text_bytes: int = 2 * 1024 * 1024
+    pdf_parallel_min_pages: int = 16
+    pdf_process_workers: int = 0
+    
+    # 向量缓存配置
+    embedding_cache_enabled: bool = True
+    embedding_cache_path: str = "./data/cache/embeddings.sqlite3"
+    embedding_cache_memory_items: int = 10000
+    
+    # LLM响应缓存配置
+    response_cache_enabled: bool = True
+    response_cache_path: str = "./data/cache/responses.sqlite3"
+    response_cache_ttl: int = 86400
+    response_cache_memory_bytes: int = 32 * 1024 * 1024
+    response_cache_disk_bytes: int = 512 * 1024 * 1024
     
     # 安全配置
     secret_key: str = "your-secret-key-change-in-production"
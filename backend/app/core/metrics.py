@@ -0,0 +1,598 @@
+"""
+Prometheus文本格式的运行指标
+
+所有指标及其标签组合在导入时预先声明，每个标签组合对应连续float64数组中的固定槽位。
+热路径上记录一次指标只是对槽位做加法：不分配标签对象，也不加锁——
+所有写入都发生在事件循环线程（解析耗时由执行器返回后在事件循环中记录）。
+
+多worker部署时，每个进程调用 open() 把槽位映射到 metrics_path 下以pid命名的文件，
+/metrics 读取目录中全部文件按槽位求和，因此由哪个worker响应抓取都能得到全局指标。
+已退出进程的文件在下次 open() 时合并进归档文件，计数不会因worker重启而丢失；
+布局（指标定义）变化后旧文件不再参与汇总。
+"""
+import os
+import glob
+import mmap
+import time
+import struct
+import hashlib
+import inspect
+import logging
+import functools
+import itertools
+from array import array
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # 非POSIX平台只支持单进程
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("<8sQ")
+_MAGIC = b"METRICS1"
+_ARCHIVE_NAME = "metrics-archive.db"
+
+# 桶边界（秒）
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+PARSE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _format_value(value: float) -> str:
+    if value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class CounterChild:
+    """单个标签组合的计数器"""
+    __slots__ = ("_registry", "_slot", "labels")
+
+    def __init__(self, registry: "MetricsRegistry", slot: int, labels: str):
+        self._registry = registry
+        self._slot = slot
+        self.labels = labels
+
+    def inc(self, amount: float = 1.0):
+        self._registry.values[self._slot] += amount
+
+    def get(self) -> float:
+        """当前进程内的计数"""
+        return self._registry.values[self._slot]
+
+
+class HistogramChild:
+    """单个标签组合的直方图，槽位依次为各桶计数（含+Inf）和观测值总和"""
+    __slots__ = ("_registry", "_slot", "_bounds", "_sum_slot", "labels")
+
+    def __init__(self, registry: "MetricsRegistry", slot: int, bounds: Tuple[float, ...], labels: str):
+        self._registry = registry
+        self._slot = slot
+        self._bounds = bounds
+        self._sum_slot = slot + len(bounds) + 1
+        self.labels = labels
+
+    def observe(self, value: float):
+        values = self._registry.values
+        values[self._slot + bisect_left(self._bounds, value)] += 1.0
+        values[self._sum_slot] += value
+
+    def count(self) -> float:
+        """当前进程内的观测次数"""
+        values = self._registry.values
+        return sum(values[self._slot:self._sum_slot])
+
+
+class _Metric:
+    """指标族：一个指标名下预先声明的全部标签组合"""
+    kind = ""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str,
+                 labelnames: Sequence[str], label_values: Optional[Iterable[Sequence[str]]]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        if label_values is None:
+            if self.labelnames:
+                raise ValueError(f"指标 {name} 有标签时必须预先声明标签取值")
+            label_values = [()]
+        self._children: Dict[LabelValues, Any] = {}
+        for values in label_values:
+            values = tuple(str(value) for value in values)
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"指标 {name} 的标签取值 {values} 与标签名 {self.labelnames} 不一致")
+            labels = _format_labels(self.labelnames, values)
+            self._children[values] = self._make_child(registry, labels)
+
+    def _make_child(self, registry: "MetricsRegistry", labels: str):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """取预先声明的标签组合，热路径上应在初始化时取出并保存"""
+        try:
+            return self._children[values]
+        except KeyError:
+            raise ValueError(f"指标 {self.name} 未声明标签组合 {values}") from None
+
+    def layout(self) -> str:
+        return f"{self.kind}:{self.name}:{self.labelnames}:{list(self._children)}"
+
+    def render(self, values: np.ndarray, lines: List[str]):
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _make_child(self, registry, labels):
+        return CounterChild(registry, registry.allocate(1), labels)
+
+    def render(self, values, lines):
+        for child in self._children.values():
+            selector = f"{{{child.labels}}}" if child.labels else ""
+            lines.append(f"{self.name}{selector} {_format_value(float(values[child._slot]))}")
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, registry, name, documentation, buckets: Sequence[float],
+                 labelnames=(), label_values=None):
+        self.bounds = tuple(float(bound) for bound in sorted(buckets))
+        super().__init__(registry, name, documentation, labelnames, label_values)
+
+    def _make_child(self, registry, labels):
+        return HistogramChild(registry, registry.allocate(len(self.bounds) + 2), self.bounds, labels)
+
+    def layout(self) -> str:
+        return super().layout() + f":{self.bounds}"
+
+    def render(self, values, lines):
+        bound_labels = [_format_value(bound) for bound in self.bounds] + ["+Inf"]
+        for child in self._children.values():
+            prefix = f"{child.labels}," if child.labels else ""
+            selector = f"{{{child.labels}}}" if child.labels else ""
+            buckets = np.cumsum(values[child._slot:child._sum_slot])
+            for bound, cumulative in zip(bound_labels, buckets):
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {_format_value(float(cumulative))}')
+            lines.append(f"{self.name}_sum{selector} {_format_value(float(values[child._sum_slot]))}")
+            lines.append(f"{self.name}_count{selector} {_format_value(float(buckets[-1]))}")
+
+
+GaugeCallback = Callable[[np.ndarray], Iterable[Tuple[Sequence[str], float]]]
+
+
+class _CallbackGauge:
+    """抓取时计算的仪表，不占用槽位（如会话数、由计数器推导的命中率）"""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], callback: GaugeCallback):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def layout(self) -> str:
+        return f"{self.kind}:{self.name}:{self.labelnames}"
+
+    def render(self, values, lines):
+        try:
+            samples = list(self.callback(values))
+        except Exception as e:
+            logger.warning(f"计算指标 {self.name} 失败: {str(e)}")
+            return
+        for label_values, value in samples:
+            labels = _format_labels(self.labelnames, label_values)
+            selector = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}{selector} {_format_value(float(value))}")
+
+
+class MetricsRegistry:
+    """
+    指标注册表
+
+    open() 之前槽位保存在进程内数组中（单进程或测试时直接使用）；
+    open() 之后映射到共享目录中的本进程文件，此后不能再声明新指标。
+    """
+
+    def __init__(self):
+        self._metrics: List[Any] = []
+        self._names = set()
+        self.values: Any = array("d")
+        self.directory: Optional[str] = None
+        self._mmap: Optional[mmap.mmap] = None
+        os.register_at_fork(after_in_child=self._detach)
+
+    # ---- 声明 ----
+
+    def allocate(self, size: int) -> int:
+        """为新的标签组合分配连续槽位，返回起始位置"""
+        if self._mmap is not None:
+            raise RuntimeError("指标已映射到共享文件，不能再声明新指标")
+        start = len(self.values)
+        self.values.extend([0.0] * size)
+        return start
+
+    def _register(self, metric):
+        if metric.name in self._names:
+            raise ValueError(f"指标 {metric.name} 已存在")
+        self._names.add(metric.name)
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                label_values: Optional[Iterable[Sequence[str]]] = None) -> Counter:
+        return self._register(Counter(self, name, documentation, labelnames, label_values))
+
+    def histogram(self, name: str, documentation: str, buckets: Sequence[float],
+                  labelnames: Sequence[str] = (),
+                  label_values: Optional[Iterable[Sequence[str]]] = None) -> Histogram:
+        return self._register(Histogram(self, name, documentation, buckets, labelnames, label_values))
+
+    def gauge_callback(self, name: str, documentation: str, labelnames: Sequence[str],
+                       callback: GaugeCallback) -> _CallbackGauge:
+        """
+        注册抓取时计算的仪表
+
+        callback接收汇总后的槽位数组，返回 [(标签取值, 数值), ...]
+        """
+        return self._register(_CallbackGauge(name, documentation, labelnames, callback))
+
+    def layout_hash(self) -> int:
+        digest = hashlib.sha1()
+        for metric in self._metrics:
+            digest.update(metric.layout().encode("utf-8"))
+        digest.update(str(len(self.values)).encode())
+        return int.from_bytes(digest.digest()[:8], "little")
+
+    # ---- 多进程共享 ----
+
+    @contextmanager
+    def _locked(self, directory: str, exclusive: bool):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(directory, ".lock"), "a+") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_file(self, path: str, layout_hash: int) -> Optional[np.ndarray]:
+        """读取一个进程的槽位文件，布局不一致或文件不完整时返回None"""
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+        except OSError:
+            return None
+        if len(raw) != _HEADER.size + 8 * len(self.values):
+            return None
+        magic, file_hash = _HEADER.unpack_from(raw)
+        if magic != _MAGIC or file_hash != layout_hash:
+            return None
+        return np.frombuffer(raw, dtype=np.float64, offset=_HEADER.size)
+
+    def _archive_dead(self, directory: str, layout_hash: int):
+        """把已退出进程的文件合并进归档文件，布局不一致的旧文件直接删除"""
+        archive_path = os.path.join(directory, _ARCHIVE_NAME)
+        merged = None
+        for path in glob.glob(os.path.join(directory, "metrics-*.db")):
+            if path == archive_path:
+                continue
+            try:
+                pid = int(os.path.basename(path)[len("metrics-"):-len(".db")])
+            except ValueError:
+                continue
+            if pid == os.getpid() or _pid_alive(pid):
+                continue
+            data = self._read_file(path, layout_hash)
+            if data is not None:
+                merged = data.copy() if merged is None else merged + data
+            os.remove(path)
+
+        if merged is None:
+            return
+        archived = self._read_file(archive_path, layout_hash)
+        if archived is not None:
+            merged += archived
+        tmp_path = f"{archive_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, layout_hash))
+            f.write(merged.tobytes())
+        os.replace(tmp_path, archive_path)
+
+    def open(self, directory: str):
+        """把本进程的槽位映射到共享目录中的文件（每个worker启动时调用一次）"""
+        if self._mmap is not None:
+            return
+        os.makedirs(directory, exist_ok=True)
+        layout_hash = self.layout_hash()
+        with self._locked(directory, exclusive=True):
+            self._archive_dead(directory, layout_hash)
+
+        path = os.path.join(directory, f"metrics-{os.getpid()}.db")
+        size = _HEADER.size + 8 * len(self.values)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(fd, size)
+            mapped = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        mapped[:_HEADER.size] = _HEADER.pack(_MAGIC, layout_hash)
+        view = memoryview(mapped)[_HEADER.size:].cast("d")
+        view[:] = self.values
+        self._mmap = mapped
+        self.values = view
+        self.directory = directory
+        logger.info(f"指标文件: {path}")
+
+    def close(self):
+        """解除映射，计数保留在文件中，由后续启动的进程归档"""
+        if self._mmap is None:
+            return
+        values = array("d", self.values)
+        self.values.release()
+        self.values = values
+        self._mmap.close()
+        self._mmap = None
+        self.directory = None
+
+    def _detach(self):
+        """fork出的子进程（如解析进程池）不写父进程的文件"""
+        if self._mmap is not None:
+            self.values = array("d", bytes(8 * len(self.values)))
+            self._mmap = None
+            self.directory = None
+
+    # ---- 导出 ----
+
+    def snapshot(self) -> np.ndarray:
+        """汇总所有进程的槽位"""
+        if self.directory is None:
+            return np.array(self.values, dtype=np.float64)
+        layout_hash = self.layout_hash()
+        total = np.zeros(len(self.values), dtype=np.float64)
+        with self._locked(self.directory, exclusive=False):
+            for path in glob.glob(os.path.join(self.directory, "metrics-*.db")):
+                data = self._read_file(path, layout_hash)
+                if data is not None:
+                    total += data
+        return total
+
+    def render(self) -> str:
+        """生成Prometheus文本格式（0.0.4）"""
+        values = self.snapshot()
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            metric.render(values, lines)
+        return "\n".join(lines) + "\n"
+
+
+def timed(child: HistogramChild):
+    """装饰协程函数或异步生成器，把每次调用的耗时记入直方图"""
+    def decorator(fn):
+        if inspect.isasyncgenfunction(fn):
+            @functools.wraps(fn)
+            async def generator_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    async for item in fn(*args, **kwargs):
+                        yield item
+                finally:
+                    child.observe(time.perf_counter() - started)
+            return generator_wrapper
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+class HTTPMetrics:
+    """按路由模板统计请求耗时与状态码"""
+
+    STATUS_CLASSES = ("1xx", "2xx", "3xx", "4xx", "5xx")
+    UNMATCHED = "<unmatched>"
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self._routes: Dict[int, Dict[str, Tuple[HistogramChild, Tuple[CounterChild, ...]]]] = {}
+        self._unmatched = None
+
+    def bind(self, app):
+        """所有路由注册完成后调用，为每个 (路由, 方法) 预先声明指标"""
+        pairs = []
+        routes = []
+        for route in app.routes:
+            methods = getattr(route, "methods", None)
+            if not methods:
+                continue
+            routes.append(route)
+            pairs.extend((route.path, method) for method in sorted(methods))
+        pairs.append((self.UNMATCHED, "*"))
+
+        duration = self.registry.histogram(
+            "http_request_duration_seconds", "HTTP请求耗时（按路由模板），流式响应计到最后一个分块发送完",
+            HTTP_BUCKETS, ("route", "method"), pairs
+        )
+        requests = self.registry.counter(
+            "http_requests_total", "HTTP请求数（按路由模板与状态码类别）",
+            ("route", "method", "status"),
+            [(path, method, status) for path, method in pairs for status in self.STATUS_CLASSES]
+        )
+
+        def entry(path: str, method: str):
+            return (
+                duration.labels(path, method),
+                tuple(requests.labels(path, method, status) for status in self.STATUS_CLASSES)
+            )
+
+        for route in routes:
+            self._routes[id(route)] = {method: entry(route.path, method) for method in route.methods}
+        self._unmatched = entry(self.UNMATCHED, "*")
+
+    def record(self, scope: Dict[str, Any], status: int, elapsed: float):
+        route = scope.get("route")
+        by_method = self._routes.get(id(route)) if route is not None else None
+        entry = by_method.get(scope["method"]) if by_method else None
+        if entry is None:
+            entry = self._unmatched
+            if entry is None:
+                return
+        entry[0].observe(elapsed)
+        entry[1][min(max(status // 100, 1), 5) - 1].inc()
+
+
+class MetricsMiddleware:
+    """纯ASGI中间件，记录每个请求的耗时与状态码"""
+
+    def __init__(self, app, metrics: HTTPMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.metrics.record(scope, status, time.perf_counter() - started)
+
+
+# 全局注册表与应用指标
+registry = MetricsRegistry()
+http_metrics = HTTPMetrics(registry)
+
+RAG_METHODS = (
+    "analyze_resume",
+    "analyze_resume_stream",
+    "generate_interview_questions",
+    "personalize_interview_questions",
+    "evaluate_interview_answer",
+)
+LLM_OPERATIONS = RAG_METHODS + ("other",)
+PARSE_FORMATS = ("pdf", "docx", "doc", "txt", "other")
+CACHES = ("llm_response", "embedding", "parsed_document")
+CACHE_RESULTS = ("memory_hit", "disk_hit", "miss")
+LLM_CALL_OPERATIONS = LLM_OPERATIONS + ("embedding",)
+LLM_CALL_EVENTS = ("retry", "hedge", "hedge_win", "deadline_exceeded", "circuit_open", "failed")
+
+rag_duration = registry.histogram(
+    "rag_call_duration_seconds", "RAGService各方法耗时（含检索、提示词构建与模型调用）",
+    LLM_BUCKETS, ("method",), [(method,) for method in RAG_METHODS]
+)
+llm_tokens = registry.counter(
+    "llm_tokens_total", "模型调用消耗的token数，取自返回的usage字段；流式调用无usage，按本地分词估算",
+    ("operation", "kind"), itertools.product(LLM_OPERATIONS, ("prompt", "completion"))
+)
+parse_duration = registry.histogram(
+    "document_parse_duration_seconds", "文档解析耗时（提取、清理与章节切分，不含排队）",
+    PARSE_BUCKETS, ("format",), [(fmt,) for fmt in PARSE_FORMATS]
+)
+coalesced_calls = registry.counter(
+    "llm_calls_coalesced_total",
+    "合并掉的重复模型调用（worker：等待本进程内相同的调用；cross_worker：等待其他worker后命中共享缓存）",
+    ("scope",), [("worker",), ("cross_worker",)]
+)
+cache_lookups = registry.counter(
+    "cache_lookups_total", "缓存查询次数（按缓存与结果）",
+    ("cache", "result"), itertools.product(CACHES, CACHE_RESULTS)
+)
+
+interview_sessions = registry.counter(
+    "interview_sessions_total", "面试会话数（created：创建；completed：回答完全部问题），两者之差近似进行中的会话",
+    ("event",), [("created",), ("completed",)]
+)
+
+llm_call_events = registry.counter(
+    "llm_call_events_total",
+    "模型调用策略事件（重试、对冲请求、对冲请求先返回、超出截止时间、熔断拒绝、最终失败）",
+    ("operation", "event"), itertools.product(LLM_CALL_OPERATIONS, LLM_CALL_EVENTS)
+)
+
+
+def _cache_hit_ratio(values: np.ndarray):
+    for cache in CACHES:
+        hits, disk_hits, misses = (float(values[cache_lookups.labels(cache, result)._slot])
+                                   for result in CACHE_RESULTS)
+        total = hits + disk_hits + misses
+        yield (cache,), (hits + disk_hits) / total if total else 0.0
+
+
+registry.gauge_callback("cache_hit_ratio", "缓存命中率（内存与磁盘命中之和 / 查询次数）",
+                        ("cache",), _cache_hit_ratio)
+
+_TOKEN_COUNTERS = {
+    operation: (llm_tokens.labels(operation, "prompt"), llm_tokens.labels(operation, "completion"))
+    for operation in LLM_OPERATIONS
+}
+_CALL_EVENT_COUNTERS = {
+    operation: {event: llm_call_events.labels(operation, event) for event in LLM_CALL_EVENTS}
+    for operation in LLM_CALL_OPERATIONS
+}
+_PARSE_TIMERS = {f".{fmt}": parse_duration.labels(fmt) for fmt in PARSE_FORMATS}
+
+
+def token_counters(operation: str) -> Tuple[CounterChild, CounterChild]:
+    """取 (prompt, completion) 计数器，未声明的调用类型计入other"""
+    return _TOKEN_COUNTERS.get(operation) or _TOKEN_COUNTERS["other"]
+
+
+def parse_timer(file_ext: str) -> HistogramChild:
+    """按文件扩展名（如 .pdf）取解析耗时直方图"""
+    return _PARSE_TIMERS.get(file_ext) or _PARSE_TIMERS[".other"]
+
+
+def cache_counters(cache: str) -> Tuple[CounterChild, CounterChild, CounterChild]:
+    """取某个缓存的 (内存命中, 磁盘命中, 未命中) 计数器"""
+    return tuple(cache_lookups.labels(cache, result) for result in CACHE_RESULTS)
+
+
+def call_event_counters(operation: str) -> Dict[str, CounterChild]:
+    """取某个调用类型的 {事件: 计数器}，未声明的调用类型计入other"""
+    return _CALL_EVENT_COUNTERS.get(operation) or _CALL_EVENT_COUNTERS["other"]
@@ -0,0 +1,149 @@
+"""
+按请求开启的采样剖析器
+
+设置 profiling_token 后，带有相同 X-Profile-Token 请求头的请求会在处理期间定时采样
+所有线程的调用栈，响应体替换为折叠栈文本（每行 "线程;外层函数;...;内层函数 样本数"），
+可直接交给 flamegraph.pl、speedscope 或 inferno 生成火焰图；原响应的状态码放在
+X-Profile-Original-Status 响应头中。
+
+采样覆盖整个进程：事件循环线程上同时处理的其他请求也会出现在结果中，
+剖析时应避免其他流量。同一时间只允许一个剖析中的请求，其余请求照常处理。
+"""
+import os
+import sys
+import hmac
+import logging
+import threading
+from collections import Counter
+from types import CodeType
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile-token"
+
+# 线程空闲等待时所处的最内层Python帧 (文件名, 函数名)，默认不计入样本
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("thread.py", "_worker"),
+    ("queue.py", "get"),
+}
+
+
+class SamplingProfiler:
+    """
+    定时读取 sys._current_frames() 的采样剖析器
+
+    Args:
+        interval: 采样间隔（秒）
+        max_seconds: 最长采样时间，超过后自动停止
+        include_idle: 是否计入空闲等待中的线程
+    """
+
+    def __init__(self, interval: float = 0.005, max_seconds: float = 120.0, include_idle: bool = False):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.include_idle = include_idle
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._labels: Dict[CodeType, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _label(self, code: CodeType) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def sample(self):
+        """采样一次所有线程（采样线程自身除外）"""
+        own_ident = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            code = frame.f_code
+            if not self.include_idle and (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        deadline = self.max_seconds / self.interval
+        while not self._stop.wait(self.interval) and self.samples < deadline:
+            self.sample()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def folded(self) -> str:
+        """折叠栈文本"""
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+
+class ProfilingMiddleware:
+    """纯ASGI中间件：请求头中的令牌与配置一致时剖析该请求，返回折叠栈"""
+
+    def __init__(self, app, token: str, interval: float = 0.005, max_seconds: float = 120.0):
+        self.app = app
+        self.token = token.encode("utf-8")
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+
+    def _requested(self, scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return hmac.compare_digest(value, self.token)
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requested(scope) or not self._lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = SamplingProfiler(self.interval, self.max_seconds)
+        status = 500
+
+        async def discard(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        profiler.start()
+        try:
+            await self.app(scope, receive, discard)
+        except Exception as e:
+            logger.error(f"剖析中的请求失败: {str(e)}")
+        finally:
+            profiler.stop()
+            self._lock.release()
+
+        body = profiler.folded().encode("utf-8")
+        logger.info(f"剖析 {scope['path']}: {profiler.samples} 次采样")
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+                (b"x-profile-original-status", str(status).encode()),
+                (b"x-profile-samples", str(profiler.samples).encode()),
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,169 @@
+"""
+请求级阶段耗时
+
+中间件为每个HTTP请求创建一个Trace并放入contextvar，请求处理过程中用 span("名称")
+记录各阶段（上传、文本提取、清理、章节切分、提示词构建、模型调用、JSON解析等）的耗时。
+响应头发出时把已记录的阶段写入 Server-Timing 头；请求结束后可把完整的阶段列表
+以JSON行写入追踪日志。流式响应的响应头先于生成过程发出，只包含此前的阶段，
+完整耗时见追踪日志。
+
+在解析执行器（线程池或进程池）中运行的代码看不到contextvar，应自行计时并在返回
+事件循环后调用 record_span() 补记。
+"""
+import json
+import time
+import logging
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+trace_logger = logging.getLogger("app.trace")
+
+# 单个请求最多保留的阶段数，避免长时间运行的请求无限增长
+MAX_SPANS = 256
+
+
+class Trace:
+    """一个请求内记录的阶段：(名称, 相对请求开始的偏移, 耗时)，单位秒"""
+    __slots__ = ("started", "spans", "closed")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, float, float]] = []
+        self.closed = False
+
+    def add(self, name: str, start: float, duration: float):
+        if not self.closed and len(self.spans) < MAX_SPANS:
+            self.spans.append((name, start - self.started, duration))
+
+    def totals(self) -> Dict[str, float]:
+        """按阶段名合并耗时（同一阶段可能出现多次，如批量解析）"""
+        totals: Dict[str, float] = {}
+        for name, _, duration in self.spans:
+            totals[name] = totals.get(name, 0.0) + duration
+        return totals
+
+    def server_timing(self, total: float) -> str:
+        entries = [f"{name};dur={duration * 1000:.1f}" for name, duration in self.totals().items()]
+        entries.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(entries)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "spans": [
+                {"name": name, "start_ms": round(offset * 1000, 3), "duration_ms": round(duration * 1000, 3)}
+                for name, offset, duration in self.spans
+            ]
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+class span:
+    """
+    记录一个阶段的耗时，没有进行中的请求时不做任何事
+
+    用法：
+        with span("clean_text"):
+            ...
+    """
+    __slots__ = ("name", "trace", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.trace = _current_trace.get()
+
+    def __enter__(self):
+        if self.trace is not None:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.trace is not None:
+            self.trace.add(self.name, self.started, time.perf_counter() - self.started)
+        return False
+
+
+def record_span(name: str, duration: float, end: Optional[float] = None):
+    """
+    补记一个耗时已知的阶段（如在执行器中测得的耗时）
+
+    Args:
+        end: 阶段结束时的 time.perf_counter()，默认为当前时刻
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        if end is None:
+            end = time.perf_counter()
+        trace.add(name, end - duration, duration)
+
+
+class TracingMiddleware:
+    """
+    纯ASGI中间件：为请求创建Trace，添加Server-Timing响应头并写追踪日志
+
+    Args:
+        server_timing: 是否添加Server-Timing响应头
+        log_traces: 是否把每个请求的阶段写入追踪日志（logger名为app.trace）
+        log_min_duration_ms: 只记录总耗时不低于该值的请求
+    """
+
+    def __init__(self, app, server_timing: bool = True, log_traces: bool = False,
+                 log_min_duration_ms: float = 0.0):
+        self.app = app
+        self.server_timing = server_timing
+        self.log_traces = log_traces
+        self.log_min_duration = log_min_duration_ms / 1000
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace()
+        token = _current_trace.set(trace)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    header = trace.server_timing(time.perf_counter() - trace.started)
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", header.encode("latin-1"))
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # 请求结束后后台任务（继承了contextvar）记录的阶段不再计入
+            trace.closed = True
+            _current_trace.reset(token)
+            total = time.perf_counter() - trace.started
+            if self.log_traces and total >= self.log_min_duration:
+                route = scope.get("route")
+                entry = {
+                    "timestamp": time.time(),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": getattr(route, "path", None),
+                    "status": status,
+                    "duration_ms": round(total * 1000, 3),
+                    **trace.to_dict()
+                }
+                trace_logger.info(json.dumps(entry, ensure_ascii=False))
+
+
+def configure_trace_log(path: str):
+    """把追踪日志写入独立文件，每行一个JSON，不进入应用日志"""
+    handler = logging.FileHandler(path, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    trace_logger.addHandler(handler)
+    trace_logger.setLevel(logging.INFO)
+    trace_logger.propagate = False
@@ -24,9 +24,15 @@ class ResumeSection(str, Enum):
     ACHIEVEMENTS = "achievements"
 
 
+class AnalysisMode(str, Enum):
+    """简历分析模式"""
+    FULL = "full"    # 调用模型，返回完整分析
+    FAST = "fast"    # 仅用本地信号评分，不调用对话模型
+
+
 class ResumeAnalysisRequest(BaseModel):
     """简历分析请求"""
-    resume_text: str = Field(..., description="简历文本内容")
+    resume_text: str = Field("", description="简历文本内容，通过filename或digest引用已上传简历时可为空")
     target_job: str = Field(..., description="目标岗位")
     job_description: Optional[str] = Field(None, description="岗位描述")
     job_type: JobType = Field(..., description="岗位类型")
@@ -43,6 +49,35 @@ class ResumeAnalysisResponse(BaseModel):
     missing_keywords: List[str] = Field(..., description="缺失的关键词")
 
 
+class ResumeRankRequest(BaseModel):
+    """简历排序请求"""
+    job_description: str = Field(..., description="岗位描述")
+    job_type: JobType = Field(..., description="岗位类型")
+    target_job: str = Field("", description="目标岗位")
+    top_k: int = Field(20, ge=1, le=1000, description="返回的候选人数")
+    deep_analysis: int = Field(5, ge=0, le=100, description="进行模型深度分析的候选人数")
+
+
+class RankedCandidate(BaseModel):
+    """排序后的候选人"""
+    filename: str = Field(..., description="简历文件名")
+    digest: str = Field(..., description="简历内容SHA-256")
+    score: float = Field(..., description="本地匹配度评分（0-100）")
+    similarity: float = Field(..., description="与岗位描述的向量相似度")
+    skill_coverage: float = Field(..., description="岗位技能要求覆盖率")
+    keyword_score: float = Field(..., description="技能BM25评分（0-1）")
+    matched_skills: List[str] = Field(..., description="命中的技能要求")
+    analysis: Optional[ResumeAnalysisResponse] = Field(None, description="模型深度分析结果")
+
+
+class ResumeRankResponse(BaseModel):
+    """简历排序响应"""
+    total_candidates: int = Field(..., description="参与排序的简历数")
+    skills: List[str] = Field(..., description="岗位技能要求")
+    candidates: List[RankedCandidate] = Field(..., description="按评分降序排列的候选人")
+    elapsed_ms: float = Field(..., description="耗时（毫秒）")
+
+
 class InterviewQuestion(BaseModel):
     """面试问题"""
     question: str = Field(..., description="问题内容")
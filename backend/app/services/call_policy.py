@@ -0,0 +1,395 @@
+"""
+模型调用策略
+
+LLMClient的每次上游调用都经过CallPolicy：
+- 截止时间：按调用类型（operation）限定总耗时，包括所有重试与退避；
+- 重试：超时、连接错误、429和5xx等可重试错误按带抖动的指数退避重试，
+  优先遵循上游返回的Retry-After；400、401等不可重试错误立即失败；
+- 对冲：可选，单次请求超过该调用类型近期延迟的指定百分位仍未返回时，
+  再发出一个相同请求，取先成功的结果并取消另一个；
+- 熔断：连续失败（按调用计，一次调用的多次重试只算一次）达到阈值后在冷却时间内直接拒绝调用，
+  冷却结束后放行一个探测调用，成功则恢复，失败则重新进入冷却。对话补全与向量化分别熔断，
+  熔断状态按worker进程独立维护。
+
+调用最终失败时抛出LLMCallError（而不是返回错误字典），由接口层返回503和Retry-After，
+避免上游故障变成零分结果。
+"""
+import math
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+import numpy as np
+import openai
+
+from ..core.config import settings
+from ..core.metrics import LLM_CALL_EVENTS, call_event_counters
+from ..core.tracing import span
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 可重试的HTTP状态码（另外所有5xx均可重试）
+RETRYABLE_STATUSES = frozenset({408, 409, 429})
+
+
+class LLMCallError(RuntimeError):
+    """模型调用失败，retry_after为建议客户端重试前等待的秒数"""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMDeadlineExceeded(LLMCallError):
+    """在调用类型的截止时间内未得到结果"""
+
+
+class LLMCircuitOpenError(LLMCallError):
+    """上游连续失败，熔断期间直接拒绝调用"""
+
+
+class LLMUpstreamError(LLMCallError):
+    """上游返回不可重试的错误，或重试次数用尽"""
+
+
+def retry_after_header(exc: LLMCallError) -> str:
+    """Retry-After响应头的值（整秒，至少1秒）"""
+    return str(max(1, math.ceil(exc.retry_after)))
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """判断一次调用失败是否值得重试"""
+    if isinstance(exc, (asyncio.TimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code in RETRYABLE_STATUSES or exc.status_code >= 500
+    return False
+
+
+def retry_after_hint(exc: BaseException) -> Optional[float]:
+    """读取上游响应的Retry-After头（秒），没有或无法解析时返回None"""
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+    try:
+        return max(0.0, float(response.headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    连续失败熔断器
+
+    状态：closed（正常放行）、open（直接拒绝，直到冷却结束）、
+    half_open（冷却结束后只放行一个探测调用）。每次调用的最终结果计一次，failure_threshold为0时不熔断。
+    探测调用由before_call返回的令牌标识，只有持有令牌的调用能结束探测；
+    进入半开前放行、之后才结束的调用不会释放探测名额或重新打开熔断。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe: Optional[object] = None
+
+    def before_call(self) -> Optional[object]:
+        """
+        放行调用，熔断中抛出LLMCircuitOpenError
+
+        Returns:
+            Optional[object]: 本次调用是探测调用时返回探测令牌，否则返回None
+        """
+        if self.failure_threshold <= 0 or self.state == self.CLOSED:
+            return None
+        if self.state == self.OPEN:
+            remaining = self.opened_at + self.reset_timeout - self.clock()
+            if remaining > 0:
+                raise LLMCircuitOpenError("模型服务连续失败，暂停调用", retry_after=remaining)
+            self.state = self.HALF_OPEN
+        if self._probe is not None:
+            raise LLMCircuitOpenError("模型服务恢复探测中，暂停调用", retry_after=1.0)
+        self._probe = object()
+        return self._probe
+
+    def record_success(self, probe: Optional[object] = None):
+        if self.state != self.CLOSED:
+            logger.info("模型服务恢复，熔断关闭")
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe = None
+
+    def record_failure(self, probe: Optional[object] = None):
+        self.failures += 1
+        is_probe = probe is not None and probe is self._probe
+        if is_probe:
+            self._probe = None
+        if self.failure_threshold <= 0:
+            return
+        # 半开状态下只有探测调用的失败重新打开熔断
+        if (self.state == self.CLOSED and self.failures >= self.failure_threshold) or \
+                (self.state == self.HALF_OPEN and is_probe):
+            logger.warning(f"模型服务连续失败{self.failures}次，熔断{self.reset_timeout:.0f}秒")
+            self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = self.clock()
+
+    def release(self, probe: Optional[object] = None):
+        """探测调用被取消、没有结论时释放探测名额，不是当前探测的令牌时忽略"""
+        if probe is not None and probe is self._probe:
+            self._probe = None
+
+
+class LatencyTracker:
+    """按调用类型保存最近window次成功调用的延迟，用于计算对冲时机"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, operation: str, latency: float):
+        samples = self._samples.get(operation)
+        if samples is None:
+            samples = self._samples[operation] = deque(maxlen=self.window)
+        samples.append(latency)
+
+    def percentile(self, operation: str, percentile: float, min_samples: int) -> Optional[float]:
+        """样本不足min_samples时返回None"""
+        samples = self._samples.get(operation)
+        if not samples or len(samples) < min_samples:
+            return None
+        return float(np.percentile(np.fromiter(samples, dtype=np.float64, count=len(samples)), percentile))
+
+
+class CallPolicy:
+    """
+    为单次上游调用施加截止时间、重试、对冲与熔断
+
+    Args:
+        default_deadline: 未单独配置的调用类型的截止时间（秒）
+        deadlines: 调用类型 -> 截止时间（秒）
+        attempt_timeout: 单次请求的超时上限（秒）
+        max_retries: 可重试错误的最大重试次数
+        base_delay / max_delay: 退避时间为 [0, min(max_delay, base_delay * 2^n)] 内的随机值
+        hedge_enabled: 是否对非流式调用发出对冲请求
+        hedge_percentile: 单次请求超过近期延迟的该百分位时发出对冲请求
+        hedge_min_delay: 对冲等待时间下限（秒），避免对很快的调用成倍放大请求量
+        hedge_min_samples: 调用类型积累到该样本数后才开始对冲
+        hedge_window: 延迟统计窗口（最近的成功调用数）
+        breaker: 对话补全的熔断器，默认不熔断
+        embedding_breaker: 向量化调用的熔断器，默认不熔断
+    """
+
+    def __init__(self, default_deadline: float, deadlines: Optional[Dict[str, float]] = None,
+                 attempt_timeout: Optional[float] = None, max_retries: int = 2,
+                 base_delay: float = 0.5, max_delay: float = 8.0,
+                 hedge_enabled: bool = False, hedge_percentile: float = 95.0,
+                 hedge_min_delay: float = 0.5, hedge_min_samples: int = 20, hedge_window: int = 200,
+                 breaker: Optional[CircuitBreaker] = None,
+                 embedding_breaker: Optional[CircuitBreaker] = None):
+        self.default_deadline = default_deadline
+        self.deadlines = dict(deadlines or {})
+        self.attempt_timeout = attempt_timeout or default_deadline
+        self.max_retries = max(0, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.latency = LatencyTracker(hedge_window)
+        self.breaker = breaker or CircuitBreaker(0, 0.0)
+        self.embedding_breaker = embedding_breaker or CircuitBreaker(0, 0.0)
+        self.counts = {"calls": 0, **{event: 0 for event in LLM_CALL_EVENTS}}
+
+    def breaker_for(self, operation: str) -> CircuitBreaker:
+        """向量化与对话补全分别熔断，知识库检索失败不影响对话调用"""
+        return self.embedding_breaker if operation == "embedding" else self.breaker
+
+    def deadline_for(self, operation: str) -> float:
+        return self.deadlines.get(operation, self.default_deadline)
+
+    def backoff(self, retry: int, hint: Optional[float] = None) -> float:
+        """第retry次重试前的等待时间（full jitter），上游给出Retry-After时以其为准"""
+        if hint is not None:
+            return min(hint, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (retry - 1)))
+
+    def hedge_delay(self, operation: str) -> Optional[float]:
+        if not self.hedge_enabled:
+            return None
+        observed = self.latency.percentile(operation, self.hedge_percentile, self.hedge_min_samples)
+        return None if observed is None else max(observed, self.hedge_min_delay)
+
+    def _event(self, operation: str, event: str):
+        self.counts[event] += 1
+        call_event_counters(operation)[event].inc()
+
+    async def call(self, operation: str, fn: Callable[[float], Awaitable[T]],
+                   deadline: Optional[float] = None, hedge: bool = True) -> T:
+        """
+        按策略执行一次上游调用
+
+        Args:
+            operation: 调用类型，决定截止时间并分别统计延迟
+            fn: 发出一次请求的函数，参数为本次请求可用的超时（秒）；对冲和重试时会被多次调用
+            deadline: 覆盖调用类型的截止时间（秒）
+            hedge: 是否允许对冲；只有幂等、可丢弃多余结果的调用才应允许
+
+        Raises:
+            LLMCallError: 超出截止时间、熔断或上游错误（__cause__为最后一次失败）
+        """
+        loop = asyncio.get_running_loop()
+        budget = deadline or self.deadline_for(operation)
+        expires = loop.time() + budget
+        breaker = self.breaker_for(operation)
+        self.counts["calls"] += 1
+        try:
+            probe = breaker.before_call()
+        except LLMCircuitOpenError:
+            self._event(operation, "circuit_open")
+            raise
+
+        retries = 0
+        last_error: Optional[BaseException] = None
+        try:
+            while True:
+                remaining = expires - loop.time()
+                if remaining <= 0:
+                    self._give_up(operation, breaker, probe, "deadline_exceeded", LLMDeadlineExceeded(
+                        f"模型调用超出截止时间（{budget:.0f}秒）: {last_error}"
+                    ), last_error)
+
+                started = loop.time()
+                try:
+                    result = await self._attempt(operation, fn, min(remaining, self.attempt_timeout), hedge)
+                except Exception as e:
+                    last_error = e
+                    if not is_retryable(e):
+                        # 上游正常响应了请求（如400），但请求本身有误，不能说明上游已恢复：
+                        # 熔断不记录成功也不记录失败，探测名额在下方释放
+                        self._event(operation, "failed")
+                        raise LLMUpstreamError(f"模型调用失败: {e}") from e
+                    if breaker.state == CircuitBreaker.OPEN or retries >= self.max_retries:
+                        # 其他调用已触发熔断时不再重试
+                        self._give_up(operation, breaker, probe, "failed", LLMUpstreamError(
+                            f"模型调用重试{retries}次后仍失败: {e}"
+                        ), e)
+
+                    retries += 1
+                    delay = self.backoff(retries, retry_after_hint(e))
+                    if loop.time() + delay >= expires:
+                        self._give_up(operation, breaker, probe, "deadline_exceeded", LLMDeadlineExceeded(
+                            f"模型调用超出截止时间（{budget:.0f}秒）: {e}", retry_after=max(delay, 1.0)
+                        ), e)
+                    logger.warning(f"模型调用失败，{delay:.2f}秒后第{retries}次重试（{operation}）: {e}")
+                    self._event(operation, "retry")
+                    with span("llm_backoff"):
+                        await asyncio.sleep(delay)
+                    continue
+
+                breaker.record_success(probe)
+                self.latency.record(operation, loop.time() - started)
+                return result
+        except BaseException:
+            # 调用被取消、不可重试错误等没有结论的情况释放探测名额（已记录结果时无影响）
+            breaker.release(probe)
+            raise
+
+    def _give_up(self, operation: str, breaker: "CircuitBreaker", probe: Optional[object], event: str,
+                 error: LLMCallError, cause: Optional[BaseException]):
+        """一次调用最终失败：计入一次熔断失败后抛出error，本次失败触发熔断时抛出LLMCircuitOpenError"""
+        breaker.record_failure(probe)
+        if breaker.state == CircuitBreaker.OPEN:
+            event = "circuit_open"
+            error = LLMCircuitOpenError(f"模型服务连续失败，暂停调用: {cause}",
+                                        retry_after=breaker.reset_timeout)
+        self._event(operation, event)
+        raise error from cause
+
+    async def _attempt(self, operation: str, fn: Callable[[float], Awaitable[T]],
+                       timeout: float, hedge: bool) -> T:
+        """单次请求；超过对冲等待时间仍未返回时再发出一个请求，取先成功者"""
+        delay = self.hedge_delay(operation) if hedge else None
+        if delay is None or delay >= timeout:
+            return await asyncio.wait_for(fn(timeout), timeout)
+
+        loop = asyncio.get_running_loop()
+        expires = loop.time() + timeout
+        primary = asyncio.ensure_future(fn(timeout))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return primary.result()
+
+            self._event(operation, "hedge")
+            secondary = asyncio.ensure_future(fn(expires - loop.time()))
+            tasks.append(secondary)
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=expires - loop.time(), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise asyncio.TimeoutError()
+                for task in done:
+                    if task.exception() is None:
+                        if task is secondary:
+                            self._event(operation, "hedge_win")
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                    # 被取消的请求不再有人等待，避免 "exception was never retrieved"
+                    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    def stats(self) -> Dict[str, Any]:
+        """本worker的调用策略统计与熔断状态"""
+        return {
+            **self.counts,
+            "circuits": {
+                name: {
+                    "state": breaker.state,
+                    "opened": breaker.times_opened,
+                    "consecutive_failures": breaker.failures
+                }
+                for name, breaker in (("chat", self.breaker), ("embedding", self.embedding_breaker))
+            }
+        }
+
+
+def create_call_policy() -> CallPolicy:
+    """按配置创建调用策略"""
+    return CallPolicy(
+        default_deadline=settings.llm_deadline,
+        deadlines=settings.llm_operation_deadlines,
+        attempt_timeout=settings.llm_timeout,
+        max_retries=settings.llm_max_retries,
+        base_delay=settings.llm_retry_base_delay,
+        max_delay=settings.llm_retry_max_delay,
+        hedge_enabled=settings.llm_hedge_enabled,
+        hedge_percentile=settings.llm_hedge_percentile,
+        hedge_min_delay=settings.llm_hedge_min_delay,
+        hedge_min_samples=settings.llm_hedge_min_samples,
+        breaker=CircuitBreaker(settings.llm_breaker_failure_threshold, settings.llm_breaker_reset_timeout),
+        embedding_breaker=CircuitBreaker(settings.llm_breaker_failure_threshold, settings.llm_breaker_reset_timeout)
+    )
@@ -0,0 +1,150 @@
+import os
+import re
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from typing import List, Optional, Dict, Any
+import numpy as np
+from ..utils.lru_cache import LRUCache
+from ..core.config import settings
+from ..core.metrics import cache_counters
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# SQLite单条语句的参数数量上限
+_SQLITE_MAX_VARIABLES = 900
+
+
+class EmbeddingCache:
+    """
+    基于内容寻址的向量缓存
+
+    键为 sha256(模型名 + 规范化文本)，分两级：
+        - 进程内LRU
+        - 所有worker共享的SQLite磁盘缓存（WAL模式），向量以float32字节存储
+    进程内LRU在事件循环中直接查询；磁盘读写在线程池中执行，不阻塞事件循环。
+    """
+
+    def __init__(self, db_path: str, memory_items: int = 10000):
+        self.db_path = db_path
+        self.memory = LRUCache(max_items=memory_items)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory_hit_counter, self._disk_hit_counter, self._miss_counter = cache_counters("embedding")
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """懒加载数据库连接"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key BLOB PRIMARY KEY, vector BLOB NOT NULL) WITHOUT ROWID"
+            )
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """规范化文本：NFKC、合并空白"""
+        return _WHITESPACE_RE.sub(' ', unicodedata.normalize('NFKC', text)).strip()
+
+    @classmethod
+    def make_key(cls, model: str, text: str) -> bytes:
+        """计算缓存键"""
+        return hashlib.sha256(f"{model}\0{cls.normalize(text)}".encode('utf-8')).digest()
+
+    async def get_many(self, model: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        批量查询向量
+
+        Args:
+            model: 向量化模型名
+            texts: 文本列表
+
+        Returns:
+            List[Optional[np.ndarray]]: 与输入对应的向量，未命中为None
+        """
+        keys = [self.make_key(model, text) for text in texts]
+        results: List[Optional[np.ndarray]] = [self.memory.get(key) for key in keys]
+
+        missing = list({key for key, vector in zip(keys, results) if vector is None})
+        found = await asyncio.to_thread(self._disk_get, missing) if missing else {}
+
+        memory_hits = disk_hits = misses = 0
+        for i, key in enumerate(keys):
+            if results[i] is not None:
+                memory_hits += 1
+            elif key in found:
+                results[i] = found[key]
+                self.memory.put(key, found[key])
+                disk_hits += 1
+            else:
+                misses += 1
+        self.memory_hits += memory_hits
+        self.disk_hits += disk_hits
+        self.misses += misses
+        self._memory_hit_counter.inc(memory_hits)
+        self._disk_hit_counter.inc(disk_hits)
+        self._miss_counter.inc(misses)
+        return results
+
+    async def put_many(self, model: str, texts: List[str], vectors: np.ndarray):
+        """批量写入向量（单个事务），磁盘写入提交后返回"""
+        rows = []
+        for text, vector in zip(texts, vectors):
+            key = self.make_key(model, text)
+            vector = np.ascontiguousarray(vector, dtype=np.float32)
+            self.memory.put(key, vector)
+            rows.append((key, vector.tobytes()))
+
+        if rows:
+            await asyncio.to_thread(self._disk_put, rows)
+
+    def _disk_get(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        found: Dict[bytes, np.ndarray] = {}
+        with self._lock:
+            for start in range(0, len(keys), _SQLITE_MAX_VARIABLES):
+                batch = keys[start:start + _SQLITE_MAX_VARIABLES]
+                placeholders = ','.join('?' * len(batch))
+                rows = self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def _disk_put(self, rows: List[tuple]):
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector) VALUES (?, ?)", rows
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """命中率统计"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "memory_items": len(self.memory)
+        }
+
+
+# 创建全局向量缓存实例
+embedding_cache = EmbeddingCache(
+    settings.embedding_cache_path,
+    memory_items=settings.embedding_cache_memory_items
+)
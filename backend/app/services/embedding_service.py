@@ -0,0 +1,62 @@
+import logging
+from typing import List, Optional
+import numpy as np
+from .llm_client import LLMClient, llm_client
+from .embedding_cache import EmbeddingCache, embedding_cache
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingService:
+    """文本向量化服务：先查缓存，只为未命中的文本按批调用向量化接口"""
+
+    def __init__(self, client: Optional[LLMClient] = None, cache: Optional[EmbeddingCache] = None):
+        self.llm = client or llm_client
+        self.cache = cache or embedding_cache
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        批量向量化文本
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            np.ndarray: 形状为(len(texts), dim)的float32矩阵
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        model = settings.openai_embedding_model
+        if settings.embedding_cache_enabled:
+            vectors = await self.cache.get_many(model, texts)
+        else:
+            vectors = [None] * len(texts)
+
+        # 未命中的文本去重后再调用接口
+        pending = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                key = self.cache.normalize(texts[i])
+                pending.setdefault(key, []).append(i)
+
+        if pending:
+            missing_texts = [texts[indexes[0]] for indexes in pending.values()]
+            batch_size = max(1, settings.embedding_batch_size)
+            embedded = []
+            for start in range(0, len(missing_texts), batch_size):
+                embedded.extend(await self.llm.embed(missing_texts[start:start + batch_size]))
+            embedded = np.asarray(embedded, dtype=np.float32)
+
+            if settings.embedding_cache_enabled:
+                await self.cache.put_many(model, missing_texts, embedded)
+            for indexes, vector in zip(pending.values(), embedded):
+                for i in indexes:
+                    vectors[i] = vector
+
+        return np.vstack(vectors).astype(np.float32, copy=False)
+
+    async def embed_query(self, text: str) -> np.ndarray:
+        """向量化单条查询文本"""
+        return (await self.embed([text]))[0]
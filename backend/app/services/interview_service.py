@@ -1,40 +1,49 @@
+import asyncio
 import logging
 import uuid
-from typing import Dict, Any, List
+from typing import Dict, Any, List, AsyncIterator, Tuple, Optional
 from datetime import datetime
 from ..services.rag_service import RAGService
+from ..services.call_policy import LLMCallError
+from ..services.session_store import SessionStore, create_session_store
+from ..services.question_pool import create_question_pool
+from ..core.config import settings
+from ..core.metrics import interview_sessions
 from ..models.schemas import InterviewSession, InterviewQuestion, JobType
 
 logger = logging.getLogger(__name__)
 
+_SESSIONS_CREATED = interview_sessions.labels("created")
+_SESSIONS_COMPLETED = interview_sessions.labels("completed")
+
 
 class InterviewService:
     """面试服务，处理模拟面试和评估"""
     
-    def __init__(self):
+    def __init__(self, session_store: Optional[SessionStore] = None):
         self.rag_service = RAGService()
-        self.active_sessions = {}
+        self.session_store = session_store or create_session_store()
+        self.question_pool = create_question_pool(self.rag_service)
+        # 后台评估任务: session_id -> {问题索引: asyncio.Task}
+        self._evaluation_tasks: Dict[str, Dict[int, asyncio.Task]] = {}
+        # 题目个性化任务: session_id -> asyncio.Task
+        self._personalization_tasks: Dict[str, asyncio.Task] = {}
     
-    def create_interview_session(self, job_type: JobType, user_background: str) -> InterviewSession:
+    async def create_interview_session(self, job_type: JobType, user_background: str) -> InterviewSession:
         """创建新的面试会话"""
         try:
             session_id = str(uuid.uuid4())
             
-            # 生成面试问题
-            questions = self.rag_service.generate_interview_questions(
-                job_type.value, user_background, num_questions=5
-            )
+            # 优先从题池取预生成的题目，题池为空时实时生成
+            questions = self.question_pool.take(job_type) if self.question_pool else None
+            from_pool = questions is not None
+            if not from_pool:
+                questions = await self.rag_service.generate_interview_questions(
+                    job_type.value, user_background, num_questions=5
+                )
             
             # 构建面试问题对象
-            interview_questions = []
-            for i, q in enumerate(questions):
-                question = InterviewQuestion(
-                    question=q.get('question', f'问题{i+1}'),
-                    category=q.get('category', 'general'),
-                    difficulty=q.get('difficulty', 'medium'),
-                    context=q.get('context', '')
-                )
-                interview_questions.append(question)
+            interview_questions = self._build_questions(questions)
             
             # 创建面试会话
             session = InterviewSession(
@@ -47,11 +56,16 @@ class InterviewService:
             )
             
             # 存储会话
-            self.active_sessions[session_id] = {
+            await self.session_store.save(session_id, {
                 'session': session,
                 'answers': [],
                 'current_question': 0
-            }
+            })
+            _SESSIONS_CREATED.inc()
+            
+            # 预生成题目不含用户背景，在后台按背景改写尚未作答的题目
+            if from_pool and settings.question_pool_personalize and user_background.strip():
+                self._start_personalization(session_id, job_type, user_background, questions)
             
             return session
             
@@ -59,13 +73,72 @@ class InterviewService:
             logger.error(f"创建面试会话失败: {str(e)}")
             raise
     
+    @staticmethod
+    def _build_questions(questions: List[Dict[str, Any]]) -> List[InterviewQuestion]:
+        """将生成结果转换为面试问题对象"""
+        interview_questions = []
+        for i, q in enumerate(questions):
+            question = InterviewQuestion(
+                question=q.get('question', f'问题{i+1}'),
+                category=q.get('category', 'general'),
+                difficulty=q.get('difficulty', 'medium'),
+                context=q.get('context', '')
+            )
+            interview_questions.append(question)
+        return interview_questions
+    
+    def _start_personalization(self, session_id: str, job_type: JobType,
+                               user_background: str, questions: List[Dict[str, Any]]) -> asyncio.Task:
+        """在后台启动题目个性化任务"""
+        task = asyncio.create_task(
+            self._personalize_questions(session_id, job_type, user_background, questions)
+        )
+        self._personalization_tasks[session_id] = task
+        
+        def _cleanup(_task: asyncio.Task):
+            if self._personalization_tasks.get(session_id) is _task:
+                del self._personalization_tasks[session_id]
+        
+        task.add_done_callback(_cleanup)
+        return task
+    
+    async def _personalize_questions(self, session_id: str, job_type: JobType,
+                                     user_background: str, questions: List[Dict[str, Any]]):
+        """按用户背景改写题目，只替换当前问题之后尚未展示的题目"""
+        try:
+            personalized = await self.rag_service.personalize_interview_questions(
+                job_type.value, user_background, questions
+            )
+            if not personalized:
+                return
+            
+            # 个性化题目单独保存，不回写整个会话，避免覆盖其他worker同时提交的回答；
+            # 存储在写入时再次确认这些题目尚未展示
+            session_data = self.session_store.get(session_id)
+            if session_data is None:
+                return
+            session = session_data['session']
+            first_index = session_data['current_question'] + 1
+            if first_index >= len(session.questions):
+                return
+            
+            replacements = self._build_questions(personalized)[first_index:len(session.questions)]
+            await self.session_store.save_personalized_questions(session_id, first_index, replacements)
+        except Exception as e:
+            logger.error(f"个性化面试问题失败: {str(e)}")
+    
+    def get_session(self, session_id: str) -> Optional[InterviewSession]:
+        """获取面试会话"""
+        session_data = self.session_store.get(session_id)
+        return session_data['session'] if session_data else None
+    
     def get_current_question(self, session_id: str):
         """获取当前问题"""
         try:
-            if session_id not in self.active_sessions:
+            session_data = self.session_store.get(session_id)
+            if session_data is None:
                 return None
             
-            session_data = self.active_sessions[session_id]
             current_index = session_data['current_question']
             session = session_data['session']
             
@@ -78,13 +151,13 @@ class InterviewService:
             logger.error(f"获取当前问题失败: {str(e)}")
             return None
     
-    def submit_answer(self, session_id: str, answer_text: str) -> Dict[str, Any]:
+    async def submit_answer(self, session_id: str, answer_text: str) -> Dict[str, Any]:
         """提交面试回答"""
         try:
-            if session_id not in self.active_sessions:
+            session_data = self.session_store.get(session_id)
+            if session_data is None:
                 return {"success": False, "error": "会话不存在"}
             
-            session_data = self.active_sessions[session_id]
             current_index = session_data['current_question']
             session = session_data['session']
             
@@ -98,79 +171,224 @@ class InterviewService:
                 'timestamp': datetime.now()
             })
             
+            # 后台立即开始评估该回答
+            self._start_answer_evaluation(
+                session_id,
+                current_index,
+                session.questions[current_index].question,
+                answer_text,
+                session.job_type.value
+            )
+            
             # 移动到下一个问题
             session_data['current_question'] += 1
             
+            await self.session_store.save(session_id, session_data)
+            # 读取会话后写入的个性化题目只对提交之后才展示的题目生效，以最新题目为准
+            session = (self.session_store.get(session_id) or session_data)['session']
+            
             # 检查是否完成
             is_completed = session_data['current_question'] >= len(session.questions)
+            if is_completed:
+                _SESSIONS_COMPLETED.inc()
             
             return {
                 "success": True,
                 "is_completed": is_completed,
-                "next_question": self.get_current_question(session_id) if not is_completed else None
+                "next_question": session.questions[session_data['current_question']] if not is_completed else None
             }
             
         except Exception as e:
             logger.error(f"提交回答失败: {str(e)}")
             return {"success": False, "error": str(e)}
     
-    def evaluate_interview(self, session_id: str) -> Dict[str, Any]:
-        """评估面试表现"""
+    async def evaluate_interview(self, session_id: str) -> Dict[str, Any]:
+        """
+        评估面试表现
+        
+        Raises:
+            LLMCallError: 有回答因模型服务不可用未能评估，该回答在下次调用时重新评估
+        """
         try:
-            if session_id not in self.active_sessions:
-                raise ValueError("会话不存在")
+            session_data, evaluated_answers = self._get_evaluation_context(session_id)
+            evaluations = self.session_store.get_evaluations(session_id)
             
-            session_data = self.active_sessions[session_id]
-            session = session_data['session']
-            answers = session_data['answers']
+            # 汇总后台评估结果，仅等待尚未完成的评估
+            pending = self._pending_evaluations(session_id, session_data, evaluated_answers, evaluations)
+            if pending:
+                results = await asyncio.gather(*pending)
+                evaluations.update(zip(pending.values(), results))
             
-            if not answers:
-                raise ValueError("没有回答记录")
+            return self._aggregate_evaluations(session_id, session_data, evaluated_answers, evaluations)
             
-            # 评估每个回答
-            evaluations = []
-            total_score = 0
+        except LLMCallError:
+            raise
+        except Exception as e:
+            logger.error(f"评估面试失败: {str(e)}")
+            return {"error": str(e)}
+    
+    async def evaluate_interview_stream(self, session_id: str) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        流式评估面试表现
+        
+        Yields:
+            Tuple[str, Any]: (事件类型, 数据)，事件类型为：
+                evaluation - 单个回答的评估结果，按完成顺序推送
+                result     - 与evaluate_interview相同的汇总结果
+                error      - 错误信息；模型服务不可用时含retry_after秒数
+        """
+        try:
+            session_data, evaluated_answers = self._get_evaluation_context(session_id)
+            evaluations = self.session_store.get_evaluations(session_id)
             
-            for answer in answers:
+            # 已完成的评估立即推送
+            for answer in evaluated_answers:
                 question_index = int(answer['question_id'])
-                if question_index < len(session.questions):
-                    question = session.questions[question_index]
-                    
-                    # 使用RAG服务评估回答
-                    evaluation = self.rag_service.evaluate_interview_answer(
-                        question.question,
-                        answer['answer'],
-                        session.job_type.value
-                    )
-                    
-                    evaluations.append(evaluation)
-                    
-                    # 累加分数
-                    if "overall_score" in evaluation:
-                        total_score += evaluation["overall_score"]
-            
-            # 计算平均分
-            avg_score = total_score / len(answers) if answers else 0
+                if question_index in evaluations:
+                    yield "evaluation", {
+                        "question_index": question_index,
+                        "evaluation": evaluations[question_index]
+                    }
             
-            return {
-                "session_id": session_id,
-                "overall_score": avg_score,
-                "evaluations": evaluations,
-                "total_questions": len(session.questions),
-                "answered_questions": len(answers)
-            }
+            # 其余评估按完成顺序推送
+            pending = self._pending_evaluations(session_id, session_data, evaluated_answers, evaluations)
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    question_index = pending.pop(task)
+                    evaluations[question_index] = task.result()
+                    yield "evaluation", {
+                        "question_index": question_index,
+                        "evaluation": evaluations[question_index]
+                    }
+            
+            yield "result", self._aggregate_evaluations(session_id, session_data, evaluated_answers, evaluations)
             
+        except LLMCallError as e:
+            logger.error(f"流式评估面试失败: {str(e)}")
+            yield "error", {"error": str(e), "retry_after": e.retry_after}
         except Exception as e:
-            logger.error(f"评估面试失败: {str(e)}")
-            return {"error": str(e)}
+            logger.error(f"流式评估面试失败: {str(e)}")
+            yield "error", {"error": str(e)}
+    
+    def _get_evaluation_context(self, session_id: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """获取会话数据和需要评估的回答"""
+        session_data = self.session_store.get(session_id)
+        if session_data is None:
+            raise ValueError("会话不存在")
+        
+        session = session_data['session']
+        answers = session_data['answers']
+        
+        if not answers:
+            raise ValueError("没有回答记录")
+        
+        evaluated_answers = [
+            answer for answer in answers
+            if int(answer['question_id']) < len(session.questions)
+        ]
+        return session_data, evaluated_answers
+    
+    def _aggregate_evaluations(self, session_id: str, session_data: Dict[str, Any],
+                               evaluated_answers: List[Dict[str, Any]],
+                               evaluations_by_index: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+        """汇总各回答的评估结果"""
+        session = session_data['session']
+        answers = session_data['answers']
+        evaluations = []
+        total_score = 0
+        
+        for answer in evaluated_answers:
+            evaluation = evaluations_by_index[int(answer['question_id'])]
+            evaluations.append(evaluation)
+            
+            # 累加分数
+            if "overall_score" in evaluation:
+                total_score += evaluation["overall_score"]
+        
+        # 计算平均分
+        avg_score = total_score / len(answers) if answers else 0
+        
+        return {
+            "session_id": session_id,
+            "overall_score": avg_score,
+            "evaluations": evaluations,
+            "total_questions": len(session.questions),
+            "answered_questions": len(answers)
+        }
+    
+    def _start_answer_evaluation(self, session_id: str, question_index: int,
+                                 question: str, answer: str, job_type: str) -> asyncio.Task:
+        """在后台启动单个回答的评估任务"""
+        task = asyncio.create_task(
+            self._evaluate_answer(session_id, question_index, question, answer, job_type)
+        )
+        session_tasks = self._evaluation_tasks.setdefault(session_id, {})
+        session_tasks[question_index] = task
+        
+        def _cleanup(_task: asyncio.Task):
+            # 失败的任务无人等待时避免 "exception was never retrieved"
+            if not _task.cancelled():
+                _task.exception()
+            if session_tasks.get(question_index) is _task:
+                del session_tasks[question_index]
+            if not session_tasks and self._evaluation_tasks.get(session_id) is session_tasks:
+                del self._evaluation_tasks[session_id]
+        
+        task.add_done_callback(_cleanup)
+        return task
+    
+    async def _evaluate_answer(self, session_id: str, question_index: int,
+                               question: str, answer: str, job_type: str) -> Dict[str, Any]:
+        """评估单个回答并将结果存储到会话中"""
+        try:
+            evaluation = await self.rag_service.evaluate_interview_answer(question, answer, job_type)
+        except LLMCallError as e:
+            # 模型服务暂不可用时不保存结果，下次评估时重新评估该回答
+            logger.warning(f"后台评估回答失败，等待重试: {str(e)}")
+            raise
+        except Exception as e:
+            logger.error(f"后台评估回答失败: {str(e)}")
+            evaluation = {"error": str(e)}
+        
+        try:
+            await self.session_store.save_evaluation(session_id, question_index, evaluation)
+        except Exception as e:
+            logger.error(f"保存评估结果失败: {str(e)}")
+        return evaluation
+    
+    def _pending_evaluations(self, session_id: str, session_data: Dict[str, Any],
+                             answers: List[Dict[str, Any]],
+                             evaluations: Dict[int, Dict[str, Any]]) -> Dict[asyncio.Task, int]:
+        """返回仍在进行中的评估任务，缺失的评估立即在后台补齐"""
+        session = session_data['session']
+        pending = {}
+        
+        for answer in answers:
+            question_index = int(answer['question_id'])
+            if question_index in evaluations:
+                continue
+            
+            task = self._evaluation_tasks.get(session_id, {}).get(question_index)
+            if task is None:
+                task = self._start_answer_evaluation(
+                    session_id,
+                    question_index,
+                    session.questions[question_index].question,
+                    answer['answer'],
+                    session.job_type.value
+                )
+            pending[task] = question_index
+        
+        return pending
     
     def get_session_summary(self, session_id: str) -> Dict[str, Any]:
         """获取会话摘要"""
         try:
-            if session_id not in self.active_sessions:
+            session_data = self.session_store.get(session_id)
+            if session_data is None:
                 return {"error": "会话不存在"}
             
-            session_data = self.active_sessions[session_id]
             session = session_data['session']
             answers = session_data['answers']
             
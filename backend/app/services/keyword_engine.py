@@ -0,0 +1,244 @@
+import math
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
+import numpy as np
+from .skill_dictionary import SKILL_DICTIONARY, COMMON_SKILLS, CORE_SKILL_COUNT, AMBIGUOUS_WORDS
+from ..models.schemas import JobType
+from ..utils.lru_cache import LRUCache
+from ..utils.section_parser import AhoCorasick
+
+
+def _is_ascii_alnum(char: str) -> bool:
+    return char.isascii() and char.isalnum()
+
+
+@dataclass
+class KeywordMatch:
+    """简历与岗位要求的关键词匹配结果"""
+    required: List[str]
+    matched: List[str]
+    missing: List[str]
+
+
+class KeywordIndex:
+    """
+    技能倒排索引
+
+    记录每个技能在哪些文档中出现及出现次数，用于计算IDF和BM25评分。
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # 技能 -> {文档ID: 出现次数}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        # 文档ID -> (技能出现次数, 文档长度)
+        self._documents: Dict[str, Tuple[Dict[str, int], int]] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def add(self, doc_id: str, terms: Dict[str, int], length: int):
+        """加入或替换文档"""
+        with self._lock:
+            self._remove(doc_id)
+            self._documents[doc_id] = (terms, length)
+            self._total_length += length
+            for term, count in terms.items():
+                self._postings.setdefault(term, {})[doc_id] = count
+
+    def remove(self, doc_id: str):
+        """移除文档，不存在时忽略"""
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: str):
+        document = self._documents.pop(doc_id, None)
+        if document is None:
+            return
+        terms, length = document
+        self._total_length -= length
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._documents
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def idf(self, term: str) -> float:
+        """BM25形式的IDF，索引为空时所有技能权重为1"""
+        total = len(self._documents)
+        if total == 0:
+            return 1.0
+        frequency = len(self._postings.get(term, ()))
+        return math.log(1.0 + (total - frequency + 0.5) / (frequency + 0.5))
+
+    def bm25(self, query: Sequence[str], doc_ids: Sequence[str]) -> np.ndarray:
+        """
+        计算文档对查询技能的BM25评分
+
+        只遍历查询技能的倒排表，耗时与命中文档数成正比。
+
+        Returns:
+            np.ndarray: 与doc_ids对应的评分，已除以满分归一化到[0, 1]
+        """
+        scores = np.zeros(len(doc_ids), dtype=np.float32)
+        if not query or not doc_ids:
+            return scores
+
+        with self._lock:
+            if not self._documents:
+                return scores
+            rows = {doc_id: row for row, doc_id in enumerate(doc_ids)}
+            average_length = max(self._total_length / len(self._documents), 1.0)
+            lengths = np.array([self._documents.get(doc_id, ({}, 0))[1] for doc_id in doc_ids],
+                               dtype=np.float32)
+            norm = self.k1 * (1.0 - self.b + self.b * lengths / average_length)
+
+            max_score = 0.0
+            for term in dict.fromkeys(query):
+                idf = self.idf(term)
+                max_score += idf * (self.k1 + 1.0)
+                hits = [(rows[doc_id], count) for doc_id, count in self._postings.get(term, {}).items()
+                        if doc_id in rows]
+                if not hits:
+                    continue
+                index = np.fromiter((row for row, _ in hits), dtype=np.int64, count=len(hits))
+                tf = np.fromiter((count for _, count in hits), dtype=np.float32, count=len(hits))
+                scores[index] += idf * tf * (self.k1 + 1.0) / (tf + norm[index])
+
+        return scores / max_score if max_score > 0 else scores
+
+
+class KeywordEngine:
+    """
+    本地关键词匹配引擎
+
+    按岗位类型维护技能/同义词词典，每个岗位类型一个Aho-Corasick自动机，只识别该岗位
+    技能与通用技能，一次扫描提取文本中的技能（标准名及出现次数）。ASCII词要求两侧为
+    词边界，避免 java 命中 javascript；go、react 等同时是普通英文单词的同义词另需
+    写法与标准名一致。文本的提取结果按岗位类型和内容哈希缓存，重复分析时匹配只是集合运算。
+    引擎本身不持有语料索引，需要IDF的调用方（如简历排序）传入自己的KeywordIndex。
+    """
+
+    # 歧义词与相邻词以这些字符相连时视为普通单词（go-to-market、R&D）
+    JOINERS = "-&'"
+
+    def __init__(self, dictionary: Optional[Dict[JobType, Dict[str, List[str]]]] = None,
+                 common: Optional[Dict[str, List[str]]] = None, cache_items: int = 1024,
+                 ambiguous: Optional[Set[str]] = None):
+        dictionary = SKILL_DICTIONARY if dictionary is None else dictionary
+        common = COMMON_SKILLS if common is None else common
+        self._ambiguous = AMBIGUOUS_WORDS if ambiguous is None else ambiguous
+
+        self._vocabulary: Dict[JobType, List[str]] = {
+            job_type: list(skills) + [skill for skill in common if skill not in skills]
+            for job_type, skills in dictionary.items()
+        }
+
+        # 未配置技能的岗位类型（如"其他"）及不限岗位的提取（简历建索引）使用全部技能
+        self._automata: Dict[Optional[JobType], AhoCorasick] = {
+            job_type: self._build_automaton([skills, common])
+            for job_type, skills in dictionary.items() if skills
+        }
+        self._automata[None] = self._build_automaton(list(dictionary.values()) + [common])
+        self._cache = LRUCache(max_items=cache_items)
+
+    @staticmethod
+    def _build_automaton(groups: List[Dict[str, List[str]]]) -> AhoCorasick:
+        # 同义词 -> 标准名，同一同义词以先出现的为准
+        synonyms: Dict[str, str] = {}
+        for skills in groups:
+            for skill, words in skills.items():
+                for word in [skill] + list(words):
+                    synonyms.setdefault(word.lower(), skill)
+        return AhoCorasick(synonyms.items())
+
+    def vocabulary(self, job_type: Union[JobType, str]) -> List[str]:
+        """岗位类型的技能词表，按重要程度排列"""
+        return self._vocabulary.get(JobType(job_type), [])
+
+    def _is_ambiguous_use(self, text: str, start: int, end: int, skill: str) -> bool:
+        word = text[start:end]
+        if word.lower() not in self._ambiguous:
+            return False
+        if word != skill and word != skill.upper():
+            return True
+        return (start > 0 and text[start - 1] in self.JOINERS) or (end < len(text) and text[end] in self.JOINERS)
+
+    def extract(self, text: str, job_type: Optional[Union[JobType, str]] = None) -> Dict[str, int]:
+        """
+        提取文本中的技能
+
+        Args:
+            text: 文本
+            job_type: 岗位类型，只识别该岗位技能与通用技能；None表示识别全部技能
+
+        Returns:
+            Dict[str, int]: 标准名 -> 出现次数，按首次出现顺序排列
+        """
+        if not text:
+            return {}
+        job_type = JobType(job_type) if job_type is not None else None
+        automaton = self._automata.get(job_type, self._automata[None])
+        key = (job_type, hashlib.sha1(text.encode('utf-8')).digest())
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        counts: Dict[str, int] = {}
+        # 同一技能的重叠匹配（如 spring 与 spring boot）只计一次
+        last_end: Dict[str, int] = {}
+        length = len(text)
+        for start, end, skill in automaton.finditer(text):
+            if _is_ascii_alnum(text[start]) and start > 0 and _is_ascii_alnum(text[start - 1]):
+                continue
+            if _is_ascii_alnum(text[end - 1]) and end < length and _is_ascii_alnum(text[end]):
+                continue
+            if self._is_ambiguous_use(text, start, end, skill):
+                continue
+            if start < last_end.get(skill, -1):
+                last_end[skill] = end
+                continue
+            last_end[skill] = end
+            counts[skill] = counts.get(skill, 0) + 1
+
+        self._cache.put(key, counts)
+        return counts
+
+    def required_skills(self, job_description: str, job_type: Union[JobType, str],
+                        index: Optional[KeywordIndex] = None) -> List[str]:
+        """
+        岗位要求的技能
+
+        岗位描述中出现的技能按出现次数降序排列，传入index时按 TF-IDF 降序排列，
+        次数相同的按首次出现顺序；未提供岗位描述或未识别出技能时，使用岗位类型的核心技能。
+        """
+        counts = self.extract(job_description or "", job_type)
+        if not counts:
+            return self.vocabulary(job_type)[:CORE_SKILL_COUNT]
+        if index is None:
+            return sorted(counts, key=lambda skill: -counts[skill])
+        weights = {skill: count * index.idf(skill) for skill, count in counts.items()}
+        return sorted(counts, key=lambda skill: -weights[skill])
+
+    def match(self, resume_text: str, job_description: str, job_type: Union[JobType, str]) -> KeywordMatch:
+        """计算简历命中和缺失的岗位技能"""
+        required = self.required_skills(job_description, job_type)
+        found = self.extract(resume_text, job_type)
+        return KeywordMatch(
+            required=required,
+            matched=[skill for skill in required if skill in found],
+            missing=[skill for skill in required if skill not in found]
+        )
+
+
+# 全局关键词引擎实例
+keyword_engine = KeywordEngine()
@@ -0,0 +1,222 @@
+import os
+import json
+import time
+import fcntl
+import asyncio
+import hashlib
+import logging
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Tuple
+from ..utils.document_processor import DocumentProcessor
+from .embedding_service import EmbeddingService
+from .vector_store import VectorStore, vector_store
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class KnowledgeBaseSyncInProgressError(RuntimeError):
+    """已有同步任务正在进行"""
+
+
+class KnowledgeBaseService:
+    """知识库增量同步服务：扫描knowledge_base_path，只重新处理内容变化的文件"""
+
+    def __init__(self, store: Optional[VectorStore] = None,
+                 embedding_service: Optional[EmbeddingService] = None,
+                 knowledge_base_path: Optional[str] = None):
+        self.doc_processor = DocumentProcessor(
+            pdf_max_pages=settings.pdf_max_pages,
+            pdf_max_text_bytes=settings.pdf_max_text_bytes,
+            pdf_parallel_min_pages=settings.pdf_parallel_min_pages,
+            pdf_process_workers=settings.pdf_process_workers
+        )
+        self.vector_store = store or vector_store
+        self.embedding_service = embedding_service or EmbeddingService()
+        self.knowledge_base_path = knowledge_base_path or settings.knowledge_base_path
+        self.state_path = os.path.join(self.vector_store.db_path, 'ingest_state.json')
+
+    async def sync(self, verify_hashes: bool = False) -> Dict[str, Any]:
+        """
+        同步知识库目录到向量库
+
+        Args:
+            verify_hashes: 为True时对所有文件重新计算哈希，否则大小和修改时间未变的文件直接跳过
+
+        Returns:
+            Dict[str, Any]: 同步统计
+        """
+        with self._sync_lock():
+            start = time.perf_counter()
+            state = self._load_state()
+            files = await asyncio.to_thread(self._scan)
+
+            stats = {
+                "scanned": len(files),
+                "added": 0,
+                "updated": 0,
+                "deleted": 0,
+                "unchanged": 0,
+                "chunks_added": 0,
+                "failed": []
+            }
+
+            # 删除已不存在的文件
+            removed = [path for path in state if path not in files]
+            if removed:
+                with self.vector_store.batch():
+                    for path in removed:
+                        self.vector_store.delete_source(path)
+                        del state[path]
+                stats["deleted"] = len(removed)
+                self._save_state(state)
+
+            # 找出内容变化的文件
+            changed = []
+            for path, (size, mtime_ns) in files.items():
+                entry = state.get(path)
+                if entry and not verify_hashes and entry["size"] == size and entry["mtime_ns"] == mtime_ns:
+                    stats["unchanged"] += 1
+                    continue
+
+                digest = await asyncio.to_thread(self._hash_file, path)
+                if entry and entry["sha256"] == digest:
+                    entry.update(size=size, mtime_ns=mtime_ns)
+                    stats["unchanged"] += 1
+                    continue
+
+                changed.append((path, {"size": size, "mtime_ns": mtime_ns, "sha256": digest}))
+
+            # 分组提取、批量向量化、写入
+            group: List[Tuple[str, Dict[str, Any], List[str]]] = []
+            group_chunks = 0
+            for path, entry in changed:
+                try:
+                    chunks = await asyncio.to_thread(self._extract_chunks, path)
+                except Exception as e:
+                    logger.error(f"知识库文件处理失败 {path}: {str(e)}")
+                    stats["failed"].append(path)
+                    continue
+
+                group.append((path, entry, chunks))
+                group_chunks += len(chunks)
+                if group_chunks >= settings.embedding_batch_size:
+                    await self._ingest_group(group, state, stats)
+                    group, group_chunks = [], 0
+
+            if group:
+                await self._ingest_group(group, state, stats)
+
+            self._save_state(state)
+
+            if self._should_compact():
+                await asyncio.to_thread(self.vector_store.compact)
+
+            stats["total_chunks"] = self.vector_store.count
+            stats["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+            return stats
+
+    async def _ingest_group(self, group: List[Tuple[str, Dict[str, Any], List[str]]],
+                            state: Dict[str, Dict[str, Any]], stats: Dict[str, Any]):
+        """向量化一组文件的所有文本块，并替换这些文件在向量库中的旧数据"""
+        texts = [chunk for _, _, chunks in group for chunk in chunks]
+        vectors = await self.embedding_service.embed(texts) if texts else None
+
+        offset = 0
+        with self.vector_store.batch():
+            for path, entry, chunks in group:
+                if path in state:
+                    self.vector_store.delete_source(path)
+                    stats["updated"] += 1
+                else:
+                    stats["added"] += 1
+
+                if chunks:
+                    self.vector_store.add(path, chunks, vectors[offset:offset + len(chunks)])
+                    offset += len(chunks)
+                state[path] = entry
+
+        stats["chunks_added"] += len(texts)
+        self._save_state(state)
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        """递归扫描知识库目录，返回 {相对路径: (大小, 修改时间)}"""
+        files = {}
+        root = self.knowledge_base_path
+        if not os.path.isdir(root):
+            return files
+
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file() and self._is_supported_format(entry.name):
+                        stat = entry.stat()
+                        rel_path = os.path.relpath(entry.path, root)
+                        files[rel_path] = (stat.st_size, stat.st_mtime_ns)
+        return files
+
+    def _is_supported_format(self, filename: str) -> bool:
+        """检查文件格式是否支持"""
+        file_ext = os.path.splitext(filename)[1].lower()
+        return file_ext in self.doc_processor.supported_formats
+
+    def _hash_file(self, rel_path: str) -> str:
+        """流式计算文件SHA-256"""
+        digest = hashlib.sha256()
+        with open(os.path.join(self.knowledge_base_path, rel_path), 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _extract_chunks(self, rel_path: str) -> List[str]:
+        """提取文件文本并分块"""
+        full_text, _ = self.doc_processor.extract_text(os.path.join(self.knowledge_base_path, rel_path))
+        if not full_text.strip():
+            return []
+        return self.doc_processor.chunk_text(full_text, settings.chunk_size, settings.chunk_overlap)
+
+    def _should_compact(self) -> bool:
+        """已删除行占比超过阈值时压缩向量库"""
+        return self.vector_store.deleted_ratio > settings.vector_db_compact_ratio
+
+    def _load_state(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_state(self, state: Dict[str, Dict[str, Any]]):
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp.{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    @contextmanager
+    def _sync_lock(self):
+        """跨进程同步锁，同一时间只允许一个同步任务"""
+        os.makedirs(self.vector_store.db_path, exist_ok=True)
+        with open(os.path.join(self.vector_store.db_path, '.ingest.lock'), 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise KnowledgeBaseSyncInProgressError("知识库同步正在进行中")
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取知识库统计信息"""
+        state = self._load_state()
+        return {
+            "documents": len(state),
+            "chunks": self.vector_store.count,
+            "knowledge_base_path": self.knowledge_base_path,
+            "embedding_model": settings.openai_embedding_model,
+            "embedding_cache": self.embedding_service.cache.stats()
+        }
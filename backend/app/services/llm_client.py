@@ -0,0 +1,271 @@
+import time
+import logging
+from typing import List, Dict, Optional, AsyncIterator
+import httpx
+from openai import AsyncOpenAI
+from .response_cache import ResponseCache, response_cache
+from .embedding_cache import EmbeddingCache
+from .single_flight import SingleFlight
+from .call_policy import CallPolicy, create_call_policy
+from ..core.config import settings
+from ..core.metrics import token_counters
+from ..core.tracing import span, record_span
+from ..utils.tokenizer import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class LLMClient:
+    """
+    异步LLM客户端，进程内所有服务共享同一个keep-alive连接池
+
+    每次上游调用经过CallPolicy（截止时间、重试、对冲与熔断），最终失败时抛出LLMCallError。
+    """
+
+    def __init__(self, cache: Optional[ResponseCache] = None, single_flight: Optional[SingleFlight] = None,
+                 policy: Optional[CallPolicy] = None):
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._client: Optional[AsyncOpenAI] = None
+        self.response_cache = cache or response_cache
+        self.single_flight = single_flight or SingleFlight(settings.llm_coalesce_lock_path)
+        self.policy = policy or create_call_policy()
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """懒加载OpenAI客户端，首次调用时创建连接池"""
+        if self._client is None:
+            self._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.llm_max_connections,
+                    max_keepalive_connections=settings.llm_max_keepalive_connections,
+                    keepalive_expiry=settings.llm_keepalive_expiry
+                ),
+                timeout=httpx.Timeout(
+                    settings.llm_timeout,
+                    connect=settings.llm_connect_timeout
+                )
+            )
+            self._client = AsyncOpenAI(
+                api_key=settings.openai_api_key,
+                base_url=settings.openai_base_url or None,
+                http_client=self._http_client,
+                # 重试由CallPolicy统一执行
+                max_retries=0
+            )
+        return self._client
+
+    def cache_key(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> str:
+        """计算一次聊天补全调用的缓存键"""
+        return self.response_cache.make_key(
+            settings.openai_model, messages, max_tokens=max_tokens, temperature=temperature
+        )
+
+    def flight_key(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> str:
+        """合并并发调用的键：与缓存键相同，但消息内容先做空白与Unicode规范化"""
+        normalized = [
+            {"role": message["role"], "content": EmbeddingCache.normalize(message["content"])}
+            for message in messages
+        ]
+        return self.cache_key(normalized, max_tokens, temperature)
+
+    async def chat(self, messages: List[Dict[str, str]], max_tokens: int,
+                   temperature: float, timeout: Optional[float] = None,
+                   use_cache: bool = False, operation: str = "other",
+                   coalesce: Optional[bool] = None) -> str:
+        """
+        调用聊天补全接口
+
+        Args:
+            messages: 对话消息列表
+            max_tokens: 最大生成token数
+            temperature: 采样温度
+            timeout: 截止时间（秒，含重试），默认按operation取settings中的配置
+            use_cache: 是否读写响应缓存，仅适用于输出可复用的确定性提示词
+            operation: 调用类型，决定截止时间，并用于按类型统计token消耗与调用延迟
+            coalesce: 是否与进行中的相同调用共享结果，默认与use_cache相同；
+                同一提示词需要得到不同结果时（如批量生成题目）不能合并
+
+        Returns:
+            str: 模型返回的文本内容
+
+        Raises:
+            LLMCallError: 重试后仍失败、超出截止时间或熔断
+        """
+        cache_key = None
+        if use_cache and settings.response_cache_enabled:
+            cache_key = self.cache_key(messages, max_tokens, temperature)
+            cached = await self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        if not self._should_coalesce(use_cache, coalesce):
+            return await self._complete(messages, max_tokens, temperature, timeout, operation, cache_key)
+
+        key = self.flight_key(messages, max_tokens, temperature)
+        return await self.single_flight.do(
+            key, lambda: self._complete_shared(key, messages, max_tokens, temperature, timeout, operation, cache_key)
+        )
+
+    def _should_coalesce(self, use_cache: bool, coalesce: Optional[bool]) -> bool:
+        return settings.llm_coalesce_enabled and (use_cache if coalesce is None else coalesce)
+
+    async def _complete_shared(self, key: str, messages: List[Dict[str, str]], max_tokens: int,
+                               temperature: float, timeout: Optional[float], operation: str,
+                               cache_key: Optional[str]) -> str:
+        """进程内的首个调用方执行；配置了跨worker锁时，等待其他worker的相同调用后先查共享缓存"""
+        if cache_key is None:
+            return await self._complete(messages, max_tokens, temperature, timeout, operation, cache_key)
+        async with self.single_flight.across_workers(key, timeout or self.policy.deadline_for(operation)) as waited:
+            if waited:
+                cached = await self.response_cache.get(cache_key)
+                if cached is not None:
+                    self.single_flight.saved_across_workers()
+                    return cached
+            return await self._complete(messages, max_tokens, temperature, timeout, operation, cache_key)
+
+    async def _complete(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float,
+                        timeout: Optional[float], operation: str, cache_key: Optional[str]) -> str:
+        """实际调用上游接口"""
+        def request(attempt_timeout: float):
+            return self.client.chat.completions.create(
+                model=settings.openai_model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                timeout=attempt_timeout
+            )
+
+        with span("llm"):
+            response = await self.policy.call(operation, request, deadline=timeout)
+        usage = response.usage
+        if usage is not None:
+            prompt_tokens, completion_tokens = token_counters(operation)
+            prompt_tokens.inc(usage.prompt_tokens)
+            completion_tokens.inc(usage.completion_tokens)
+        content = response.choices[0].message.content or ""
+        if cache_key is not None and content:
+            await self.response_cache.put(cache_key, content)
+        return content
+
+    async def chat_stream(self, messages: List[Dict[str, str]], max_tokens: int,
+                          temperature: float, timeout: Optional[float] = None,
+                          use_cache: bool = False, operation: str = "other",
+                          coalesce: Optional[bool] = None) -> AsyncIterator[str]:
+        """
+        流式调用聊天补全接口，逐段返回生成的文本
+
+        缓存命中时一次性返回完整内容；完整生成结束后写入缓存。
+        与进行中的相同调用合并时，从头回放其已生成的片段后继续跟随。
+        流式响应不含usage字段，生成结束后按本地分词估算token消耗。
+        只在收到响应头之前重试，已开始输出后失败不重试（会重复输出），也不发出对冲请求。
+        """
+        cache_key = None
+        if use_cache and settings.response_cache_enabled:
+            cache_key = self.cache_key(messages, max_tokens, temperature)
+            cached = await self.response_cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        if not self._should_coalesce(use_cache, coalesce):
+            upstream = self._stream(messages, max_tokens, temperature, timeout, operation, cache_key)
+        else:
+            key = self.flight_key(messages, max_tokens, temperature)
+            upstream = self.single_flight.stream(
+                key, lambda: self._stream_shared(key, messages, max_tokens, temperature, timeout, operation, cache_key)
+            )
+        async for delta in upstream:
+            yield delta
+
+    async def _stream_shared(self, key: str, messages: List[Dict[str, str]], max_tokens: int,
+                             temperature: float, timeout: Optional[float], operation: str,
+                             cache_key: Optional[str]) -> AsyncIterator[str]:
+        """流式版本的 _complete_shared"""
+        if cache_key is None:
+            async for delta in self._stream(messages, max_tokens, temperature, timeout, operation, cache_key):
+                yield delta
+            return
+        async with self.single_flight.across_workers(key, timeout or self.policy.deadline_for(operation)) as waited:
+            if waited:
+                cached = await self.response_cache.get(cache_key)
+                if cached is not None:
+                    self.single_flight.saved_across_workers()
+                    yield cached
+                    return
+            async for delta in self._stream(messages, max_tokens, temperature, timeout, operation, cache_key):
+                yield delta
+
+    async def _stream(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float,
+                      timeout: Optional[float], operation: str, cache_key: Optional[str]) -> AsyncIterator[str]:
+        """实际调用上游流式接口"""
+        started = time.perf_counter()
+
+        def request(attempt_timeout: float):
+            # 截止时间只约束建立流（收到响应头）；之后每段输出的读取超时为llm_timeout
+            return self.client.chat.completions.create(
+                model=settings.openai_model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                timeout=settings.llm_timeout,
+                stream=True
+            )
+
+        stream = await self.policy.call(operation, request, deadline=timeout, hedge=False)
+
+        parts = []
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield delta
+        # 包含消费方处理各片段的时间
+        record_span("llm", time.perf_counter() - started)
+
+        content = "".join(parts)
+        prompt_tokens, completion_tokens = token_counters(operation)
+        prompt_tokens.inc(sum(count_tokens(message["content"]) for message in messages))
+        completion_tokens.inc(count_tokens(content))
+        if cache_key is not None and parts:
+            await self.response_cache.put(cache_key, content)
+
+    async def invalidate(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float):
+        """删除一次调用的缓存结果（例如返回内容无法解析时）"""
+        if settings.response_cache_enabled:
+            await self.response_cache.delete(self.cache_key(messages, max_tokens, temperature))
+
+    async def embed(self, texts: List[str], timeout: Optional[float] = None) -> List[List[float]]:
+        """
+        调用向量化接口
+
+        Args:
+            texts: 待向量化的文本列表（单次请求）
+            timeout: 截止时间（秒，含重试），默认使用embedding调用类型的配置
+
+        Returns:
+            List[List[float]]: 与输入顺序一致的向量列表
+        """
+        def request(attempt_timeout: float):
+            return self.client.embeddings.create(
+                model=settings.openai_embedding_model,
+                input=texts,
+                timeout=attempt_timeout
+            )
+
+        with span("embedding"):
+            response = await self.policy.call("embedding", request, deadline=timeout)
+        return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+    async def close(self):
+        """关闭连接池"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+        self._http_client = None
+        self._client = None
+        self.single_flight.close()
+
+
+# 创建全局LLM客户端实例
+llm_client = LLMClient()
@@ -0,0 +1,132 @@
+import os
+import re
+import json
+import zlib
+import hashlib
+import logging
+from typing import Dict, Any, Optional, Tuple
+from ..utils.lru_cache import LRUCache
+from ..core.config import settings
+from ..core.metrics import cache_counters
+
+logger = logging.getLogger(__name__)
+
+_DIGEST_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+
+class ParseCache:
+    """
+    文档解析结果缓存，按文件内容SHA-256寻址
+
+    解析结果（清理后的全文、分块、章节）以zlib压缩的JSON保存在磁盘上，
+    并在内存LRU中保留最近使用的结果。另外记录 (路径, 大小, mtime) -> 摘要 的映射，
+    文件未变化时无需重新计算哈希。
+    """
+
+    def __init__(self, cache_dir: str, memory_items: int = 256, enabled: bool = True):
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        self._memory = LRUCache(max_items=memory_items)
+        self._digests = LRUCache(max_items=max(memory_items, 1) * 4)
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory_hit_counter, self._disk_hit_counter, self._miss_counter = cache_counters("parsed_document")
+
+    def _artifact_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.json.z")
+
+    @staticmethod
+    def _stat_key(file_path: str) -> Tuple[str, int, int]:
+        stat = os.stat(file_path)
+        return os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns
+
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        """流式计算文件SHA-256"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def digest_for_path(self, file_path: str) -> str:
+        """返回文件内容摘要，文件大小和mtime未变化时直接复用上次结果"""
+        key = self._stat_key(file_path)
+        digest = self._digests.get(key)
+        if digest is None:
+            digest = self.hash_file(file_path)
+            self._digests.put(key, digest)
+        return digest
+
+    def remember_path(self, file_path: str, digest: str):
+        """记录文件路径对应的内容摘要"""
+        try:
+            self._digests.put(self._stat_key(file_path), digest)
+        except OSError:
+            pass
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        """读取解析结果，未命中时返回None"""
+        if not self.enabled or not _DIGEST_PATTERN.fullmatch(digest):
+            return None
+
+        result = self._memory.get(digest)
+        if result is not None:
+            self.hits += 1
+            self._memory_hit_counter.inc()
+            return result
+
+        try:
+            with open(self._artifact_path(digest), 'rb') as f:
+                result = json.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            self.misses += 1
+            self._miss_counter.inc()
+            return None
+        except Exception as e:
+            logger.warning(f"读取解析缓存失败: {str(e)}")
+            self.misses += 1
+            self._miss_counter.inc()
+            return None
+
+        self.disk_hits += 1
+        self._disk_hit_counter.inc()
+        self._memory.put(digest, result)
+        return result
+
+    def put(self, digest: str, result: Dict[str, Any]):
+        """写入解析结果，先写临时文件再原子替换"""
+        if not self.enabled:
+            return
+
+        self._memory.put(digest, result)
+        path = self._artifact_path(digest)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            payload = zlib.compress(json.dumps(result, ensure_ascii=False).encode('utf-8'))
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"写入解析缓存失败: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存命中统计"""
+        total = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits + self.disk_hits) / total if total else 0.0,
+            "memory_items": len(self._memory)
+        }
+
+
+# 创建全局解析缓存实例
+parse_cache = ParseCache(
+    settings.parse_cache_path,
+    memory_items=settings.parse_cache_memory_items,
+    enabled=settings.parse_cache_enabled
+)
@@ -0,0 +1,142 @@
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+from ..core.config import settings
+from ..core.metrics import HistogramChild
+from ..core.tracing import record_span
+
+logger = logging.getLogger(__name__)
+
+
+class ParseQueueFullError(RuntimeError):
+    """解析队列已满"""
+
+
+def _timed_call(fn: Callable, args: Tuple) -> Tuple[float, float, Any]:
+    """在执行器中调用fn，返回(开始时间, 耗时, 结果)；需为模块级函数以便进程池序列化"""
+    started_at = time.time()
+    result = fn(*args)
+    return started_at, time.time() - started_at, result
+
+
+class ParseExecutor:
+    """
+    文档解析执行器
+
+    CPU密集的文档解析在线程池或进程池中执行，不占用事件循环。排队中与执行中的
+    任务总数不超过 max_workers + max_queue，超出时立即拒绝而不是无限堆积。
+    进程池模式下提交的函数及参数必须可序列化。
+    """
+
+    def __init__(self, mode: str = "thread", max_workers: int = 4, max_queue: int = 32):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"不支持的解析执行器类型: {mode}")
+        self.mode = mode
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+        self.submitted = 0
+        self.rejected = 0
+        self.failed = 0
+        self.completed = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.parse_seconds_total = 0.0
+        self.parse_seconds_max = 0.0
+
+    @property
+    def executor(self) -> Executor:
+        """懒加载执行器"""
+        with self._lock:
+            if self._executor is None:
+                if self.mode == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="parse"
+                    )
+            return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        """排队等待执行的任务数"""
+        return max(self._pending - self.max_workers, 0)
+
+    async def run(self, fn: Callable, *args, timer: Optional[HistogramChild] = None) -> Any:
+        """
+        在执行器中运行解析函数
+
+        Args:
+            timer: 记录解析耗时（不含排队）的直方图，在事件循环线程中写入
+
+        Raises:
+            ParseQueueFullError: 排队任务已达上限
+        """
+        if self._pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise ParseQueueFullError("文档解析队列已满，请稍后重试")
+
+        self._pending += 1
+        self.submitted += 1
+        submitted_at = time.time()
+        try:
+            loop = asyncio.get_running_loop()
+            started_at, elapsed, result = await loop.run_in_executor(
+                self.executor, _timed_call, fn, args
+            )
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self._pending -= 1
+
+        wait = max(started_at - submitted_at, 0.0)
+        record_span("parse_wait", wait, end=time.perf_counter() - elapsed)
+        self.completed += 1
+        self.wait_seconds_total += wait
+        self.wait_seconds_max = max(self.wait_seconds_max, wait)
+        self.parse_seconds_total += elapsed
+        self.parse_seconds_max = max(self.parse_seconds_max, elapsed)
+        if timer is not None:
+            timer.observe(elapsed)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """执行器统计"""
+        completed = self.completed or 1
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._pending,
+            "queue_depth": self.queue_depth,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "wait_seconds_avg": self.wait_seconds_total / completed,
+            "wait_seconds_max": self.wait_seconds_max,
+            "parse_seconds_avg": self.parse_seconds_total / completed,
+            "parse_seconds_max": self.parse_seconds_max
+        }
+
+    def shutdown(self):
+        """关闭执行器"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# 创建全局解析执行器实例
+parse_executor = ParseExecutor(
+    mode=settings.parse_executor_mode,
+    max_workers=settings.parse_executor_workers,
+    max_queue=settings.parse_executor_queue_size
+)
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, List, Optional, Deque, Any
+from ..models.schemas import JobType
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 预生成题目时使用的通用候选人背景
+GENERIC_BACKGROUND = "通用候选人，不针对特定个人背景"
+
+
+class QuestionPool:
+    """
+    按岗位类型预生成的面试题池
+
+    每个JobType维护若干套已生成的题目，取用后低于低水位时由后台任务补充到高水位。
+    题池只存在于当前worker进程内，启动时不预生成：某个JobType首次被请求时实时生成并
+    开始后台补充，因此每个worker只为实际用到的岗位类型各调用至多high_watermark次模型。
+    """
+
+    def __init__(self, rag_service, low_watermark: int = 2, high_watermark: int = 5,
+                 num_questions: int = 5, refill_concurrency: int = 2):
+        self.rag_service = rag_service
+        self.low_watermark = low_watermark
+        self.high_watermark = max(high_watermark, low_watermark)
+        self.num_questions = num_questions
+        self._pools: Dict[JobType, Deque[List[Dict[str, Any]]]] = {job_type: deque() for job_type in JobType}
+        self._refill_tasks: Dict[JobType, asyncio.Task] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._refill_concurrency = refill_concurrency
+        self._running = False
+        self.hits = 0
+        self.misses = 0
+
+    def start(self):
+        """允许后台补充，需在事件循环中调用；各岗位类型在首次取用时才开始补充"""
+        self._running = True
+        self._semaphore = asyncio.Semaphore(self._refill_concurrency)
+
+    async def stop(self):
+        """停止后台补充"""
+        self._running = False
+        tasks = list(self._refill_tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._refill_tasks.clear()
+
+    def take(self, job_type: JobType) -> Optional[List[Dict[str, Any]]]:
+        """
+        取出一套题目
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: 题目列表，题池为空时返回None
+        """
+        pool = self._pools[job_type]
+        questions = pool.popleft() if pool else None
+        if questions is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        if len(pool) < self.low_watermark:
+            self._trigger_refill(job_type)
+        return questions
+
+    def _trigger_refill(self, job_type: JobType):
+        if not self._running:
+            return
+        task = self._refill_tasks.get(job_type)
+        if task is None or task.done():
+            self._refill_tasks[job_type] = asyncio.create_task(self._refill(job_type))
+
+    async def _refill(self, job_type: JobType):
+        """补充到高水位；生成失败时结束本轮，等下次取用时再触发"""
+        pool = self._pools[job_type]
+        while self._running and len(pool) < self.high_watermark:
+            async with self._semaphore:
+                try:
+                    questions = await self.rag_service.generate_interview_questions(
+                        job_type.value, GENERIC_BACKGROUND, num_questions=self.num_questions
+                    )
+                except Exception as e:
+                    logger.error(f"补充题池失败: {str(e)}")
+                    return
+            if not questions:
+                return
+            pool.append(questions)
+
+    def stats(self) -> Dict[str, Any]:
+        """题池状态"""
+        return {
+            "sizes": {job_type.value: len(pool) for job_type, pool in self._pools.items()},
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+def create_question_pool(rag_service) -> Optional[QuestionPool]:
+    """根据配置创建题池"""
+    if not settings.question_pool_enabled:
+        return None
+    return QuestionPool(
+        rag_service,
+        low_watermark=settings.question_pool_low_watermark,
+        high_watermark=settings.question_pool_high_watermark,
+        refill_concurrency=settings.question_pool_refill_concurrency
+    )
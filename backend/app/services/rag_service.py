@@ -1,115 +1,296 @@
 import os
 import json
 import logging
-from typing import List, Dict, Any
-import openai
+from typing import List, Dict, Any, Optional, AsyncIterator
+from .llm_client import LLMClient, llm_client
+from .call_policy import LLMCallError
+from .embedding_service import EmbeddingService
+from .vector_store import VectorStore, vector_store
 from ..core.config import settings
+from ..core.metrics import rag_duration, timed
+from ..core.tracing import span
+from ..utils.prompt_packer import PromptPacker
+from ..utils.json_parser import parse_model_output, parse_model_list
+from ..models.schemas import ResumeAnalysisResponse, InterviewQuestion, InterviewEvaluation
 
 logger = logging.getLogger(__name__)
 
-
-class RAGService:
-    """RAG服务，实现检索增强生成功能"""
-    
-    def __init__(self):
-        openai.api_key = settings.openai_api_key
-    
-    def analyze_resume(self, resume_text: str, job_description: str, 
-                      job_type: str) -> Dict[str, Any]:
-        """分析简历与岗位的匹配度"""
-        try:
-            prompt = f"""分析简历与岗位匹配度：
+ANALYSIS_PROMPT = """分析简历与岗位匹配度：
 
 岗位类型：{job_type}
 岗位描述：{job_description}
 简历内容：{resume_text}
-
-请分析：
+关键词匹配（系统已计算，无需输出）：已具备：{keywords_match}；缺失：{missing_keywords}
+{context}
+请结合关键词匹配结果分析：
 1. 总体匹配度评分（0-100分）
 2. 各章节评分
 3. 优势分析
 4. 改进建议
-5. 匹配和缺失的关键词
 
-以JSON格式返回。"""
-            
-            response = openai.ChatCompletion.create(
-                model=settings.openai_model,
-                messages=[
-                    {"role": "system", "content": "你是简历分析专家"},
-                    {"role": "user", "content": prompt}
-                ],
+以JSON格式返回，按以下顺序输出字段：
+overall_score（数字），section_scores（对象，键为education/experience/skills/projects/achievements），
+strengths、weaknesses、suggestions（字符串数组）。"""
+
+QUESTIONS_PROMPT = """生成{num_questions}个面试问题：
+
+岗位类型：{job_type}
+用户背景：{user_background}
+{context}
+请生成相关问题，以JSON格式返回。"""
+
+EVALUATION_PROMPT = """评估面试回答：
+
+岗位类型：{job_type}
+问题：{question}
+回答：{answer}
+{context}
+请评估并返回JSON格式结果。"""
+
+# 由本地计算、不由模型输出的分析字段
+LOCAL_ANALYSIS_FIELDS = ("keywords_match", "missing_keywords")
+
+PERSONALIZE_PROMPT = """根据候选人背景改写以下面试问题，使其更贴合候选人经历：
+
+岗位类型：{job_type}
+用户背景：{user_background}
+原问题：{questions}
+
+保持问题数量、顺序、类别和难度不变，以相同结构的JSON数组返回。"""
+
+
+class RAGService:
+    """RAG服务，实现检索增强生成功能"""
+    
+    def __init__(self, client: Optional[LLMClient] = None, store: Optional[VectorStore] = None):
+        self.llm = client or llm_client
+        self.vector_store = store or vector_store
+        self.embedding_service = EmbeddingService(self.llm)
+        self.packer = PromptPacker(settings.prompt_token_budget, settings.prompt_context_share)
+    
+    @staticmethod
+    def parse_analysis(content: str) -> Optional[Dict[str, Any]]:
+        """
+        解析简历分析输出，容忍代码块、前后说明文字、单引号和截断，并按ResumeAnalysisResponse逐字段校验
+
+        缺少总体评分时视为解析失败，返回None
+        """
+        return parse_model_output(content, ResumeAnalysisResponse,
+                                  exclude=LOCAL_ANALYSIS_FIELDS, required=("overall_score",))
+    
+    async def retrieve_context(self, query: str, top_k: Optional[int] = None) -> List[str]:
+        """从知识库检索与查询最相关的文本块"""
+        if not query.strip() or self.vector_store.count == 0:
+            return []
+        
+        try:
+            query_vector = await self.embedding_service.embed_query(query)
+            results = self.vector_store.search(query_vector, top_k or settings.top_k_retrieval)
+            return [result.text for result in results]
+        except Exception as e:
+            logger.warning(f"知识库检索失败: {str(e)}")
+            return []
+    
+    def _format_context(self, chunks: List[str]) -> str:
+        """将检索结果格式化为提示词片段"""
+        if not chunks:
+            return ""
+        references = "\n".join(f"[{i + 1}] {chunk}" for i, chunk in enumerate(chunks))
+        return f"\n参考资料：\n{references}\n"
+    
+    async def _build_analysis_messages(self, resume_text: str, job_description: str, job_type: str,
+                                       keywords: Optional[Dict[str, List[str]]] = None) -> List[Dict[str, str]]:
+        """构建简历分析的对话消息"""
+        keywords = keywords or {}
+        keyword_fields = {
+            name: "、".join(keywords.get(name, [])) or "无"
+            for name in ("keywords_match", "missing_keywords")
+        }
+        template = ANALYSIS_PROMPT
+        for name, value in keyword_fields.items():
+            template = template.replace("{" + name + "}", value)
+        
+        with span("retrieve"):
+            chunks = await self.retrieve_context(f"{job_type} {job_description}")
+        with span("prompt"):
+            fields, chunks = self.packer.pack(
+                template,
+                {"resume_text": resume_text, "job_description": job_description},
+                chunks,
+                weights={"resume_text": 2.0}
+            )
+            prompt = ANALYSIS_PROMPT.format(
+                job_type=job_type, context=self._format_context(chunks), **keyword_fields, **fields
+            )
+        
+        return [
+            {"role": "system", "content": "你是简历分析专家"},
+            {"role": "user", "content": prompt}
+        ]
+    
+    @timed(rag_duration.labels("analyze_resume"))
+    async def analyze_resume(self, resume_text: str, job_description: str, 
+                             job_type: str, use_cache: bool = True,
+                             keywords: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """
+        分析简历与岗位的匹配度
+        
+        keywords为本地计算的 {"keywords_match": [...], "missing_keywords": [...]}，
+        写入提示词供模型参考，模型不再输出这两个字段。
+        相同输入的并发分析（如重复提交）合并为一次模型调用，跳过缓存时也是如此。
+        """
+        try:
+            messages = await self._build_analysis_messages(resume_text, job_description, job_type, keywords)
+            content = await self.llm.chat(
+                messages=messages,
                 max_tokens=1500,
-                temperature=0.3
+                temperature=0.3,
+                use_cache=use_cache,
+                operation="analyze_resume",
+                coalesce=True
             )
             
-            try:
-                return json.loads(response.choices[0].message.content)
-            except:
+            with span("json_parse"):
+                result = self.parse_analysis(content)
+            if result is None:
+                # 无法解析的结果不保留在缓存中
+                await self.llm.invalidate(messages, max_tokens=1500, temperature=0.3)
                 return {"error": "解析失败"}
+            return result
                 
+        except LLMCallError:
+            # 模型服务不可用时由调用方返回503，而不是零分或空结果
+            raise
         except Exception as e:
             logger.error(f"简历分析失败: {str(e)}")
             return {"error": str(e)}
     
-    def generate_interview_questions(self, job_type: str, user_background: str, 
-                                   num_questions: int = 5) -> List[Dict[str, str]]:
+    @timed(rag_duration.labels("analyze_resume_stream"))
+    async def analyze_resume_stream(self, resume_text: str, job_description: str,
+                                    job_type: str, use_cache: bool = True,
+                                    keywords: Optional[Dict[str, List[str]]] = None) -> AsyncIterator[str]:
+        """流式分析简历，逐段返回模型输出的文本"""
+        messages = await self._build_analysis_messages(resume_text, job_description, job_type, keywords)
+        parts = []
+        async for delta in self.llm.chat_stream(
+            messages=messages,
+            max_tokens=1500,
+            temperature=0.3,
+            use_cache=use_cache,
+            operation="analyze_resume_stream",
+            coalesce=True
+        ):
+            parts.append(delta)
+            yield delta
+        
+        if self.parse_analysis("".join(parts)) is None:
+            await self.llm.invalidate(messages, max_tokens=1500, temperature=0.3)
+    
+    @timed(rag_duration.labels("generate_interview_questions"))
+    async def generate_interview_questions(self, job_type: str, user_background: str, 
+                                           num_questions: int = 5) -> List[Dict[str, str]]:
         """生成面试问题"""
         try:
-            prompt = f"""生成{num_questions}个面试问题：
-
-岗位类型：{job_type}
-用户背景：{user_background}
-
-请生成相关问题，以JSON格式返回。"""
+            chunks = await self.retrieve_context(f"{job_type} {user_background}")
+            fields, chunks = self.packer.pack(
+                QUESTIONS_PROMPT, {"user_background": user_background}, chunks
+            )
+            prompt = QUESTIONS_PROMPT.format(
+                num_questions=num_questions, job_type=job_type,
+                context=self._format_context(chunks), **fields
+            )
 
-            response = openai.ChatCompletion.create(
-                model=settings.openai_model,
+            content = await self.llm.chat(
                 messages=[
                     {"role": "system", "content": "你是专业面试官"},
                     {"role": "user", "content": prompt}
                 ],
                 max_tokens=1000,
-                temperature=0.7
+                temperature=0.7,
+                operation="generate_interview_questions"
             )
             
-            try:
-                result = json.loads(response.choices[0].message.content)
-                return result if isinstance(result, list) else []
-            except:
-                return []
+            with span("json_parse"):
+                return parse_model_list(content, InterviewQuestion, required=("question",)) or []
                 
+        except LLMCallError:
+            raise
         except Exception as e:
             logger.error(f"生成面试问题失败: {str(e)}")
             return []
-    
-    def evaluate_interview_answer(self, question: str, answer: str, 
-                                job_type: str) -> Dict[str, Any]:
-        """评估面试回答"""
-        try:
-            prompt = f"""评估面试回答：
-
-岗位类型：{job_type}
-问题：{question}
-回答：{answer}
 
-请评估并返回JSON格式结果。"""
+    @timed(rag_duration.labels("personalize_interview_questions"))
+    async def personalize_interview_questions(self, job_type: str, user_background: str,
+                                              questions: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """根据用户背景改写预生成的面试问题，数量与顺序保持不变"""
+        try:
+            questions_json = json.dumps(questions, ensure_ascii=False)
+            fields, _ = self.packer.pack(
+                PERSONALIZE_PROMPT.replace("{questions}", questions_json),
+                {"user_background": user_background}
+            )
+            prompt = PERSONALIZE_PROMPT.format(
+                job_type=job_type, questions=questions_json, **fields
+            )
 
-            response = openai.ChatCompletion.create(
-                model=settings.openai_model,
+            content = await self.llm.chat(
                 messages=[
-                    {"role": "system", "content": "你是面试评估专家"},
+                    {"role": "system", "content": "你是专业面试官"},
                     {"role": "user", "content": prompt}
                 ],
                 max_tokens=1000,
-                temperature=0.3
+                temperature=0.5,
+                operation="personalize_interview_questions"
+            )
+
+            result = parse_model_list(content, InterviewQuestion, required=("question",))
+            if result is None or len(result) != len(questions):
+                return []
+            return result
+
+        except Exception as e:
+            logger.error(f"个性化面试问题失败: {str(e)}")
+            return []
+
+    @timed(rag_duration.labels("evaluate_interview_answer"))
+    async def evaluate_interview_answer(self, question: str, answer: str, 
+                                        job_type: str, use_cache: bool = True) -> Dict[str, Any]:
+        """评估面试回答"""
+        try:
+            chunks = await self.retrieve_context(question)
+            fields, chunks = self.packer.pack(
+                EVALUATION_PROMPT,
+                {"question": question, "answer": answer},
+                chunks,
+                weights={"answer": 2.0}
+            )
+            prompt = EVALUATION_PROMPT.format(
+                job_type=job_type, context=self._format_context(chunks), **fields
+            )
+
+            messages = [
+                {"role": "system", "content": "你是面试评估专家"},
+                {"role": "user", "content": prompt}
+            ]
+            content = await self.llm.chat(
+                messages=messages,
+                max_tokens=1000,
+                temperature=0.3,
+                use_cache=use_cache,
+                operation="evaluate_interview_answer"
             )
             
-            try:
-                return json.loads(response.choices[0].message.content)
-            except:
+            with span("json_parse"):
+                result = parse_model_output(content, InterviewEvaluation,
+                                            exclude=("session_id",), required=("overall_score",))
+            if result is None:
+                # 无法解析的结果不保留在缓存中
+                await self.llm.invalidate(messages, max_tokens=1000, temperature=0.3)
                 return {"error": "解析失败"}
+            return result
                 
+        except LLMCallError:
+            raise
         except Exception as e:
             logger.error(f"面试评估失败: {str(e)}")
             return {"error": str(e)}
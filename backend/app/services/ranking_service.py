@@ -0,0 +1,282 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from .resume_service import ResumeService
+from .parse_executor import ParseQueueFullError
+from .keyword_engine import KeywordIndex, keyword_engine
+from ..models.schemas import (
+    ResumeRankRequest, ResumeRankResponse, RankedCandidate, ResumeAnalysisRequest
+)
+from ..utils.lru_cache import LRUCache
+from ..utils.tokenizer import truncate_to_tokens
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class JobProfile:
+    """预处理后的岗位描述"""
+    key: str
+    skills: List[str]
+    vector: Optional[np.ndarray]
+
+
+@dataclass
+class CorpusEntry:
+    """已上传简历的排序数据"""
+    filename: str
+    digest: str
+    text: str
+    # 技能 -> 出现次数
+    terms: Dict[str, int] = field(repr=False)
+
+
+class RankingService:
+    """
+    以岗位描述为中心的简历排序服务
+
+    岗位描述按哈希缓存预处理结果（技能要求、向量）；uploads目录下的简历按
+    (路径, 大小, mtime) 增量维护文本、向量矩阵和技能倒排索引。排序先用本地向量相似度和
+    技能BM25评分批量打分，只对前若干名调用模型深度分析。倒排索引只属于排序服务，
+    简历分析接口的技能排序不受已上传简历影响。
+    """
+
+    def __init__(self, resume_service: ResumeService):
+        self.resume_service = resume_service
+        self.rag_service = resume_service.rag_service
+        self.keyword_engine = keyword_engine
+        self.index = KeywordIndex()
+        self._profiles = LRUCache(max_items=settings.ranking_jd_cache_items)
+        # 文件状态 -> 简历数据
+        self._corpus: Dict[Tuple[str, int, int], CorpusEntry] = {}
+        # 简历摘要 -> 向量
+        self._vectors: Dict[str, np.ndarray] = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_digests: List[str] = []
+        self._indexed = set()
+        self._refresh_lock = asyncio.Lock()
+
+    @staticmethod
+    def job_key(job_description: str, job_type: str) -> str:
+        """岗位描述的缓存键"""
+        payload = f"{job_type}\n{' '.join(job_description.split())}"
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    async def prepare_job(self, job_description: str, job_type: str) -> JobProfile:
+        """预处理岗位描述，相同岗位描述只处理一次（向量化失败时下次重试）"""
+        key = self.job_key(job_description, job_type)
+        profile = self._profiles.get(key)
+        if profile is not None:
+            return profile
+
+        skills = self.keyword_engine.required_skills(job_description, job_type, index=self.index)
+        try:
+            vector = self._normalize(await self.rag_service.embedding_service.embed_query(
+                truncate_to_tokens(job_description, settings.ranking_embed_max_tokens)
+            ))
+        except Exception as e:
+            logger.warning(f"岗位描述向量化失败，仅使用技能匹配: {str(e)}")
+            vector = None
+
+        profile = JobProfile(key=key, skills=skills, vector=vector)
+        # 向量化失败的结果不缓存，下次排序时重新向量化
+        if vector is not None:
+            self._profiles.put(key, profile)
+        return profile
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _scan_uploads(self) -> List[Tuple[str, Tuple[str, int, int]]]:
+        """列出uploads目录下支持格式的简历及其文件状态"""
+        files = []
+        supported = self.resume_service.doc_processor.supported_formats
+        try:
+            with os.scandir(settings.uploads_path) as entries:
+                for entry in entries:
+                    if not entry.is_file() or os.path.splitext(entry.name)[1].lower() not in supported:
+                        continue
+                    stat = entry.stat()
+                    files.append((entry.path, (entry.path, stat.st_size, stat.st_mtime_ns)))
+        except FileNotFoundError:
+            pass
+        return files
+
+    async def refresh_corpus(self) -> List[CorpusEntry]:
+        """同步uploads目录，只解析和向量化新增或变化的简历"""
+        async with self._refresh_lock:
+            files = await asyncio.to_thread(self._scan_uploads)
+            current = {key: path for path, key in files}
+            corpus = {key: entry for key, entry in self._corpus.items() if key in current}
+
+            # 解析新增文件，并发数不超过解析执行器的线程数，避免挤占上传请求的队列
+            semaphore = asyncio.Semaphore(max(1, settings.parse_executor_workers))
+
+            async def load(key, path):
+                async with semaphore:
+                    try:
+                        parsed = await self.resume_service.get_parsed_document(path)
+                    except ParseQueueFullError:
+                        await asyncio.sleep(0.5)
+                        parsed = await self.resume_service.get_parsed_document(path)
+                if parsed.get("success"):
+                    text = parsed["full_text"]
+                    corpus[key] = CorpusEntry(os.path.basename(path), parsed["sha256"], text,
+                                              self.keyword_engine.extract(text))
+                else:
+                    logger.warning(f"跳过无法解析的简历 {path}: {parsed.get('error')}")
+
+            new_files = [(key, path) for key, path in current.items() if key not in corpus]
+            if new_files:
+                results = await asyncio.gather(*(load(key, path) for key, path in new_files),
+                                               return_exceptions=True)
+                for result in results:
+                    if isinstance(result, Exception):
+                        logger.warning(f"加载简历失败: {str(result)}")
+
+            self._corpus = corpus
+            entries = sorted(corpus.values(), key=lambda entry: entry.filename)
+            self._update_index(entries)
+            await self._update_matrix(entries)
+            return entries
+
+    def _update_index(self, entries: List[CorpusEntry]):
+        """同步技能倒排索引，同一内容的简历只索引一次"""
+        index = self.index
+        live = {entry.digest: entry for entry in entries}
+        for digest in self._indexed - live.keys():
+            index.remove(digest)
+        for digest, entry in live.items():
+            if digest not in index:
+                index.add(digest, entry.terms, len(entry.text))
+        self._indexed = set(live)
+
+    async def _update_matrix(self, entries: List[CorpusEntry]):
+        """为尚无向量的简历批量向量化，并重建向量矩阵"""
+        digests = [entry.digest for entry in entries]
+        if digests == self._matrix_digests and self._matrix is not None:
+            return
+
+        missing = {entry.digest: entry.text for entry in entries if entry.digest not in self._vectors}
+        if missing:
+            texts = [truncate_to_tokens(text, settings.ranking_embed_max_tokens) for text in missing.values()]
+            try:
+                vectors = self._normalize(await self.rag_service.embedding_service.embed(texts))
+                self._vectors.update(zip(missing, vectors))
+            except Exception as e:
+                logger.warning(f"简历向量化失败，仅使用技能匹配: {str(e)}")
+
+        live = set(digests)
+        self._vectors = {digest: vector for digest, vector in self._vectors.items() if digest in live}
+        if entries and all(digest in self._vectors for digest in digests):
+            self._matrix = np.vstack([self._vectors[digest] for digest in digests])
+            self._matrix_digests = digests
+        else:
+            self._matrix = None
+            self._matrix_digests = []
+
+    def score(self, profile: JobProfile,
+              entries: List[CorpusEntry]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        本地批量打分
+
+        Returns:
+            Tuple[np.ndarray, ...]: (综合评分0-100, 向量相似度, 技能覆盖率, 技能BM25评分)
+        """
+        count = len(entries)
+        similarity = np.zeros(count, dtype=np.float32)
+        has_vector = profile.vector is not None and self._matrix is not None and len(self._matrix) == count
+        if has_vector:
+            similarity = np.clip(self._matrix @ profile.vector, 0.0, 1.0)
+
+        coverage = np.zeros(count, dtype=np.float32)
+        keyword = np.zeros(count, dtype=np.float32)
+        if profile.skills:
+            hits = np.array(
+                [[skill in entry.terms for skill in profile.skills] for entry in entries],
+                dtype=np.float32
+            ).reshape(count, len(profile.skills))
+            coverage = hits.mean(axis=1)
+            keyword = self.index.bm25(profile.skills, [entry.digest for entry in entries])
+
+        # 向量不可用时无论有无技能要求都只能按技能评分，不能给相似度权重
+        if not has_vector:
+            weight = 0.0
+        elif not profile.skills:
+            weight = 1.0
+        else:
+            weight = settings.ranking_embedding_weight
+        scores = 100.0 * (weight * similarity + (1.0 - weight) * keyword)
+        return scores, similarity, coverage, keyword
+
+    async def rank(self, request: ResumeRankRequest) -> ResumeRankResponse:
+        """按岗位描述对已上传简历排序，并对前若干名进行深度分析"""
+        started = time.perf_counter()
+        profile = await self.prepare_job(request.job_description, request.job_type.value)
+        entries = await self.refresh_corpus()
+
+        candidates = []
+        if entries:
+            scores, similarity, coverage, keyword = self.score(profile, entries)
+            top_k = min(request.top_k, len(entries))
+            top = np.argpartition(-scores, top_k - 1)[:top_k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+
+            for index in top:
+                entry = entries[index]
+                candidates.append(RankedCandidate(
+                    filename=entry.filename,
+                    digest=entry.digest,
+                    score=round(float(scores[index]), 2),
+                    similarity=round(float(similarity[index]), 4),
+                    skill_coverage=round(float(coverage[index]), 4),
+                    keyword_score=round(float(keyword[index]), 4),
+                    matched_skills=[skill for skill in profile.skills if skill in entry.terms]
+                ))
+
+            await self._deep_analyze(request, candidates[:request.deep_analysis],
+                                     {entry.digest: entry.text for entry in entries})
+
+        return ResumeRankResponse(
+            total_candidates=len(entries),
+            skills=profile.skills,
+            candidates=candidates,
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 1)
+        )
+
+    async def _deep_analyze(self, request: ResumeRankRequest, candidates: List[RankedCandidate],
+                            texts: Dict[str, str]):
+        """以有限并发对候选人调用模型深度分析"""
+        semaphore = asyncio.Semaphore(max(1, settings.ranking_llm_concurrency))
+
+        async def analyze(candidate: RankedCandidate):
+            async with semaphore:
+                try:
+                    candidate.analysis = await self.resume_service.analyze_resume(ResumeAnalysisRequest(
+                        resume_text=texts[candidate.digest],
+                        target_job=request.target_job or request.job_type.value,
+                        job_description=request.job_description,
+                        job_type=request.job_type
+                    ))
+                except Exception as e:
+                    # 任一候选人深度分析失败时保留其本地评分，analysis为空，不影响其他候选人
+                    logger.warning(f"候选人深度分析失败 {candidate.filename}: {str(e)}")
+
+        await asyncio.gather(*(analyze(candidate) for candidate in candidates))
+
+    def stats(self) -> Dict[str, Any]:
+        """排序索引状态"""
+        return {
+            "resumes": len(self._corpus),
+            "vectors": len(self._vectors),
+            "indexed": len(self._indexed),
+            "job_profiles": len(self._profiles)
+        }
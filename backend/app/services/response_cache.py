@@ -0,0 +1,189 @@
+import os
+import json
+import asyncio
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import List, Dict, Any, Optional
+from ..utils.lru_cache import LRUCache
+from ..core.config import settings
+from ..core.metrics import cache_counters
+
+logger = logging.getLogger(__name__)
+
+# 每写入这么多字节检查一次磁盘容量
+_EVICTION_CHECK_BYTES = 1024 * 1024
+
+
+class ResponseCache:
+    """
+    LLM响应缓存
+
+    键为 sha256(模型, 消息列表, 采样参数)，分两级：
+        - 按字节数限制的进程内LRU
+        - 所有worker共享的SQLite磁盘缓存（WAL模式），内容zlib压缩
+    两级都按TTL过期，磁盘超过容量上限时按写入时间淘汰最旧的条目。
+    进程内LRU在事件循环中直接查询；磁盘读写和淘汰在线程池中执行，数据库被其他worker
+    锁住时只占用一个线程，不阻塞事件循环。
+    """
+
+    def __init__(self, db_path: str, ttl: int = 86400, memory_bytes: int = 32 * 1024 * 1024,
+                 disk_bytes: int = 512 * 1024 * 1024):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.disk_bytes = disk_bytes
+        self.memory = LRUCache(max_items=100000, max_bytes=memory_bytes,
+                               sizeof=lambda entry: entry[2])
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._written_since_check = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory_hit_counter, self._disk_hit_counter, self._miss_counter = cache_counters("llm_response")
+        self.bytes_written = 0
+        self.bytes_served = 0
+        self.evictions = 0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """懒加载数据库连接"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, content BLOB NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_created ON responses (created_at)")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, str]], **params) -> str:
+        """根据模型、消息和采样参数计算缓存键"""
+        payload = json.dumps(
+            {"model": model, "messages": messages, "params": params},
+            ensure_ascii=False, sort_keys=True, separators=(',', ':')
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        """读取缓存，过期或不存在时返回None"""
+        now = time.time()
+        entry = self.memory.get(key)
+        if entry is not None:
+            expires_at, content, size = entry
+            if expires_at > now:
+                self.memory_hits += 1
+                self._memory_hit_counter.inc()
+                self.bytes_served += size
+                return content
+            self.memory.pop(key)
+
+        row = await asyncio.to_thread(self._disk_get, key, now)
+        if row is None:
+            self.misses += 1
+            self._miss_counter.inc()
+            return None
+
+        raw = zlib.decompress(row[0])
+        content = raw.decode('utf-8')
+        self.memory.put(key, (row[1], content, len(raw)))
+        self.disk_hits += 1
+        self._disk_hit_counter.inc()
+        self.bytes_served += len(raw)
+        return content
+
+    async def put(self, key: str, content: str, ttl: Optional[int] = None):
+        """写入缓存，磁盘写入提交后返回，其他worker随即可读"""
+        now = time.time()
+        expires_at = now + (ttl if ttl is not None else self.ttl)
+        raw = content.encode('utf-8')
+        self.memory.put(key, (expires_at, content, len(raw)))
+        await asyncio.to_thread(self._disk_put, key, zlib.compress(raw), now, expires_at)
+
+    async def delete(self, key: str):
+        """删除缓存条目"""
+        self.memory.pop(key)
+        await asyncio.to_thread(self._disk_delete, key)
+
+    def _disk_get(self, key: str, now: float) -> Optional[tuple]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT content, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] <= now:
+                with self.conn:
+                    self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+        return row
+
+    def _disk_put(self, key: str, compressed: bytes, now: float, expires_at: float):
+        with self._lock:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, content, size, created_at, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, compressed, len(compressed), now, expires_at)
+                )
+            self.bytes_written += len(compressed)
+            self._written_since_check += len(compressed)
+            if self._written_since_check >= _EVICTION_CHECK_BYTES:
+                self._written_since_check = 0
+                self._evict(now)
+
+    def _disk_delete(self, key: str):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def _evict(self, now: float):
+        """删除过期条目，并在超过容量时按写入时间淘汰到容量的90%"""
+        with self.conn:
+            self.evictions += self.conn.execute(
+                "DELETE FROM responses WHERE expires_at <= ?", (now,)
+            ).rowcount
+
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total <= self.disk_bytes:
+                return
+
+            target = total - int(self.disk_bytes * 0.9)
+            freed = 0
+            stale_keys = []
+            for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY created_at"):
+                stale_keys.append((key,))
+                freed += size
+                if freed >= target:
+                    break
+            self.conn.executemany("DELETE FROM responses WHERE key = ?", stale_keys)
+            self.evictions += len(stale_keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """命中率和字节数统计"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "bytes_written": self.bytes_written,
+            "bytes_served": self.bytes_served,
+            "memory_bytes": self.memory.total_bytes,
+            "evictions": self.evictions
+        }
+
+
+# 创建全局响应缓存实例
+response_cache = ResponseCache(
+    settings.response_cache_path,
+    ttl=settings.response_cache_ttl,
+    memory_bytes=settings.response_cache_memory_bytes,
+    disk_bytes=settings.response_cache_disk_bytes
+)
@@ -1,136 +1,454 @@
 import os
+import time
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, AsyncIterator, Tuple
+import numpy as np
 from ..utils.document_processor import DocumentProcessor
+from ..utils.json_parser import IncrementalJSONParser
 from ..services.rag_service import RAGService
-from ..models.schemas import ResumeAnalysisRequest, ResumeAnalysisResponse
+from ..services.call_policy import LLMCallError
+from ..services.parse_executor import parse_executor
+from ..services.parse_cache import parse_cache
+from ..services.keyword_engine import keyword_engine
+from ..models.schemas import ResumeAnalysisRequest, ResumeAnalysisResponse, ResumeSection
+from ..utils.tokenizer import truncate_to_tokens
+from ..core.config import settings
+from ..core.metrics import parse_timer
+from ..core.tracing import span, record_span
 
 logger = logging.getLogger(__name__)
 
 
+def parse_resume_document(doc_processor: DocumentProcessor, file_path: str,
+                          content: Optional[bytes] = None) -> Dict[str, Any]:
+    """
+    提取、清理简历文本并识别章节
+    
+    模块级函数，可在解析执行器的进程池中运行。
+    
+    Args:
+        doc_processor: 文档处理器
+        file_path: 文件路径
+        content: 文件内容，提供时直接从内存解析，不再读取磁盘
+        
+    Returns:
+        Dict[str, Any]: 处理结果，timings字段为各阶段耗时（秒）
+    """
+    try:
+        # 检查文件格式
+        file_ext = os.path.splitext(file_path)[1].lower()
+        if file_ext not in doc_processor.supported_formats:
+            return {
+                "success": False,
+                "error": "不支持的文件格式",
+                "supported_formats": doc_processor.supported_formats
+            }
+        
+        # 提取文本
+        started = time.perf_counter()
+        if content is not None:
+            full_text, chunks = doc_processor.extract_text_from_bytes(content, file_path)
+        else:
+            full_text, chunks = doc_processor.extract_text(file_path)
+        extracted = time.perf_counter()
+        
+        # 清理文本并切分章节
+        cleaned_text = doc_processor.clean_text(full_text)
+        cleaned = time.perf_counter()
+        spans = doc_processor.section_parser.segment(cleaned_text)
+        sections = doc_processor.section_parser.materialize(cleaned_text, spans)
+        
+        return {
+            "success": True,
+            "full_text": cleaned_text,
+            "text_chunks": chunks,
+            "sections": sections,
+            "section_spans": [[span.section, span.start, span.end] for span in spans],
+            "file_size": len(content) if content is not None else os.path.getsize(file_path),
+            "filename": os.path.basename(file_path),
+            "timings": {
+                "extract_text": extracted - started,
+                "clean_text": cleaned - extracted,
+                "sections": time.perf_counter() - cleaned
+            }
+        }
+        
+    except Exception as e:
+        logger.error(f"文件处理失败: {str(e)}")
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+
 class ResumeService:
     """简历分析服务"""
     
+    # 流式分析时逐步推送的模型输出字段，关键词字段由本地计算后首先推送
+    STREAMED_FIELDS = (
+        "overall_score", "section_scores", "strengths", "weaknesses", "suggestions"
+    )
+    
+    # 快速评分时各章节达到满分所需的条目数
+    SECTION_EXPECTED_ITEMS = {
+        ResumeSection.EDUCATION: 1,
+        ResumeSection.EXPERIENCE: 3,
+        ResumeSection.SKILLS: 2,
+        ResumeSection.PROJECTS: 2,
+        ResumeSection.ACHIEVEMENTS: 1
+    }
+    
+    # 快速评分时同时考察岗位技能命中的章节
+    KEYWORD_SECTIONS = (ResumeSection.EXPERIENCE, ResumeSection.SKILLS, ResumeSection.PROJECTS)
+    
+    # 快速评分同时在后台进行的向量化数上限，超过时不再为缓存未命中的请求补算向量
+    MAX_BACKGROUND_EMBEDDINGS = 32
+    
     def __init__(self):
-        self.doc_processor = DocumentProcessor()
+        self.doc_processor = DocumentProcessor(
+            pdf_max_pages=settings.pdf_max_pages,
+            pdf_max_text_bytes=settings.pdf_max_text_bytes,
+            pdf_parallel_min_pages=settings.pdf_parallel_min_pages,
+            pdf_process_workers=settings.pdf_process_workers
+        )
         self.rag_service = RAGService()
+        self.keyword_engine = keyword_engine
+        # 快速评分超时后仍在后台进行的向量化任务，完成后结果进入向量缓存
+        self._background_embeddings: set = set()
+    
+    def match_keywords(self, resume_text: str, request: ResumeAnalysisRequest) -> Dict[str, List[str]]:
+        """本地计算简历命中和缺失的岗位关键词"""
+        match = self.keyword_engine.match(resume_text, request.job_description or "", request.job_type)
+        return {"keywords_match": match.matched, "missing_keywords": match.missing}
     
-    def analyze_resume(self, request: ResumeAnalysisRequest) -> ResumeAnalysisResponse:
+    async def analyze_resume(self, request: ResumeAnalysisRequest,
+                             use_cache: bool = True) -> ResumeAnalysisResponse:
         """
         分析简历与岗位的匹配度
         
         Args:
             request: 简历分析请求
+            use_cache: 是否允许复用相同输入的缓存分析结果
             
         Returns:
             ResumeAnalysisResponse: 分析结果
+
+        Raises:
+            LLMCallError: 模型服务不可用，不返回零分结果
         """
         try:
             # 清理简历文本
-            cleaned_resume = self.doc_processor.clean_text(request.resume_text)
+            with span("clean_text"):
+                cleaned_resume = self.doc_processor.clean_text(request.resume_text)
             
-            # 提取简历章节
-            sections = self.doc_processor.extract_resume_sections(cleaned_resume)
+            # 本地匹配关键词
+            with span("keywords"):
+                keywords = self.match_keywords(cleaned_resume, request)
             
             # 使用RAG服务分析简历
-            analysis_result = self.rag_service.analyze_resume(
+            analysis_result = await self.rag_service.analyze_resume(
                 cleaned_resume,
                 request.job_description or "",
-                request.job_type.value
+                request.job_type.value,
+                use_cache=use_cache,
+                keywords=keywords
             )
             
             # 处理分析结果
             if "error" in analysis_result:
-                return self._create_error_response(analysis_result["error"])
+                return self._create_error_response(analysis_result["error"], keywords)
             
             # 构建响应
+            return self._build_response(analysis_result, keywords)
+            
+        except LLMCallError:
+            raise
+        except Exception as e:
+            logger.error(f"简历分析失败: {str(e)}")
+            return self._create_error_response(str(e))
+    
+    async def analyze_resume_fast(self, request: ResumeAnalysisRequest) -> ResumeAnalysisResponse:
+        """
+        快速评分，不调用对话模型
+        
+        总体评分由章节完整度、岗位关键词覆盖率和与岗位描述的向量相似度加权得到，
+        缺少某项信号时按其余权重归一化；章节评分由条目完整度和章节内的技能命中率得到。
+        优势、不足和建议等叙述性字段为空，需要时使用完整模式。
+        
+        Args:
+            request: 简历分析请求
+            
+        Returns:
+            ResumeAnalysisResponse: 分析结果
+        """
+        try:
+            cleaned_resume = self.doc_processor.clean_text(request.resume_text)
+            sections = self.doc_processor.extract_resume_sections(cleaned_resume)
+            match = self.keyword_engine.match(cleaned_resume, request.job_description or "", request.job_type)
+            required = match.required
+            
+            section_scores = {}
+            fills = []
+            for section, expected in self.SECTION_EXPECTED_ITEMS.items():
+                items = sections.get(section.value, [])
+                fill = min(1.0, len(items) / expected)
+                fills.append(fill)
+                score = fill
+                if section in self.KEYWORD_SECTIONS and required:
+                    found = self.keyword_engine.extract("\n".join(items), request.job_type)
+                    score = 0.5 * fill + 0.5 * sum(skill in found for skill in required) / len(required)
+                section_scores[section] = round(100.0 * score, 1)
+            
+            keyword_weight = settings.fast_score_keyword_weight
+            embedding_weight = settings.fast_score_embedding_weight
+            signals = [
+                (sum(fills) / len(fills), max(0.0, 1.0 - keyword_weight - embedding_weight)),
+                (len(match.matched) / len(required) if required else None, keyword_weight),
+                (await self._embedding_similarity(cleaned_resume, request), embedding_weight)
+            ]
+            signals = [(value, weight) for value, weight in signals if value is not None and weight > 0]
+            total_weight = sum(weight for _, weight in signals)
+            overall = sum(value * weight for value, weight in signals) / total_weight if total_weight else 0.0
+            
             return ResumeAnalysisResponse(
-                overall_score=analysis_result.get("overall_score", 0),
-                section_scores=analysis_result.get("section_scores", {}),
-                strengths=analysis_result.get("strengths", []),
-                weaknesses=analysis_result.get("weaknesses", []),
-                suggestions=analysis_result.get("suggestions", []),
-                keywords_match=analysis_result.get("keywords_match", []),
-                missing_keywords=analysis_result.get("missing_keywords", [])
+                overall_score=round(100.0 * overall, 1),
+                section_scores=section_scores,
+                strengths=[],
+                weaknesses=[],
+                suggestions=[],
+                keywords_match=match.matched,
+                missing_keywords=match.missing
             )
             
         except Exception as e:
-            logger.error(f"简历分析失败: {str(e)}")
+            logger.error(f"快速评分失败: {str(e)}")
             return self._create_error_response(str(e))
     
-    def _create_error_response(self, error_message: str) -> ResumeAnalysisResponse:
-        """创建错误响应"""
+    async def _embedding_similarity(self, resume_text: str, request: ResumeAnalysisRequest) -> Optional[float]:
+        """
+        简历与岗位描述的向量余弦相似度，向量化失败或超时返回None
+
+        向量缓存命中时立即返回；未命中时最多等待 fast_score_embed_timeout（几十毫秒），
+        超时后本次忽略相似度，向量化在后台继续完成并写入缓存，同一简历再次评分时即可使用。
+        """
+        query = request.job_description or request.target_job
+        if not query.strip() or not resume_text.strip():
+            return None
+        
+        texts = [
+            truncate_to_tokens(query, settings.ranking_embed_max_tokens),
+            truncate_to_tokens(resume_text, settings.ranking_embed_max_tokens)
+        ]
+        if len(self._background_embeddings) >= self.MAX_BACKGROUND_EMBEDDINGS:
+            logger.warning("快速评分后台向量化任务过多，忽略相似度")
+            return None
+        task = asyncio.create_task(self.rag_service.embedding_service.embed(texts))
+        self._background_embeddings.add(task)
+        task.add_done_callback(self._finish_background_embedding)
+        try:
+            done, _ = await asyncio.wait({task}, timeout=settings.fast_score_embed_timeout)
+            if not done:
+                logger.info("快速评分向量化未在时限内完成，忽略相似度，后台继续向量化")
+                return None
+            vectors = task.result()
+        except Exception as e:
+            logger.warning(f"快速评分向量化失败，忽略相似度: {str(e) or type(e).__name__}")
+            return None
+        
+        norms = np.linalg.norm(vectors, axis=1)
+        if not np.all(norms > 0):
+            return None
+        return float(np.clip(vectors[0] @ vectors[1] / (norms[0] * norms[1]), 0.0, 1.0))
+    
+    def _finish_background_embedding(self, task: asyncio.Task):
+        self._background_embeddings.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"后台向量化失败: {str(task.exception())}")
+    
+    async def analyze_resume_stream(self, request: ResumeAnalysisRequest,
+                                    use_cache: bool = True) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        流式分析简历
+        
+        Args:
+            request: 简历分析请求
+            use_cache: 是否允许复用相同输入的缓存分析结果
+            
+        Yields:
+            Tuple[str, Any]: (事件类型, 数据)，事件类型为：
+                token   - 模型新生成的文本片段
+                partial - 本次新解析出或发生变化的字段
+                result  - 最终校验后的ResumeAnalysisResponse
+                error   - 模型服务不可用（重试后仍失败、超时或熔断），含retry_after秒数，不再有result
+        """
+        try:
+            cleaned_resume = self.doc_processor.clean_text(request.resume_text)
+            keywords = self.match_keywords(cleaned_resume, request)
+            yield "partial", keywords
+            
+            parser = IncrementalJSONParser(expect=dict)
+            emitted: Dict[str, Any] = {}
+            parts = []
+            
+            async for delta in self.rag_service.analyze_resume_stream(
+                cleaned_resume,
+                request.job_description or "",
+                request.job_type.value,
+                use_cache=use_cache,
+                keywords=keywords
+            ):
+                parts.append(delta)
+                yield "token", delta
+                
+                partial = parser.feed(delta)
+                if isinstance(partial, dict):
+                    changed = {
+                        field: value for field, value in partial.items()
+                        if field in self.STREAMED_FIELDS and emitted.get(field) != value
+                    }
+                    if changed:
+                        emitted.update(changed)
+                        yield "partial", changed
+            
+            with span("json_parse"):
+                analysis_result = self.rag_service.parse_analysis("".join(parts))
+            
+            if analysis_result is None:
+                yield "result", self._create_error_response("解析失败", keywords)
+            else:
+                yield "result", self._build_response(analysis_result, keywords)
+                
+        except LLMCallError as e:
+            logger.error(f"流式简历分析失败: {str(e)}")
+            yield "error", {"error": str(e), "retry_after": e.retry_after}
+        except Exception as e:
+            logger.error(f"流式简历分析失败: {str(e)}")
+            yield "result", self._create_error_response(str(e))
+    
+    def _build_response(self, analysis_result: Dict[str, Any],
+                        keywords: Optional[Dict[str, List[str]]] = None) -> ResumeAnalysisResponse:
+        """根据模型返回的字段构建响应，关键词以本地计算结果为准"""
+        keywords = keywords or {}
+        return ResumeAnalysisResponse(
+            overall_score=analysis_result.get("overall_score", 0),
+            section_scores=analysis_result.get("section_scores", {}),
+            strengths=analysis_result.get("strengths", []),
+            weaknesses=analysis_result.get("weaknesses", []),
+            suggestions=analysis_result.get("suggestions", []),
+            keywords_match=keywords.get("keywords_match", analysis_result.get("keywords_match", [])),
+            missing_keywords=keywords.get("missing_keywords", analysis_result.get("missing_keywords", []))
+        )
+    
+    def _create_error_response(self, error_message: str,
+                               keywords: Optional[Dict[str, List[str]]] = None) -> ResumeAnalysisResponse:
+        """创建错误响应，已计算的本地关键词仍然返回"""
+        keywords = keywords or {}
         return ResumeAnalysisResponse(
             overall_score=0,
             section_scores={},
             strengths=[],
             weaknesses=[error_message],
             suggestions=["请检查输入数据格式是否正确"],
-            keywords_match=[],
-            missing_keywords=[]
+            keywords_match=keywords.get("keywords_match", []),
+            missing_keywords=keywords.get("missing_keywords", [])
         )
     
-    def process_uploaded_file(self, file_path: str) -> Dict[str, Any]:
+    def process_uploaded_file(self, file_path: str, content: Optional[bytes] = None) -> Dict[str, Any]:
         """
         处理上传的文件
         
         Args:
             file_path: 文件路径
+            content: 文件内容，提供时直接从内存解析，不再读取磁盘
             
         Returns:
             Dict[str, Any]: 处理结果
         """
-        try:
-            # 检查文件格式
-            if not self._is_supported_format(file_path):
-                return {
-                    "success": False,
-                    "error": "不支持的文件格式",
-                    "supported_formats": self.doc_processor.supported_formats
-                }
-            
-            # 提取文本
-            full_text, chunks = self.doc_processor.extract_text(file_path)
-            
-            # 清理文本
-            cleaned_text = self.doc_processor.clean_text(full_text)
-            
-            # 提取章节
-            sections = self.doc_processor.extract_resume_sections(cleaned_text)
-            
-            return {
-                "success": True,
-                "full_text": cleaned_text,
-                "text_chunks": chunks,
-                "sections": sections,
-                "file_size": os.path.getsize(file_path),
-                "filename": os.path.basename(file_path)
-            }
+        return parse_resume_document(self.doc_processor, file_path, content)
+    
+    async def parse_uploaded_file(self, file_path: str, content: Optional[bytes] = None) -> Dict[str, Any]:
+        """
+        在解析执行器中处理上传的文件
+        
+        Raises:
+            ParseQueueFullError: 解析队列已满
+        """
+        result = await parse_executor.run(
+            parse_resume_document, self.doc_processor, file_path, content,
+            timer=parse_timer(os.path.splitext(file_path)[1].lower())
+        )
+        # 执行器中测得的各阶段依次执行、在返回前结束，按顺序补记到当前请求
+        timings = result.pop("timings", {})
+        end = time.perf_counter() - sum(timings.values())
+        for name, duration in timings.items():
+            end += duration
+            record_span(name, duration, end=end)
+        return result
+    
+    async def get_parsed_document(self, file_path: str, content: Optional[bytes] = None,
+                                  digest: Optional[str] = None) -> Dict[str, Any]:
+        """
+        获取文档解析结果，相同内容的文档只解析一次
+        
+        Args:
+            file_path: 文件路径
+            content: 文件内容，提供时直接从内存解析
+            digest: 文件内容SHA-256，已知时跳过哈希计算
             
-        except Exception as e:
-            logger.error(f"文件处理失败: {str(e)}")
-            return {
-                "success": False,
-                "error": str(e)
-            }
+        Returns:
+            Dict[str, Any]: 与process_uploaded_file相同的处理结果，另含sha256字段
+        
+        Raises:
+            ParseQueueFullError: 解析队列已满
+        """
+        if digest is None:
+            if content is not None:
+                digest = hashlib.sha256(content).hexdigest()
+            else:
+                digest = await asyncio.to_thread(parse_cache.digest_for_path, file_path)
+        
+        cached = parse_cache.get(digest)
+        if cached is not None:
+            result = dict(cached)
+        else:
+            result = await self.parse_uploaded_file(file_path, content)
+            if not result["success"]:
+                return result
+            result["sha256"] = digest
+            # 缓存内容与文件名无关，同一份简历以不同文件名上传时共用
+            parse_cache.put(digest, {k: v for k, v in result.items() if k != "filename"})
+        
+        parse_cache.remember_path(file_path, digest)
+        result["filename"] = os.path.basename(file_path)
+        return result
+    
+    def get_cached_document(self, digest: str) -> Optional[Dict[str, Any]]:
+        """按内容摘要读取已缓存的解析结果，不存在时返回None"""
+        cached = parse_cache.get(digest)
+        return dict(cached) if cached is not None else None
     
     def _is_supported_format(self, file_path: str) -> bool:
         """检查文件格式是否支持"""
         file_ext = os.path.splitext(file_path)[1].lower()
         return file_ext in self.doc_processor.supported_formats
     
-    def get_resume_summary(self, resume_text: str) -> Dict[str, Any]:
+    def get_resume_summary(self, resume_text: str,
+                           sections: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
         """
         获取简历摘要信息
         
         Args:
             resume_text: 简历文本
+            sections: 已提取的章节，未提供时从文本中提取
             
         Returns:
             Dict[str, Any]: 摘要信息
         """
         try:
-            sections = self.doc_processor.extract_resume_sections(resume_text)
+            if sections is None:
+                sections = self.doc_processor.extract_resume_sections(resume_text)
             
             summary = {
                 "total_length": len(resume_text),
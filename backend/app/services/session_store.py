@@ -0,0 +1,361 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Optional, List, Tuple
+from ..models.schemas import InterviewSession, InterviewQuestion
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore(ABC):
+    """
+    面试会话存储接口
+
+    会话数据格式：
+        {'session': InterviewSession, 'answers': [...], 'current_question': int}
+    各回答的评估结果和个性化后的题目单独存储，避免后台任务与提交回答互相覆盖；
+    读取会话时个性化题目已合并到 session.questions。
+    超过session_ttl秒未更新的会话连同评估结果在写入时顺带清理，0表示不过期。
+    """
+
+    # 两次清理过期会话之间的最短秒数
+    PURGE_INTERVAL = 60.0
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """读取会话数据，不存在时返回None"""
+
+    @abstractmethod
+    async def save(self, session_id: str, session_data: Dict[str, Any]):
+        """保存会话数据"""
+
+    @abstractmethod
+    async def delete(self, session_id: str):
+        """删除会话及其评估结果"""
+
+    @abstractmethod
+    def get_evaluations(self, session_id: str) -> Dict[int, Dict[str, Any]]:
+        """读取会话中各回答的评估结果 {问题索引: 评估}"""
+
+    @abstractmethod
+    async def save_evaluation(self, session_id: str, question_index: int, evaluation: Dict[str, Any]):
+        """保存单个回答的评估结果"""
+
+    @abstractmethod
+    async def save_personalized_questions(self, session_id: str, from_index: int,
+                                          questions: List[InterviewQuestion]):
+        """
+        保存个性化后的题目，替换从from_index开始的题目
+
+        仅当会话的当前问题仍在from_index之前（题目尚未展示）时生效，否则忽略。
+        """
+
+    @abstractmethod
+    def count(self) -> int:
+        """会话总数"""
+
+    @staticmethod
+    def _apply_personalized(session_data: Dict[str, Any], from_index: int,
+                            questions: List[InterviewQuestion]) -> Dict[str, Any]:
+        session = session_data['session']
+        session.questions[from_index:from_index + len(questions)] = questions
+        return session_data
+
+    async def close(self):
+        """释放资源，写入尚未落盘的数据"""
+
+
+class InMemorySessionStore(SessionStore):
+    """进程内会话存储，适用于单worker部署"""
+
+    def __init__(self, session_ttl: float = 0):
+        self.session_ttl = session_ttl
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._evaluations: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        self._updated_at: Dict[str, float] = {}
+        self._last_purge = 0.0
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return self._sessions.get(session_id)
+
+    async def save_personalized_questions(self, session_id: str, from_index: int,
+                                          questions: List[InterviewQuestion]):
+        session_data = self._sessions.get(session_id)
+        if session_data is not None and session_data['current_question'] < from_index:
+            self._apply_personalized(session_data, from_index, questions)
+
+    async def save(self, session_id: str, session_data: Dict[str, Any]):
+        now = time.time()
+        self._sessions[session_id] = session_data
+        self._updated_at[session_id] = now
+        if self.session_ttl > 0 and now - self._last_purge >= self.PURGE_INTERVAL:
+            self._last_purge = now
+            expired = [sid for sid, updated_at in self._updated_at.items() if updated_at < now - self.session_ttl]
+            for sid in expired:
+                self._remove(sid)
+            if expired:
+                logger.info(f"清理过期会话 {len(expired)} 个")
+
+    async def delete(self, session_id: str):
+        self._remove(session_id)
+
+    def _remove(self, session_id: str):
+        self._sessions.pop(session_id, None)
+        self._evaluations.pop(session_id, None)
+        self._updated_at.pop(session_id, None)
+
+    def get_evaluations(self, session_id: str) -> Dict[int, Dict[str, Any]]:
+        return dict(self._evaluations.get(session_id, {}))
+
+    async def save_evaluation(self, session_id: str, question_index: int, evaluation: Dict[str, Any]):
+        if session_id in self._sessions:
+            self._evaluations.setdefault(session_id, {})[question_index] = evaluation
+
+    def count(self) -> int:
+        return len(self._sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    基于SQLite（WAL模式）的会话存储，多个worker进程共享
+
+    读取为主键查询；写入先进入进程内待写队列，同一时间窗口内的写入合并为一个事务
+    （group commit），调用方等待事务提交后返回，因此写入对其他worker立即可见。
+    写事务在线程池中执行并独占写连接；读取使用每个线程各自的只读连接，不与写入共用锁，
+    WAL模式下读取也不等待写事务，事件循环上的读取只是一次索引查询。
+    """
+
+    # 只读连接等待数据库锁的秒数；WAL模式下仅在检查点等少数情况下需要等待
+    READ_TIMEOUT = 1.0
+
+    def __init__(self, db_path: str, flush_interval: float = 0.002, session_ttl: float = 0):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.session_ttl = session_ttl
+        self._last_purge = 0.0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._pending_sessions: Dict[str, Optional[str]] = {}
+        self._pending_evaluations: Dict[Tuple[str, int], str] = {}
+        # 个性化题目是条件写入，提交前不可见
+        self._pending_personalized: Dict[str, Tuple[int, str]] = {}
+        # 正在提交的批次，提交完成前读取仍以它为准
+        self._inflight_sessions: Dict[str, Optional[str]] = {}
+        self._inflight_evaluations: Dict[Tuple[str, int], str] = {}
+        self._flush_future: Optional[asyncio.Future] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """懒加载数据库连接"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS evaluations ("
+                "session_id TEXT NOT NULL, question_index INTEGER NOT NULL, data TEXT NOT NULL, "
+                "PRIMARY KEY (session_id, question_index))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS personalized_questions ("
+                "session_id TEXT PRIMARY KEY, from_index INTEGER NOT NULL, data TEXT NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    @property
+    def reader(self) -> sqlite3.Connection:
+        """当前线程的只读连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.conn  # 确保数据库文件和表已创建
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=self.READ_TIMEOUT)
+            conn.execute("PRAGMA query_only=ON")
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    @staticmethod
+    def _dumps(session_data: Dict[str, Any]) -> str:
+        data = dict(session_data)
+        data['session'] = session_data['session'].dict()
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+    @staticmethod
+    def _loads(raw: str) -> Dict[str, Any]:
+        data = json.loads(raw)
+        data['session'] = InterviewSession.parse_obj(data['session'])
+        return data
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        row = self.reader.execute(
+            "SELECT s.data, p.from_index, p.data FROM sessions s "
+            "LEFT JOIN personalized_questions p ON p.session_id = s.session_id "
+            "WHERE s.session_id = ?", (session_id,)
+        ).fetchone()
+        raw, from_index, personalized = row if row else (None, None, None)
+        if session_id in self._pending_sessions:
+            raw = self._pending_sessions[session_id]
+        elif session_id in self._inflight_sessions:
+            raw = self._inflight_sessions[session_id]
+        if raw is None:
+            return None
+        session_data = self._loads(raw)
+        if personalized is not None:
+            questions = [InterviewQuestion.parse_obj(q) for q in json.loads(personalized)]
+            self._apply_personalized(session_data, from_index, questions)
+        return session_data
+
+    async def save(self, session_id: str, session_data: Dict[str, Any]):
+        self._pending_sessions[session_id] = self._dumps(session_data)
+        await self._schedule_flush()
+
+    async def delete(self, session_id: str):
+        self._pending_sessions[session_id] = None
+        await self._schedule_flush()
+
+    def get_evaluations(self, session_id: str) -> Dict[int, Dict[str, Any]]:
+        rows = self.reader.execute(
+            "SELECT question_index, data FROM evaluations WHERE session_id = ?", (session_id,)
+        ).fetchall()
+        evaluations = {index: json.loads(raw) for index, raw in rows}
+        for pending in (self._inflight_evaluations, self._pending_evaluations):
+            for (pending_id, index), raw in pending.items():
+                if pending_id == session_id:
+                    evaluations[index] = json.loads(raw)
+        return evaluations
+
+    async def save_evaluation(self, session_id: str, question_index: int, evaluation: Dict[str, Any]):
+        self._pending_evaluations[(session_id, question_index)] = json.dumps(
+            evaluation, ensure_ascii=False, default=str
+        )
+        await self._schedule_flush()
+
+    async def save_personalized_questions(self, session_id: str, from_index: int,
+                                          questions: List[InterviewQuestion]):
+        self._pending_personalized[session_id] = (from_index, json.dumps(
+            [question.dict() for question in questions], ensure_ascii=False, default=str
+        ))
+        await self._schedule_flush()
+
+    def count(self) -> int:
+        return self.reader.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    async def _schedule_flush(self):
+        """加入当前批次，等待批次提交"""
+        if self._flush_future is None:
+            loop = asyncio.get_running_loop()
+            self._flush_future = loop.create_future()
+            loop.call_later(self.flush_interval, lambda: asyncio.ensure_future(self._flush()))
+        await asyncio.shield(self._flush_future)
+
+    async def _flush(self):
+        future, self._flush_future = self._flush_future, None
+        sessions, self._pending_sessions = self._pending_sessions, {}
+        evaluations, self._pending_evaluations = self._pending_evaluations, {}
+        personalized, self._pending_personalized = self._pending_personalized, {}
+        if not sessions and not evaluations and not personalized:
+            if future is not None and not future.done():
+                future.set_result(None)
+            return
+        
+        self._inflight_sessions.update(sessions)
+        self._inflight_evaluations.update(evaluations)
+        try:
+            await asyncio.to_thread(self._write, sessions, evaluations, personalized)
+        except Exception as e:
+            logger.error(f"会话批量写入失败: {str(e)}")
+            if future is not None and not future.done():
+                future.set_exception(e)
+            return
+        finally:
+            for session_id, raw in sessions.items():
+                if self._inflight_sessions.get(session_id, raw) is raw:
+                    self._inflight_sessions.pop(session_id, None)
+            for key, raw in evaluations.items():
+                if self._inflight_evaluations.get(key, raw) is raw:
+                    self._inflight_evaluations.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(None)
+
+    def _write(self, sessions: Dict[str, Optional[str]], evaluations: Dict[Tuple[str, int], str],
+               personalized: Dict[str, Tuple[int, str]]):
+        now = time.time()
+        upserts = [(sid, raw, now) for sid, raw in sessions.items() if raw is not None]
+        deletes = [(sid,) for sid, raw in sessions.items() if raw is None]
+        with self._lock, self.conn:
+            if upserts:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO sessions (session_id, data, updated_at) VALUES (?, ?, ?)",
+                    upserts
+                )
+            if evaluations:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO evaluations (session_id, question_index, data) VALUES (?, ?, ?)",
+                    [(sid, index, raw) for (sid, index), raw in evaluations.items()]
+                )
+            if personalized:
+                # 以事务内最新的当前问题为准，其他worker已展示的题目不再替换
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO personalized_questions (session_id, from_index, data) "
+                    "SELECT session_id, ?, ? FROM sessions "
+                    "WHERE session_id = ? AND json_extract(data, '$.current_question') < ?",
+                    [(from_index, raw, sid, from_index) for sid, (from_index, raw) in personalized.items()]
+                )
+            if deletes:
+                self.conn.executemany("DELETE FROM sessions WHERE session_id = ?", deletes)
+                self.conn.executemany("DELETE FROM evaluations WHERE session_id = ?", deletes)
+                self.conn.executemany("DELETE FROM personalized_questions WHERE session_id = ?", deletes)
+            if self.session_ttl > 0 and now - self._last_purge >= self.PURGE_INTERVAL:
+                self._last_purge = now
+                self._purge_expired(now - self.session_ttl)
+
+    def _purge_expired(self, cutoff: float):
+        """删除cutoff之前最后更新的会话及其评估结果和个性化题目，在写事务内调用"""
+        expired = "SELECT session_id FROM sessions WHERE updated_at < ?"
+        self.conn.execute(f"DELETE FROM evaluations WHERE session_id IN ({expired})", (cutoff,))
+        self.conn.execute(f"DELETE FROM personalized_questions WHERE session_id IN ({expired})", (cutoff,))
+        removed = self.conn.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,)).rowcount
+        if removed:
+            logger.info(f"清理过期会话 {removed} 个")
+
+    async def close(self):
+        if self._flush_future is not None:
+            await self._flush()
+        with self._readers_lock:
+            readers, self._readers = self._readers, []
+        self._local = threading.local()
+        for reader in readers:
+            reader.close()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def create_session_store() -> SessionStore:
+    """根据配置创建会话存储"""
+    if settings.session_store_backend == "sqlite":
+        return SQLiteSessionStore(
+            settings.session_store_path,
+            flush_interval=settings.session_store_flush_interval,
+            session_ttl=settings.session_ttl
+        )
+    if settings.session_store_backend != "memory":
+        raise ValueError(f"不支持的会话存储类型: {settings.session_store_backend}")
+    return InMemorySessionStore(session_ttl=settings.session_ttl)
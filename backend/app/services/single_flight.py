@@ -0,0 +1,201 @@
+import os
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # 非POSIX平台只在进程内合并
+    fcntl = None
+
+from ..core.metrics import coalesced_calls
+
+logger = logging.getLogger(__name__)
+
+
+class _StreamFlight:
+    """一次进行中的流式调用：已生成的片段与完成状态，后加入的调用方从头回放"""
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._changed = asyncio.Event()
+
+    def notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def push(self, part: str):
+        self.parts.append(part)
+        self.notify()
+
+    async def follow(self) -> AsyncIterator[str]:
+        index = 0
+        while True:
+            while index < len(self.parts):
+                yield self.parts[index]
+                index += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+
+class WorkerLock:
+    """
+    跨worker的按键互斥，基于同一个锁文件上的字节范围锁（fcntl.lockf）
+
+    每个键锁定文件中由键的前48位决定的1个字节，不同键互不阻塞，也不需要清理锁文件。
+    POSIX记录锁属于进程，同一进程内的合并由SingleFlight完成，只有进程内的首个调用方会加锁。
+    """
+
+    def __init__(self, path: str, poll_interval: float = 0.05):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+
+    @property
+    def fd(self) -> int:
+        if self._fd is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        return self._fd
+
+    @asynccontextmanager
+    async def hold(self, key: str, timeout: float) -> AsyncIterator[bool]:
+        """
+        持有键对应的锁，产出是否曾等待其他worker释放
+
+        等待超过timeout时不再等待，直接继续（产出True）。
+        """
+        offset = int(key[:12], 16)
+        deadline = time.monotonic() + timeout
+        waited = False
+        acquired = False
+        while True:
+            try:
+                fcntl.lockf(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, offset)
+                acquired = True
+                break
+            except (BlockingIOError, PermissionError):
+                waited = True
+                if time.monotonic() >= deadline:
+                    logger.warning("等待其他worker的相同模型调用超时，直接调用")
+                    break
+                await asyncio.sleep(self.poll_interval)
+        try:
+            yield waited
+        finally:
+            if acquired:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, 1, offset)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class SingleFlight:
+    """
+    合并相同键的并发调用
+
+    同一时刻相同键只有一个上游调用，其余调用方等待共享的结果（流式调用共享片段）。
+    上游调用在独立任务中运行，某个调用方取消（如客户端断开）不会影响其他调用方。
+    配置lock_path时另外提供跨worker的按键互斥（见WorkerLock），由调用方结合共享缓存使用。
+    """
+
+    def __init__(self, lock_path: Optional[str] = None):
+        self._calls: Dict[str, asyncio.Future] = {}
+        self._streams: Dict[str, _StreamFlight] = {}
+        self.worker_lock = WorkerLock(lock_path) if lock_path and fcntl is not None else None
+        self.leaders = 0
+        self.coalesced = 0
+        self.cross_worker_waits = 0
+        self.cross_worker_saved = 0
+        self._coalesced_counter = coalesced_calls.labels("worker")
+        self._cross_worker_counter = coalesced_calls.labels("cross_worker")
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """执行fn()，相同键已有进行中的调用时等待其结果"""
+        task = self._calls.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish_call(key, done))
+        else:
+            self.coalesced += 1
+            self._coalesced_counter.inc()
+        return await asyncio.shield(task)
+
+    def _finish_call(self, key: str, task: asyncio.Future):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # 所有调用方都已取消时避免 "exception was never retrieved"
+        if not task.cancelled():
+            task.exception()
+
+    async def stream(self, key: str, fn: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """迭代fn()产出的片段，相同键已有进行中的流式调用时从头回放其片段"""
+        flight = self._streams.get(key)
+        if flight is None:
+            self.leaders += 1
+            flight = _StreamFlight()
+            self._streams[key] = flight
+            asyncio.ensure_future(self._pump(key, flight, fn))
+        else:
+            self.coalesced += 1
+            self._coalesced_counter.inc()
+        async for part in flight.follow():
+            yield part
+
+    async def _pump(self, key: str, flight: _StreamFlight, fn: Callable[[], AsyncIterator[str]]):
+        try:
+            async for part in fn():
+                flight.push(part)
+        except BaseException as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            flight.notify()
+            if self._streams.get(key) is flight:
+                del self._streams[key]
+
+    @asynccontextmanager
+    async def across_workers(self, key: str, timeout: float) -> AsyncIterator[bool]:
+        """
+        跨worker互斥，产出是否曾等待其他worker的相同调用
+
+        产出True时调用方应先查共享缓存，命中后调用 saved_across_workers() 记录。
+        未配置锁文件时直接产出False。
+        """
+        if self.worker_lock is None:
+            yield False
+            return
+        async with self.worker_lock.hold(key, timeout) as waited:
+            if waited:
+                self.cross_worker_waits += 1
+            yield waited
+
+    def saved_across_workers(self):
+        self.cross_worker_saved += 1
+        self._cross_worker_counter.inc()
+
+    def stats(self) -> Dict[str, Any]:
+        """合并统计：saved为省下的上游调用次数"""
+        return {
+            "in_flight": len(self._calls) + len(self._streams),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "cross_worker_waits": self.cross_worker_waits,
+            "cross_worker_saved": self.cross_worker_saved,
+            "saved": self.coalesced + self.cross_worker_saved
+        }
+
+    def close(self):
+        if self.worker_lock is not None:
+            self.worker_lock.close()
@@ -0,0 +1,131 @@
+from typing import Dict, List
+from ..models.schemas import JobType
+
+# 各岗位通用的能力关键词
+COMMON_SKILLS: Dict[str, List[str]] = {
+    "沟通能力": ["沟通能力", "沟通协调", "communication"],
+    "团队协作": ["团队协作", "团队合作", "teamwork"],
+    "项目管理": ["项目管理", "project management", "pmp"],
+    "英语": ["英语", "english", "cet-6", "cet-4", "雅思", "托福"],
+    "Excel": ["excel"],
+}
+
+# 各岗位的技能词典：标准名 -> 同义词（匹配时忽略ASCII大小写）
+SKILL_DICTIONARY: Dict[JobType, Dict[str, List[str]]] = {
+    JobType.SOFTWARE_ENGINEER: {
+        "Python": ["python"],
+        "Java": ["java"],
+        "Go": ["golang", "go语言", "go"],
+        "C++": ["c++", "cpp"],
+        "JavaScript": ["javascript", "js", "es6"],
+        "TypeScript": ["typescript"],
+        "SQL": ["sql"],
+        "MySQL": ["mysql"],
+        "PostgreSQL": ["postgresql", "postgres"],
+        "Redis": ["redis"],
+        "MongoDB": ["mongodb"],
+        "Kafka": ["kafka"],
+        "Docker": ["docker", "容器化"],
+        "Kubernetes": ["kubernetes", "k8s"],
+        "Linux": ["linux"],
+        "Git": ["git"],
+        "Spring": ["spring boot", "springboot", "spring"],
+        "Django": ["django"],
+        "FastAPI": ["fastapi"],
+        "React": ["react"],
+        "Vue": ["vue"],
+        "微服务": ["微服务", "microservice", "microservices"],
+        "分布式系统": ["分布式", "distributed system", "distributed systems"],
+        "高并发": ["高并发", "high concurrency"],
+        "数据结构与算法": ["数据结构", "算法", "algorithms"],
+        "系统设计": ["系统设计", "架构设计", "system design"],
+        "CI/CD": ["ci/cd", "持续集成", "jenkins"],
+        "云服务": ["aws", "阿里云", "腾讯云", "云原生", "cloud native"],
+        "单元测试": ["单元测试", "unit test", "pytest", "junit"],
+    },
+    JobType.DATA_SCIENTIST: {
+        "Python": ["python"],
+        "R": ["r语言"],
+        "SQL": ["sql"],
+        "机器学习": ["机器学习", "machine learning"],
+        "深度学习": ["深度学习", "deep learning"],
+        "统计学": ["统计学", "统计分析", "statistics"],
+        "数据分析": ["数据分析", "data analysis"],
+        "数据挖掘": ["数据挖掘", "data mining"],
+        "特征工程": ["特征工程", "feature engineering"],
+        "A/B测试": ["a/b测试", "ab测试", "a/b test", "ab test"],
+        "Pandas": ["pandas"],
+        "NumPy": ["numpy"],
+        "scikit-learn": ["scikit-learn", "sklearn"],
+        "TensorFlow": ["tensorflow"],
+        "PyTorch": ["pytorch"],
+        "Spark": ["spark", "pyspark"],
+        "Hadoop": ["hadoop", "hive"],
+        "NLP": ["nlp", "自然语言处理"],
+        "计算机视觉": ["计算机视觉", "computer vision", "cv"],
+        "推荐系统": ["推荐系统", "recommendation system", "recommender"],
+        "数据可视化": ["数据可视化", "tableau", "power bi", "matplotlib"],
+        "大模型": ["大模型", "llm", "transformer"],
+    },
+    JobType.PRODUCT_MANAGER: {
+        "需求分析": ["需求分析", "requirement analysis"],
+        "产品规划": ["产品规划", "roadmap", "产品路线图"],
+        "用户研究": ["用户研究", "用户调研", "user research"],
+        "PRD": ["prd", "产品需求文档"],
+        "原型设计": ["原型设计", "axure", "墨刀"],
+        "数据分析": ["数据分析", "data analysis"],
+        "A/B测试": ["a/b测试", "ab测试", "a/b test", "ab test"],
+        "竞品分析": ["竞品分析", "competitive analysis"],
+        "用户增长": ["用户增长", "growth hacking"],
+        "敏捷开发": ["敏捷", "scrum", "agile"],
+        "商业分析": ["商业分析", "商业模式", "business analysis"],
+        "SQL": ["sql"],
+        "B端产品": ["b端", "saas", "to b"],
+        "C端产品": ["c端", "to c"],
+    },
+    JobType.UI_UX_DESIGNER: {
+        "Figma": ["figma"],
+        "Sketch": ["sketch"],
+        "Photoshop": ["photoshop", "ps"],
+        "Illustrator": ["illustrator"],
+        "交互设计": ["交互设计", "interaction design"],
+        "用户体验": ["用户体验", "ux"],
+        "视觉设计": ["视觉设计", "visual design", "ui设计"],
+        "原型设计": ["原型设计", "axure", "墨刀"],
+        "设计系统": ["设计系统", "设计规范", "design system"],
+        "可用性测试": ["可用性测试", "usability test"],
+        "用户研究": ["用户研究", "用户调研", "user research"],
+        "动效设计": ["动效", "after effects", "motion design"],
+    },
+    JobType.MARKETING: {
+        "市场营销": ["市场营销", "marketing"],
+        "品牌建设": ["品牌", "branding"],
+        "内容营销": ["内容营销", "content marketing", "文案"],
+        "新媒体运营": ["新媒体", "社交媒体", "小红书", "抖音", "微信公众号", "social media"],
+        "SEO": ["seo", "搜索引擎优化"],
+        "SEM": ["sem", "竞价推广"],
+        "活动策划": ["活动策划", "event planning"],
+        "市场调研": ["市场调研", "market research"],
+        "数据分析": ["数据分析", "data analysis"],
+        "用户增长": ["用户增长", "growth hacking"],
+        "投放": ["广告投放", "信息流", "投放"],
+    },
+    JobType.SALES: {
+        "客户开发": ["客户开发", "拓客", "business development"],
+        "客户关系管理": ["客户关系", "crm", "salesforce"],
+        "销售谈判": ["谈判", "negotiation"],
+        "大客户销售": ["大客户", "key account", "ka"],
+        "渠道管理": ["渠道", "channel"],
+        "销售目标": ["业绩", "销售额", "quota", "kpi"],
+        "解决方案销售": ["解决方案", "solution selling"],
+        "招投标": ["招投标", "投标", "bidding"],
+    },
+    JobType.OTHER: {},
+}
+
+# 同时是常见英文单词的同义词：只在写法与标准名一致（或全大写）且未与相邻词以
+# 连字符等相连时计入，避免 "go the extra mile"、"go-to-market"、"R&D" 被识别为技能
+AMBIGUOUS_WORDS = {"go", "react", "r"}
+
+# 每个岗位类型未提供岗位描述时参考的核心技能数
+CORE_SKILL_COUNT = 10
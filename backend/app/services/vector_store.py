@@ -0,0 +1,387 @@
+import os
+import json
+import mmap
+import fcntl
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import List, Dict, Optional
+import numpy as np
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 元数据表记录：文本偏移、文本长度、来源ID、块序号、是否有效
+META_DTYPE = np.dtype([
+    ('text_offset', '<i8'),
+    ('text_length', '<i4'),
+    ('source_id', '<i4'),
+    ('chunk_index', '<i4'),
+    ('alive', 'u1')
+])
+
+
+@dataclass
+class SearchResult:
+    """向量检索结果"""
+    text: str
+    score: float
+    source: str
+    chunk_index: int
+
+
+class VectorStore:
+    """
+    基于内存映射的持久化向量库
+
+    目录结构（位于vector_db_path下）：
+        manifest.json          当前代数、维度、行数等元信息（原子替换）
+        vectors.<gen>.f32      float32向量矩阵，按行追加，已L2归一化
+        meta.<gen>.bin         定长元数据表（META_DTYPE）
+        texts.<gen>.bin        UTF-8文本块拼接
+        sources.json           来源名称列表，下标即source_id
+
+    所有文件以只读mmap打开，多个worker进程通过操作系统页缓存共享同一份数据。
+    写入（追加/删除）通过文件锁串行化，删除只置墓碑位，compact时才重写文件。
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._manifest: Dict = {}
+        self._manifest_stamp: Optional[tuple] = None
+        self._vectors: Optional[np.ndarray] = None
+        self._meta: Optional[np.ndarray] = None
+        self._texts: Optional[mmap.mmap] = None
+        self._sources: Optional[List[str]] = None
+        self._source_index: Dict[str, int] = {}
+        self._batch_depth = 0
+        self._dirty = False
+
+    # ---------- 路径 ----------
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.db_path, name)
+
+    def _data_path(self, kind: str, generation: int) -> str:
+        suffix = {'vectors': 'f32', 'meta': 'bin', 'texts': 'bin'}[kind]
+        return self._path(f"{kind}.{generation}.{suffix}")
+
+    # ---------- 读取 ----------
+
+    def refresh(self):
+        """manifest变化时重新映射文件（仅一次stat系统调用）"""
+        try:
+            stat = os.stat(self._path('manifest.json'))
+        except FileNotFoundError:
+            if self._manifest_stamp is not None:
+                self._close_maps()
+                self._manifest, self._manifest_stamp, self._sources = {}, None, None
+            return
+
+        # manifest通过os.replace原子替换，inode和mtime任一变化即视为新版本
+        stamp = (stat.st_ino, stat.st_mtime_ns)
+        if stamp == self._manifest_stamp:
+            return
+
+        with open(self._path('manifest.json'), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        self._close_maps()
+        self._manifest = manifest
+        self._manifest_stamp = stamp
+        self._sources = None
+
+        count, dim = manifest['count'], manifest['dim']
+        generation = manifest['generation']
+        if count == 0:
+            return
+
+        self._vectors = np.memmap(self._data_path('vectors', generation), dtype=np.float32,
+                                  mode='r', shape=(count, dim))
+        self._meta = np.memmap(self._data_path('meta', generation), dtype=META_DTYPE,
+                               mode='r', shape=(count,))
+        if manifest['text_bytes'] > 0:
+            with open(self._data_path('texts', generation), 'rb') as f:
+                self._texts = mmap.mmap(f.fileno(), manifest['text_bytes'], access=mmap.ACCESS_READ)
+
+    def _close_maps(self):
+        if self._texts is not None:
+            self._texts.close()
+        self._vectors = None
+        self._meta = None
+        self._texts = None
+
+    @property
+    def count(self) -> int:
+        """有效（未删除）的向量数"""
+        self.refresh()
+        return self._manifest.get('count', 0) - self._manifest.get('deleted', 0)
+
+    @property
+    def deleted_ratio(self) -> float:
+        """已删除行占总行数的比例"""
+        self.refresh()
+        total = self._manifest.get('count', 0)
+        return self._manifest.get('deleted', 0) / total if total else 0.0
+
+    @property
+    def sources(self) -> List[str]:
+        """来源名称列表（按需加载）"""
+        self.refresh()
+        if self._sources is None:
+            path = self._path('sources.json')
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._sources = json.load(f)
+            else:
+                self._sources = []
+            self._source_index = {name: i for i, name in enumerate(self._sources)}
+        return self._sources
+
+    def search(self, query: np.ndarray, top_k: int = 5) -> List[SearchResult]:
+        """
+        余弦相似度top-k检索
+
+        Args:
+            query: 查询向量
+            top_k: 返回结果数
+
+        Returns:
+            List[SearchResult]: 按相似度降序排列的结果
+        """
+        self.refresh()
+        if self._vectors is None or top_k <= 0:
+            return []
+
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        if query.shape[0] != self._vectors.shape[1]:
+            raise ValueError(f"查询向量维度不匹配: {query.shape[0]} != {self._vectors.shape[1]}")
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        query = query / norm
+
+        scores = np.asarray(self._vectors @ query)
+        # 墓碑位先于manifest的deleted计数写入，不能据manifest跳过过滤，始终以墓碑位为准
+        alive = self._meta['alive'] == 1
+        scores[~alive] = -np.inf
+
+        k = min(top_k, int(np.count_nonzero(alive)))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        sources = self.sources
+        results = []
+        for row in top:
+            record = self._meta[row]
+            offset, length = int(record['text_offset']), int(record['text_length'])
+            results.append(SearchResult(
+                text=self._texts[offset:offset + length].decode('utf-8'),
+                score=float(scores[row]),
+                source=sources[record['source_id']],
+                chunk_index=int(record['chunk_index'])
+            ))
+        return results
+
+    # ---------- 写入 ----------
+
+    @contextmanager
+    def _write_lock(self):
+        os.makedirs(self.db_path, exist_ok=True)
+        with open(self._path('.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def batch(self):
+        """
+        批量写入上下文：期间的追加和删除共用一把锁，退出时统一写入manifest
+
+        示例：
+            with store.batch():
+                store.delete_source("a.pdf")
+                store.add("a.pdf", texts, vectors)
+        """
+        if self._batch_depth > 0:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+            return
+
+        with self._write_lock():
+            self._manifest_stamp = None
+            self.refresh()
+            self._batch_depth = 1
+            try:
+                yield self
+            finally:
+                self._batch_depth = 0
+                if self._dirty:
+                    self._write_manifest()
+                    self._dirty = False
+
+    def _default_manifest(self, dim: int) -> Dict:
+        return {
+            'generation': 0,
+            'dim': dim,
+            'count': 0,
+            'deleted': 0,
+            'text_bytes': 0,
+            'model': settings.openai_embedding_model
+        }
+
+    def _write_manifest(self):
+        if self._sources is not None:
+            self._atomic_write_json(self._path('sources.json'), self._sources)
+        self._atomic_write_json(self._path('manifest.json'), self._manifest)
+        # 下次读取时重新映射
+        self._manifest_stamp = None
+        self.refresh()
+
+    @staticmethod
+    def _atomic_write_json(path: str, data):
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _source_id(self, source: str, create: bool) -> Optional[int]:
+        sources = self.sources
+        source_id = self._source_index.get(source)
+        if source_id is None and create:
+            source_id = len(sources)
+            sources.append(source)
+            self._source_index[source] = source_id
+        return source_id
+
+    def add(self, source: str, texts: List[str], vectors: np.ndarray):
+        """
+        追加一个来源的文本块及其向量
+
+        Args:
+            source: 来源名称（如知识库文件相对路径）
+            texts: 文本块列表
+            vectors: 形状为(len(texts), dim)的向量矩阵
+        """
+        if not texts:
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[0] != len(texts):
+            raise ValueError("向量数量与文本块数量不一致")
+
+        with self.batch():
+            manifest = self._manifest or self._default_manifest(vectors.shape[1])
+            if manifest['dim'] != vectors.shape[1]:
+                raise ValueError(f"向量维度不匹配: {vectors.shape[1]} != {manifest['dim']}")
+
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1, norms)
+
+            encoded = [text.encode('utf-8') for text in texts]
+            lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+            offsets = manifest['text_bytes'] + np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+            meta = np.zeros(len(texts), dtype=META_DTYPE)
+            meta['text_offset'] = offsets
+            meta['text_length'] = lengths
+            meta['source_id'] = self._source_id(source, create=True)
+            meta['chunk_index'] = np.arange(len(texts))
+            meta['alive'] = 1
+
+            generation = manifest['generation']
+            count = manifest['count']
+            # 截断上次异常中断留下的未提交数据后再追加
+            self._append(self._data_path('texts', generation), manifest['text_bytes'], b''.join(encoded))
+            self._append(self._data_path('meta', generation), count * META_DTYPE.itemsize, meta.tobytes())
+            self._append(self._data_path('vectors', generation), count * manifest['dim'] * 4,
+                         vectors.tobytes())
+
+            manifest['count'] = count + len(texts)
+            manifest['text_bytes'] = int(manifest['text_bytes'] + lengths.sum())
+            self._manifest = manifest
+            self._dirty = True
+
+    @staticmethod
+    def _append(path: str, committed_size: int, data: bytes):
+        with open(path, 'ab') as f:
+            if f.tell() != committed_size:
+                f.truncate(committed_size)
+                f.seek(committed_size)
+            f.write(data)
+
+    def delete_source(self, source: str) -> int:
+        """
+        删除一个来源的所有文本块（置墓碑位，不重写文件）
+
+        Returns:
+            int: 删除的块数
+        """
+        with self.batch():
+            source_id = self._source_id(source, create=False)
+            if source_id is None or not self._manifest.get('count'):
+                return 0
+
+            meta = np.memmap(self._data_path('meta', self._manifest['generation']), dtype=META_DTYPE,
+                             mode='r+', shape=(self._manifest['count'],))
+            rows = np.flatnonzero((meta['source_id'] == source_id) & (meta['alive'] == 1))
+            if len(rows):
+                meta['alive'][rows] = 0
+                meta.flush()
+                self._manifest['deleted'] += int(len(rows))
+                self._dirty = True
+            del meta
+            return int(len(rows))
+
+    def compact(self):
+        """重写数据文件，清除已删除的行；读者在下次refresh时切换到新一代文件"""
+        with self.batch():
+            manifest = self._manifest
+            if not manifest or not manifest.get('deleted'):
+                return
+
+            alive = np.flatnonzero(self._meta['alive'] == 1)
+            old_generation = manifest['generation']
+            generation = old_generation + 1
+
+            vectors = np.asarray(self._vectors[alive])
+            old_meta = np.asarray(self._meta[alive])
+            texts = [self._texts[int(r['text_offset']):int(r['text_offset']) + int(r['text_length'])]
+                     for r in old_meta]
+
+            meta = old_meta.copy()
+            lengths = meta['text_length'].astype(np.int64)
+            meta['text_offset'] = np.concatenate(([0], np.cumsum(lengths)[:-1])) if len(meta) else 0
+
+            with open(self._data_path('texts', generation), 'wb') as f:
+                f.write(b''.join(texts))
+            with open(self._data_path('meta', generation), 'wb') as f:
+                f.write(meta.tobytes())
+            with open(self._data_path('vectors', generation), 'wb') as f:
+                f.write(vectors.tobytes())
+
+            manifest.update({
+                'generation': generation,
+                'count': int(len(alive)),
+                'deleted': 0,
+                'text_bytes': int(lengths.sum())
+            })
+            self._dirty = True
+            self._write_manifest()
+            self._dirty = False
+
+            for kind in ('vectors', 'meta', 'texts'):
+                try:
+                    os.remove(self._data_path(kind, old_generation))
+                except FileNotFoundError:
+                    pass
+
+
+# 创建全局向量库实例（按需映射文件）
+vector_store = VectorStore(settings.vector_db_path)
@@ -1,17 +1,73 @@
+import io
 import os
+import re
+import threading
 import PyPDF2
+from concurrent.futures import ProcessPoolExecutor
 from docx import Document
-from typing import List, Optional, Tuple
+from typing import List, Optional, Tuple, Iterator, Union, BinaryIO
 import logging
+import numpy as np
+from .tokenizer import token_prefix, sentence_boundaries
+from .section_parser import SectionParser
 
 logger = logging.getLogger(__name__)
 
+# 文本清理：移除特殊字符（保留中文、英文、数字、标点），合并行内空白和空行
+_SPECIAL_CHARS = re.compile(r'[^\w\s\u4e00-\u9fff.,!?;:()\[\]{}"\'-]')
+_INLINE_WHITESPACE = re.compile(r'[^\S\n]+')
+_LINE_BREAKS = re.compile(r' ?\n[ \n]*')
+
+# PDF来源：文件路径或文件内容
+PDFSource = Union[str, bytes]
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def _open_pdf(source: PDFSource) -> PyPDF2.PdfReader:
+    """打开PDF，PdfReader按需解析页面"""
+    if isinstance(source, bytes):
+        return PyPDF2.PdfReader(io.BytesIO(source))
+    return PyPDF2.PdfReader(source)
+
+
+def _extract_pdf_page_range(source: PDFSource, start: int, end: int) -> List[str]:
+    """提取[start, end)范围内各页文本，在子进程中执行"""
+    pdf_reader = _open_pdf(source)
+    return [pdf_reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def get_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """懒加载PDF解析进程池，进程内共享"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=max_workers)
+        return _process_pool
+
+
+def shutdown_process_pool():
+    """关闭PDF解析进程池"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
+
 
 class DocumentProcessor:
     """文档处理器，支持PDF和Word文档的文本提取"""
     
-    def __init__(self):
+    def __init__(self, pdf_max_pages: int = 200, pdf_max_text_bytes: int = 2 * 1024 * 1024,
+                 pdf_parallel_min_pages: int = 16, pdf_process_workers: int = 0):
         self.supported_formats = ['.pdf', '.docx', '.doc', '.txt']
+        self.pdf_max_pages = pdf_max_pages
+        self.pdf_max_text_bytes = pdf_max_text_bytes
+        # pdf_process_workers > 1 时，页数达到pdf_parallel_min_pages的PDF使用进程池并行提取
+        self.pdf_parallel_min_pages = pdf_parallel_min_pages
+        self.pdf_process_workers = pdf_process_workers
+        self.section_parser = SectionParser()
     
     def extract_text(self, file_path: str) -> Tuple[str, List[str]]:
         """
@@ -39,58 +95,151 @@ class DocumentProcessor:
             logger.error(f"文档处理失败: {str(e)}")
             raise
     
-    def _extract_from_pdf(self, file_path: str) -> Tuple[str, List[str]]:
-        """从PDF文件提取文本"""
+    def extract_text_from_bytes(self, content: bytes, filename: str) -> Tuple[str, List[str]]:
+        """
+        从内存中的文件内容提取文本，格式由文件名扩展名决定
+        
+        Args:
+            content: 文件内容
+            filename: 文件名
+            
+        Returns:
+            Tuple[str, List[str]]: (完整文本, 分块文本列表)
+        """
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                full_text = ""
-                text_chunks = []
-                
-                for page_num, page in enumerate(pdf_reader.pages):
-                    page_text = page.extract_text()
-                    full_text += page_text + "\n"
-                    
-                    # 分块处理（每页作为一个块）
-                    if page_text.strip():
-                        text_chunks.append(f"第{page_num + 1}页: {page_text.strip()}")
+            file_ext = os.path.splitext(filename)[1].lower()
+            
+            if file_ext == '.pdf':
+                return self._extract_from_pdf(content)
+            elif file_ext in ['.docx', '.doc']:
+                return self._extract_from_docx(io.BytesIO(content))
+            elif file_ext == '.txt':
+                return self._extract_from_txt(io.BytesIO(content))
+            else:
+                raise ValueError(f"不支持的文件格式: {file_ext}")
                 
-                return full_text.strip(), text_chunks
+        except Exception as e:
+            logger.error(f"文档处理失败: {str(e)}")
+            raise
+    
+    def iter_pdf_pages(self, source: PDFSource, max_pages: Optional[int] = None,
+                       max_bytes: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        """
+        逐页提取PDF文本
+        
+        达到页数或文本字节数上限时停止，后续页面不会被解析。
+        
+        Args:
+            source: 文件路径或文件内容
+            max_pages: 最大页数，默认为pdf_max_pages
+            max_bytes: 文本最大字节数（UTF-8），默认为pdf_max_text_bytes
+            
+        Yields:
+            Tuple[int, str]: (页码（从0开始）, 页面文本)
+        """
+        return self._iter_reader_pages(_open_pdf(source), max_pages, max_bytes)
+    
+    def _iter_reader_pages(self, pdf_reader: PyPDF2.PdfReader, max_pages: Optional[int] = None,
+                           max_bytes: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        max_pages = self.pdf_max_pages if max_pages is None else max_pages
+        max_bytes = self.pdf_max_text_bytes if max_bytes is None else max_bytes
+        remaining = max_bytes
+        for page_num in range(min(len(pdf_reader.pages), max_pages)):
+            page_text = pdf_reader.pages[page_num].extract_text() or ""
+            page_text, remaining = self._apply_byte_cap(page_text, remaining)
+            yield page_num, page_text
+            if remaining <= 0:
+                logger.info(f"PDF文本达到{max_bytes}字节上限，停止于第{page_num + 1}页")
+                return
+    
+    @staticmethod
+    def _apply_byte_cap(text: str, remaining: int) -> Tuple[str, int]:
+        """按剩余字节数截断文本，返回(文本, 剩余字节数)"""
+        encoded = text.encode('utf-8')
+        if len(encoded) <= remaining:
+            return text, remaining - len(encoded)
+        return encoded[:remaining].decode('utf-8', errors='ignore'), 0
+    
+    def _extract_pdf_pages_parallel(self, source: PDFSource, page_count: int) -> List[str]:
+        """将页面按范围分给进程池并行提取，按页序返回"""
+        workers = self.pdf_process_workers
+        step = -(-page_count // workers)
+        pool = get_process_pool(workers)
+        futures = [
+            pool.submit(_extract_pdf_page_range, source, start, min(start + step, page_count))
+            for start in range(0, page_count, step)
+        ]
+        
+        page_texts = []
+        remaining = self.pdf_max_text_bytes
+        for future in futures:
+            for page_text in future.result():
+                page_text, remaining = self._apply_byte_cap(page_text, remaining)
+                page_texts.append(page_text)
+                if remaining <= 0:
+                    for pending in futures:
+                        pending.cancel()
+                    return page_texts
+        return page_texts
+    
+    def _extract_from_pdf(self, source: PDFSource) -> Tuple[str, List[str]]:
+        """从PDF提取文本，页数较多且启用进程池时并行提取"""
+        try:
+            pdf_reader = _open_pdf(source)
+            page_count = min(len(pdf_reader.pages), self.pdf_max_pages)
+            if self.pdf_process_workers > 1 and page_count >= self.pdf_parallel_min_pages:
+                page_texts = self._extract_pdf_pages_parallel(source, page_count)
+            else:
+                page_texts = [page_text for _, page_text in self._iter_reader_pages(pdf_reader)]
+            
+            # 分块处理（每页作为一个块）
+            text_chunks = [
+                f"第{page_num + 1}页: {page_text.strip()}"
+                for page_num, page_text in enumerate(page_texts)
+                if page_text.strip()
+            ]
+            return "\n".join(page_texts).strip(), text_chunks
                 
         except Exception as e:
             logger.error(f"PDF处理失败: {str(e)}")
             raise
     
-    def _extract_from_docx(self, file_path: str) -> Tuple[str, List[str]]:
+    def _extract_from_docx(self, source: Union[str, BinaryIO]) -> Tuple[str, List[str]]:
         """从Word文档提取文本"""
         try:
-            doc = Document(file_path)
-            full_text = ""
+            doc = Document(source)
+            lines = []
             text_chunks = []
             
             for paragraph in doc.paragraphs:
                 if paragraph.text.strip():
-                    full_text += paragraph.text + "\n"
+                    lines.append(paragraph.text)
                     text_chunks.append(paragraph.text.strip())
             
-            # 处理表格
+            # 处理表格：row.cells每次都会重建整张表的单元格网格，大表格上是平方复杂度，
+            # 因此每张表只构建一次网格再按列数切分（与row.cells的结果相同）
             for table in doc.tables:
-                for row in table.rows:
-                    row_text = " | ".join([cell.text.strip() for cell in row.cells])
+                cells = table._cells
+                column_count = max(1, table._column_count)
+                for start in range(0, len(cells), column_count):
+                    row_text = " | ".join([cell.text.strip() for cell in cells[start:start + column_count]])
                     if row_text.strip():
-                        full_text += row_text + "\n"
+                        lines.append(row_text)
                         text_chunks.append(row_text.strip())
             
+            full_text = "\n".join(lines)
             return full_text.strip(), text_chunks
             
         except Exception as e:
             logger.error(f"Word文档处理失败: {str(e)}")
             raise
     
-    def _extract_from_txt(self, file_path: str) -> Tuple[str, List[str]]:
+    def _extract_from_txt(self, source: Union[str, BinaryIO]) -> Tuple[str, List[str]]:
         """从文本文件提取文本"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
+            if isinstance(source, str):
+                source = open(source, 'rb')
+            with io.TextIOWrapper(source, encoding='utf-8') as file:
                 content = file.read()
                 # 按段落分块
                 chunks = [chunk.strip() for chunk in content.split('\n\n') if chunk.strip()]
@@ -102,60 +251,66 @@ class DocumentProcessor:
     
     def chunk_text(self, text: str, chunk_size: int = 512, overlap: int = 50) -> List[str]:
         """
-        将文本分块
+        将文本按token数分块，优先在句子边界（。！？等）处切分
         
         Args:
             text: 输入文本
-            chunk_size: 块大小
-            overlap: 重叠大小
+            chunk_size: 每块最大token数
+            overlap: 相邻块重叠的token数
             
         Returns:
             List[str]: 文本块列表
         """
-        if len(text) <= chunk_size:
+        prefix = token_prefix(text)
+        if prefix[-1] <= chunk_size:
             return [text]
         
+        # 重叠不超过半块，保证每块都向前推进
+        overlap = min(overlap, chunk_size // 2)
+        boundaries = sentence_boundaries(text)
+        length = len(text)
         chunks = []
         start = 0
         
-        while start < len(text):
-            end = start + chunk_size
+        while start < length:
+            # 不超过chunk_size的最远位置
+            end = int(np.searchsorted(prefix, prefix[start] + chunk_size, side="right")) - 1
+            end = max(end, start + 1)
             
-            # 如果不是最后一块，尝试在句子边界分割
-            if end < len(text):
-                # 寻找最近的句号、问号或感叹号
-                for i in range(end, max(start, end - 100), -1):
-                    if text[i] in '.!?':
-                        end = i + 1
-                        break
+            # 如果不是最后一块，尝试回退到后半块内最近的句子边界
+            if end < length:
+                index = int(np.searchsorted(boundaries, end, side="right")) - 1
+                if index >= 0 and boundaries[index] > start and \
+                        prefix[boundaries[index]] - prefix[start] >= chunk_size / 2:
+                    end = int(boundaries[index])
+            else:
+                end = length
             
             chunk = text[start:end].strip()
             if chunk:
                 chunks.append(chunk)
             
-            start = end - overlap
-            if start >= len(text):
+            if end >= length:
                 break
+            # 下一块从距end不超过overlap个token的位置开始
+            next_start = int(np.searchsorted(prefix, prefix[end] - overlap, side="left"))
+            start = max(next_start, start + 1)
         
         return chunks
     
     def clean_text(self, text: str) -> str:
         """
-        清理文本内容
+        清理文本内容，保留行结构
         
         Args:
             text: 原始文本
             
         Returns:
-            str: 清理后的文本
+            str: 清理后的文本，行内空白合并为一个空格，空行被移除
         """
-        # 移除多余的空白字符
-        text = ' '.join(text.split())
-        
-        # 移除特殊字符（保留中文、英文、数字、标点）
-        import re
-        text = re.sub(r'[^\w\s\u4e00-\u9fff.,!?;:()\[\]{}"\'-]', '', text)
-        
+        text = _SPECIAL_CHARS.sub('', text)
+        text = _INLINE_WHITESPACE.sub(' ', text)
+        text = _LINE_BREAKS.sub('\n', text)
         return text.strip()
     
     def extract_resume_sections(self, text: str) -> dict:
@@ -168,33 +323,4 @@ class DocumentProcessor:
         Returns:
             dict: 各章节内容
         """
-        sections = {
-            'education': [],
-            'experience': [],
-            'skills': [],
-            'projects': [],
-            'achievements': []
-        }
-        
-        # 简单的关键词匹配来识别章节
-        lines = text.split('\n')
-        current_section = None
-        
-        for line in lines:
-            line_lower = line.lower().strip()
-            
-            # 识别章节标题
-            if any(keyword in line_lower for keyword in ['教育', 'education', '学历']):
-                current_section = 'education'
-            elif any(keyword in line_lower for keyword in ['经验', 'experience', '工作', '实习']):
-                current_section = 'experience'
-            elif any(keyword in line_lower for keyword in ['技能', 'skills', '技术']):
-                current_section = 'skills'
-            elif any(keyword in line_lower for keyword in ['项目', 'projects', '作品']):
-                current_section = 'projects'
-            elif any(keyword in line_lower for keyword in ['成就', 'achievements', '获奖']):
-                current_section = 'achievements'
-            elif line.strip() and current_section:
-                sections[current_section].append(line.strip())
-        
-        return sections
+        return self.section_parser.materialize(text, self.section_parser.segment(text))
@@ -0,0 +1,402 @@
+import re
+import json
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+from pydantic import BaseModel
+
+# 这些字符出现时才可能产生新的完整值，值得尝试解析
+_STRUCTURAL_CHARS = frozenset(',]}"el')
+
+_CLOSERS = {'{': '}', '[': ']'}
+_OPENERS = {dict: '{', list: '['}
+
+_DECODER = json.JSONDecoder()
+
+# markdown代码块（结尾的 ``` 可能因输出截断而缺失）
+_FENCE = re.compile(r"```[A-Za-z]*[ \t]*\n?(.*?)(?:```|$)", re.S)
+
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+# 每段文本最多尝试的起始位置数，避免说明文字中大量括号导致反复解析
+_MAX_STARTS = 8
+
+
+class IncrementalJSONParser:
+    """
+    增量JSON解析器，用于在模型流式输出过程中解析部分结果
+
+    每次feed新的文本片段后返回当前能确定的部分对象：只包含已经完整生成的值，
+    未写完的字符串、数字和键会被丢弃，未闭合的对象和数组会被自动补全。
+    括号和字符串状态随输入增量推进，每个字符只扫描一次；补全后的解析需要处理整个缓冲区，
+    因此只在距上次解析新增的文本达到已解析长度的 REPARSE_RATIO 时才重新解析，
+    总解析量与输出长度成线性关系，代价是较长输出的部分结果更新得稍晚。
+    顶层值闭合后立即解析并不再变化。JSON之前的说明文字和代码块标记、之后的多余文字都会被忽略。
+
+    Args:
+        expect: 期望的顶层类型（dict或list），只从对应的括号开始解析，
+            避免把说明文字中的 "[1]" 之类当作JSON的开始
+    """
+
+    # 两次解析之间新增文本至少为上次解析长度的该比例
+    REPARSE_RATIO = 0.1
+
+    def __init__(self, expect: Optional[type] = None):
+        self._openers = _OPENERS[expect] if expect in _OPENERS else '{['
+        self._parts: List[str] = []
+        self._length = 0
+        self._start: Optional[int] = None
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        # 最近一个可安全截断的位置及当时的括号栈
+        self._safe_index = 0
+        self._safe_stack: List[str] = []
+        self._last_value: Any = None
+        # 上次解析时的缓冲区长度、此后是否出现可能产生新值的字符、顶层值是否已闭合
+        self._parsed_length = 0
+        self._dirty = False
+        self._closed = False
+
+    @property
+    def buffer(self) -> str:
+        """已输入的全部文本"""
+        if len(self._parts) > 1:
+            self._parts = [''.join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def feed(self, chunk: str) -> Any:
+        """
+        追加文本片段
+
+        Args:
+            chunk: 新生成的文本
+
+        Returns:
+            Any: 当前可解析出的部分对象，尚无结果时返回None
+        """
+        if self._closed or not chunk:
+            return self._last_value
+        self._parts.append(chunk)
+        offset, self._length = self._length, self._length + len(chunk)
+        self._scan(chunk, offset)
+        if self._start is None:
+            return self._last_value
+
+        self._dirty = self._dirty or any(c in _STRUCTURAL_CHARS for c in chunk)
+        self._closed = not self._stack and not self._in_string
+        due = self._length - self._parsed_length >= self.REPARSE_RATIO * self._parsed_length
+        if self._closed or (self._dirty and due):
+            self._parsed_length, self._dirty = self._length, False
+            value = self._complete()
+            if value is not None:
+                self._last_value = value
+        return self._last_value
+
+    @property
+    def value(self) -> Any:
+        """最近一次解析出的部分对象"""
+        return self._last_value
+
+    def _scan(self, chunk: str, offset: int):
+        begin = 0
+        if self._start is None:
+            starts = [i for i in (chunk.find(opener) for opener in self._openers) if i >= 0]
+            if not starts:
+                return
+            begin = min(starts)
+            self._start = offset + begin
+
+        stack = self._stack
+        for i in range(begin, len(chunk)):
+            char = chunk[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in '{[':
+                stack.append(char)
+                self._safe_index, self._safe_stack = offset + i + 1, list(stack)
+            elif char in '}]':
+                if stack:
+                    stack.pop()
+                if not stack:
+                    # 顶层值已闭合，之后的文字不再扫描
+                    return
+            elif char == ',':
+                self._safe_index, self._safe_stack = offset + i, list(stack)
+
+    def _complete(self) -> Any:
+        """补全当前缓冲区并解析"""
+        buffer = self.buffer
+        text = buffer[self._start:].rstrip()
+        if not self._stack and not self._in_string:
+            # 顶层值已闭合，忽略其后的代码块结束标记或说明文字
+            return _decode_prefix(text)
+
+        # 末尾是完整的值时直接补全括号
+        if not self._in_string and text and text[-1] in '"}]el':
+            value = self._loads(text + self._closers(self._stack))
+            if value is not None:
+                return value
+
+        # 否则回退到最近的安全截断点
+        text = buffer[self._start:self._safe_index]
+        return self._loads(text + self._closers(self._safe_stack))
+
+    @staticmethod
+    def _closers(stack: List[str]) -> str:
+        return ''.join(_CLOSERS[char] for char in reversed(stack))
+
+    @staticmethod
+    def _loads(text: str) -> Any:
+        try:
+            return json.loads(text)
+        except ValueError:
+            return None
+
+
+def _decode_prefix(text: str) -> Any:
+    """解析text开头的JSON值，忽略其后的内容，失败时返回None"""
+    try:
+        return _DECODER.raw_decode(text)[0]
+    except ValueError:
+        return None
+
+
+def repair_json(text: str) -> str:
+    """
+    修正模型输出中常见的非标准JSON写法
+
+    单引号字符串改为双引号，去掉对象和数组末尾多余的逗号，
+    Python字面量 True/False/None 改为 true/false/null。字符串内容保持不变。
+    """
+    out = []
+    i, n = 0, len(text)
+    while i < n:
+        char = text[i]
+        if char == '"' or char == "'":
+            # 复制整个字符串，单引号字符串转换为双引号
+            quote = char
+            out.append('"')
+            i += 1
+            while i < n and text[i] != quote:
+                if text[i] == '\\' and i + 1 < n:
+                    escaped = text[i + 1]
+                    out.append(escaped if escaped == "'" else text[i:i + 2])
+                    i += 2
+                    continue
+                out.append('\\"' if text[i] == '"' else text[i])
+                i += 1
+            if i < n:
+                out.append('"')
+            i += 1
+        elif char == ',':
+            j = i + 1
+            while j < n and text[j] in ' \t\r\n':
+                j += 1
+            if j >= n or text[j] not in '}]':
+                out.append(char)
+            i += 1
+        elif char.isalpha():
+            j = i
+            while j < n and (text[j].isalnum() or text[j] == '_'):
+                j += 1
+            word = text[i:j]
+            out.append(_LITERALS.get(word, word))
+            i = j
+        else:
+            out.append(char)
+            i += 1
+    return ''.join(out)
+
+
+def _balanced_end(text: str, start: int) -> Optional[int]:
+    """从start处的括号开始，返回括号配平后的位置；到文本结尾仍未配平（输出被截断）时返回None"""
+    depth = 0
+    quote = None
+    i, n = start, len(text)
+    while i < n:
+        char = text[i]
+        if quote is not None:
+            if char == '\\':
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char in '{[':
+            depth += 1
+        elif char in '}]':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return None
+
+
+def _decode_from(text: str, openers: str) -> Tuple[Any, Optional[int]]:
+    """
+    从text中的起始括号处解析完整的JSON值，依次尝试原文和修正后的文本
+
+    某个起始位置解析失败时跳过它配平后的整段（如说明文字中的 "{见附录}"），不会进入其内部；
+    到文本结尾仍未配平时视为输出被截断，不再尝试后续位置。
+
+    Returns:
+        Tuple[Any, Optional[int]]: (解析出的值, 被截断的值的起始位置)，值为None表示未解析出
+    """
+    pos = 0
+    for _ in range(_MAX_STARTS):
+        starts = [i for i in (text.find(opener, pos) for opener in openers) if i >= 0]
+        if not starts:
+            break
+        start = min(starts)
+        value = _decode_prefix(text[start:])
+        if value is None:
+            value = _decode_prefix(repair_json(text[start:]))
+        if value is not None:
+            return value, None
+        end = _balanced_end(text, start)
+        if end is None:
+            return None, start
+        pos = end
+    return None, None
+
+
+def extract_json(text: str, expect: Optional[type] = None) -> Any:
+    """
+    从模型输出中提取JSON值
+
+    依次尝试：markdown代码块中的内容、整段文本（跳过开头的说明文字，忽略结尾的多余文字），
+    每处先按标准JSON解析，失败后修正单引号、末尾逗号等写法再解析；
+    都没有完整的值时视为输出被截断，补全未闭合的括号，只保留已完整生成的值。
+
+    Args:
+        text: 模型输出的文本
+        expect: 期望的顶层类型（dict或list），只接受该类型的值
+
+    Returns:
+        Any: 解析出的值，无法提取时返回None
+    """
+    if not text:
+        return None
+    openers = _OPENERS[expect] if expect in _OPENERS else '{['
+    truncated = None
+    for candidate in [match.group(1) for match in _FENCE.finditer(text)] + [text]:
+        value, start = _decode_from(candidate, openers)
+        if value is not None:
+            return value
+        if truncated is None and start is not None:
+            truncated = candidate[start:]
+    if truncated is None:
+        return None
+
+    # 截断的输出：增量解析器补全括号并丢弃未写完的值
+    value = IncrementalJSONParser(expect).feed(repair_json(truncated))
+    if expect is not None and not isinstance(value, expect):
+        return None
+    return value
+
+
+def _valid_items(field, value: Any, model: Type[BaseModel]) -> Any:
+    """列表或字典整体校验失败时，逐个校验元素，只保留能通过校验的元素"""
+    if isinstance(value, list):
+        items = [field.validate([item], {}, loc=field.name, cls=model) for item in value]
+        return [valid[0] for valid, errors in items if not errors]
+    if isinstance(value, dict):
+        entries = [field.validate({key: item}, {}, loc=field.name, cls=model) for key, item in value.items()]
+        return {key: item for valid, errors in entries if not errors for key, item in valid.items()}
+    return None
+
+
+def validate_fields(data: Dict[str, Any], model: Type[BaseModel],
+                    exclude: Sequence[str] = ()) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    按pydantic模型逐字段校验模型输出
+
+    与 model.parse_obj 不同，单个字段不合法时只丢弃该字段而不是整个结果；
+    列表和字典字段中不合法的元素（如未知的章节名、非数字的评分）被单独丢弃。
+
+    Args:
+        data: 解析出的JSON对象
+        model: 目标模型
+        exclude: 不由模型输出、无需校验的字段
+
+    Returns:
+        Tuple[Dict[str, Any], List[str]]: (通过校验并转换后的字段, 缺失或不合法的必填字段)
+    """
+    valid: Dict[str, Any] = {}
+    missing: List[str] = []
+    for name, field in model.__fields__.items():
+        if name in exclude:
+            continue
+        if name not in data or data[name] is None:
+            if field.required:
+                missing.append(name)
+            continue
+        value, errors = field.validate(data[name], valid, loc=name, cls=model)
+        if errors:
+            value = _valid_items(field, data[name], model)
+            if value is None:
+                if field.required:
+                    missing.append(name)
+                continue
+        valid[name] = value
+    return valid, missing
+
+
+def parse_model_output(text: str, model: Type[BaseModel], exclude: Sequence[str] = (),
+                       required: Iterable[str] = ()) -> Optional[Dict[str, Any]]:
+    """
+    从模型输出中提取JSON对象并按模型校验
+
+    Args:
+        text: 模型输出的文本
+        model: 目标模型
+        exclude: 不由模型输出的字段
+        required: 缺失时视为解析失败的字段，其余缺失的必填字段由调用方补默认值
+
+    Returns:
+        Optional[Dict[str, Any]]: 校验后的字段，无法提取对象或缺少required字段时返回None
+    """
+    data = extract_json(text, dict)
+    if data is None:
+        return None
+    valid, missing = validate_fields(data, model, exclude)
+    if any(name in missing for name in required):
+        return None
+    return valid
+
+
+def parse_model_list(text: str, model: Type[BaseModel], required: Iterable[str] = ()) -> Optional[List[Dict[str, Any]]]:
+    """
+    从模型输出中提取对象数组并逐项按模型校验
+
+    输出为只含一个数组字段的对象（如 {"questions": [...]}）时取该数组；
+    数组元素为字符串时视为第一个字段的值。缺少required字段的元素被丢弃。
+
+    Returns:
+        Optional[List[Dict[str, Any]]]: 校验后的元素列表，无法提取数组时返回None
+    """
+    data = extract_json(text)
+    if isinstance(data, dict):
+        lists = [value for value in data.values() if isinstance(value, list)]
+        data = lists[0] if len(lists) == 1 else None
+    if not isinstance(data, list):
+        return None
+
+    required = list(required)
+    first_field = next(iter(model.__fields__))
+    items = []
+    for item in data:
+        if isinstance(item, str):
+            item = {first_field: item}
+        if not isinstance(item, dict):
+            continue
+        valid, missing = validate_fields(item, model)
+        if not any(name in missing for name in required):
+            items.append(valid)
+    return items
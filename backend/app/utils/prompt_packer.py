@@ -0,0 +1,83 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+from .tokenizer import count_tokens, token_prefix, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+# 每条参考资料的编号、换行等格式开销
+CONTEXT_ITEM_OVERHEAD = 4
+
+
+class PromptPacker:
+    """
+    按token预算组装提示词
+
+    模板本身的token数先从预算中扣除；检索到的参考资料按相关度顺序整条放入，
+    最多占用context_share比例的剩余预算；其余预算按权重分配给各文本字段，
+    未用满份额的字段把余量让给其他字段，超出份额的字段在句子边界处截断。
+    """
+
+    def __init__(self, budget: int, context_share: float = 0.3):
+        self.budget = budget
+        self.context_share = context_share
+
+    def pack(self, template: str, fields: Dict[str, str], context: Optional[List[str]] = None,
+             weights: Optional[Dict[str, float]] = None) -> Tuple[Dict[str, str], List[str]]:
+        """
+        Args:
+            template: 提示词模板（含占位符），用于估算固定开销
+            fields: 可截断的文本字段
+            context: 按相关度排序的参考资料
+            weights: 字段权重，默认均为1
+
+        Returns:
+            Tuple[Dict[str, str], List[str]]: (截断后的字段, 保留的参考资料)
+        """
+        available = max(self.budget - count_tokens(template), 0)
+        weights = weights or {}
+
+        # 参考资料整条放入，不截断单条内容
+        kept_context = []
+        context_budget = available * self.context_share if context else 0
+        used = 0
+        for chunk in context or []:
+            cost = count_tokens(chunk) + CONTEXT_ITEM_OVERHEAD
+            if used + cost > context_budget:
+                break
+            kept_context.append(chunk)
+            used += cost
+        available -= used
+
+        prefixes = {name: token_prefix(text) for name, text in fields.items()}
+        sizes = {name: float(prefix[-1]) for name, prefix in prefixes.items()}
+        allocation = self._allocate(sizes, weights, available)
+
+        packed = {}
+        for name, text in fields.items():
+            if sizes[name] <= allocation[name]:
+                packed[name] = text
+            else:
+                packed[name] = truncate_to_tokens(text, int(allocation[name]), prefixes[name])
+                logger.info(f"提示词字段{name}从{int(sizes[name])}截断到{int(allocation[name])}个token")
+        return packed, kept_context
+
+    @staticmethod
+    def _allocate(sizes: Dict[str, float], weights: Dict[str, float], available: float) -> Dict[str, float]:
+        """按权重分配预算，需求小于份额的字段只取所需，余量再分给其他字段"""
+        allocation = {}
+        remaining = dict(sizes)
+        while remaining:
+            total_weight = sum(weights.get(name, 1.0) for name in remaining)
+            satisfied = {
+                name: size for name, size in remaining.items()
+                if size <= available * weights.get(name, 1.0) / total_weight
+            }
+            if not satisfied:
+                for name in remaining:
+                    allocation[name] = available * weights.get(name, 1.0) / total_weight
+                break
+            for name, size in satisfied.items():
+                allocation[name] = size
+                available -= size
+                del remaining[name]
+        return allocation
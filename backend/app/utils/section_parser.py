@@ -0,0 +1,179 @@
+import string
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# 只转换ASCII大小写，保证转换前后字符偏移一致
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+# 简历章节关键词，按优先级排列
+DEFAULT_SECTION_KEYWORDS: Dict[str, List[str]] = {
+    'education': ['教育', 'education', '学历'],
+    'experience': ['经验', 'experience', '工作', '实习'],
+    'skills': ['技能', 'skills', '技术'],
+    'projects': ['项目', 'projects', '作品'],
+    'achievements': ['成就', 'achievements', '获奖'],
+}
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick多模式匹配自动机
+
+    构建后一次扫描即可找出文本中所有模式的出现位置，耗时与文本长度和匹配数成正比，
+    与模式数量无关。
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, Any]], ignore_case: bool = True):
+        """
+        Args:
+            patterns: (模式, 附带数据) 序列
+            ignore_case: 是否忽略ASCII大小写
+        """
+        self.ignore_case = ignore_case
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, Any]]] = [[]]
+
+        for pattern, payload in patterns:
+            if not pattern:
+                continue
+            if ignore_case:
+                pattern = pattern.translate(_ASCII_LOWER)
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append((len(pattern), payload))
+
+        # 按广度优先计算失败指针，并合并失败状态的输出
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def finditer(self, text: str, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, int, Any]]:
+        """
+        查找text[start:end]中的所有匹配
+
+        Yields:
+            Tuple[int, int, Any]: (起始偏移, 结束偏移, 附带数据)，偏移相对于text
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        segment = text[start:end]
+        if self.ignore_case:
+            segment = segment.translate(_ASCII_LOWER)
+        root = goto[0]
+        state = 0
+        for offset, char in enumerate(segment, start + 1):
+            # 大部分字符不在任何模式开头，停在根状态时直接跳过
+            if not state and char not in root:
+                continue
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, payload in output[state]:
+                yield offset - length, offset, payload
+
+
+@dataclass
+class SectionSpan:
+    """章节正文在文本中的位置 [start, end)"""
+    section: str
+    start: int
+    end: int
+
+
+class SectionParser:
+    """
+    简历章节切分
+
+    逐行扫描一次：较短且包含章节关键词的行视为章节标题，标题之后到下一个标题之前的
+    内容为该章节正文，以偏移量返回。同一行包含多个关键词时取最先出现的，位置相同时
+    按关键词表顺序。
+    """
+
+    def __init__(self, keywords: Optional[Dict[str, List[str]]] = None, max_header_length: int = 24):
+        keywords = keywords or DEFAULT_SECTION_KEYWORDS
+        self.sections = list(keywords)
+        self.max_header_length = max_header_length
+        self._priority = {section: i for i, section in enumerate(self.sections)}
+        self._automaton = AhoCorasick(
+            (keyword, section) for section, section_keywords in keywords.items()
+            for keyword in section_keywords
+        )
+
+    def _match_header(self, text: str, start: int, end: int) -> Optional[str]:
+        best = None
+        for match_start, _, section in self._automaton.finditer(text, start, end):
+            key = (match_start, self._priority[section])
+            if best is None or key < best[0]:
+                best = (key, section)
+        return best[1] if best else None
+
+    def segment(self, text: str) -> List[SectionSpan]:
+        """
+        切分章节
+
+        Returns:
+            List[SectionSpan]: 按出现顺序排列的章节正文位置，无正文的章节不返回
+        """
+        spans = []
+        current = None
+        body_start = body_end = -1
+        pos = 0
+        length = len(text)
+
+        while pos <= length:
+            line_end = text.find('\n', pos)
+            if line_end == -1:
+                line_end = length
+
+            # 去掉行首尾空白后的范围
+            content_start, content_end = pos, line_end
+            while content_start < content_end and text[content_start].isspace():
+                content_start += 1
+            while content_end > content_start and text[content_end - 1].isspace():
+                content_end -= 1
+
+            if content_start < content_end:
+                section = None
+                if content_end - content_start <= self.max_header_length:
+                    section = self._match_header(text, content_start, content_end)
+                if section is not None:
+                    if current is not None and body_start >= 0:
+                        spans.append(SectionSpan(current, body_start, body_end))
+                    current = section
+                    body_start = body_end = -1
+                elif current is not None:
+                    if body_start < 0:
+                        body_start = content_start
+                    body_end = content_end
+
+            pos = line_end + 1
+
+        if current is not None and body_start >= 0:
+            spans.append(SectionSpan(current, body_start, body_end))
+        return spans
+
+    def materialize(self, text: str, spans: List[SectionSpan]) -> Dict[str, List[str]]:
+        """将章节位置展开为 {章节: [非空行]}"""
+        sections = {section: [] for section in self.sections}
+        for span in spans:
+            sections[span.section].extend(
+                line.strip() for line in text[span.start:span.end].split('\n') if line.strip()
+            )
+        return sections
@@ -0,0 +1,32 @@
+import json
+from typing import Any, AsyncIterator, Tuple
+from pydantic import BaseModel
+
+# SSE响应头：禁止缓存和反向代理缓冲，保证逐条推送
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no"
+}
+
+
+def format_sse(event: str, data: Any) -> str:
+    """
+    格式化一条Server-Sent Events消息
+
+    Args:
+        event: 事件类型
+        data: 可JSON序列化的数据或pydantic模型
+
+    Returns:
+        str: SSE消息文本
+    """
+    if isinstance(data, BaseModel):
+        data = data.dict()
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+async def sse_stream(events: AsyncIterator[Tuple[str, Any]]) -> AsyncIterator[str]:
+    """将(事件类型, 数据)序列转换为SSE消息流"""
+    async for event, data in events:
+        yield format_sse(event, data)
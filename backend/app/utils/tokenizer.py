@@ -0,0 +1,166 @@
+import time
+import asyncio
+import logging
+import threading
+from typing import Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - 未安装tiktoken时使用估算
+    tiktoken = None
+
+# 未安装tiktoken时的估算：CJK字符每字约1个token，其余字符约4个字符1个token
+CJK_TOKEN_COST = 1.0
+OTHER_TOKEN_COST = 0.25
+
+# CJK字符范围（含中日韩标点、全角字符）
+_CJK_RANGES = (
+    (0x2E80, 0x9FFF),
+    (0xAC00, 0xD7AF),
+    (0xF900, 0xFAFF),
+    (0xFF00, 0xFFEF),
+    (0x20000, 0x2FA1F),
+)
+
+# 句子边界：中文句末标点优先，其次英文句末标点和换行
+SENTENCE_TERMINATORS = "。！？；!?.;\n"
+_TERMINATOR_CODES = np.array([ord(c) for c in SENTENCE_TERMINATORS], dtype=np.uint32)
+
+
+# 编码表加载失败（如离线且本地没有缓存）后重试的间隔秒数，期间使用估算
+ENCODING_RETRY_INTERVAL = 300.0
+
+_encoding_name = "cl100k_base"
+_encoding = None
+_encoding_failed_at: Optional[float] = None
+_encoding_lock = threading.Lock()
+_background_load: Optional[asyncio.Future] = None
+
+
+def load_encoding() -> bool:
+    """
+    加载tiktoken编码表
+
+    首次加载可能需要下载编码表（阻塞），应在事件循环之外调用，如启动时放入线程池。
+    离线且本地没有缓存（见TIKTOKEN_CACHE_DIR）时回退到估算，ENCODING_RETRY_INTERVAL秒后
+    再次使用时重试。
+
+    Returns:
+        bool: 编码表是否可用
+    """
+    global _encoding, _encoding_failed_at
+    if tiktoken is None:
+        return False
+    with _encoding_lock:
+        if _encoding is not None:
+            return True
+        if _encoding_failed_at is not None and time.monotonic() - _encoding_failed_at < ENCODING_RETRY_INTERVAL:
+            return False
+        try:
+            _encoding = tiktoken.get_encoding(_encoding_name)
+            _encoding_failed_at = None
+            return True
+        except Exception as e:
+            _encoding_failed_at = time.monotonic()
+            logger.warning(f"加载tokenizer失败，{ENCODING_RETRY_INTERVAL:.0f}秒内使用估算: {str(e)}")
+            return False
+
+
+def _get_encoding():
+    """
+    已加载的编码表，不可用时返回None（使用估算）
+
+    在事件循环线程中不加载编码表，只在线程池中启动后台加载，避免下载阻塞事件循环；
+    其他线程和进程（解析进程池、命令行脚本）中直接加载。
+    """
+    global _background_load
+    if _encoding is not None or tiktoken is None:
+        return _encoding
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        load_encoding()
+        return _encoding
+    recently_failed = (_encoding_failed_at is not None
+                       and time.monotonic() - _encoding_failed_at < ENCODING_RETRY_INTERVAL)
+    if not recently_failed and (_background_load is None or _background_load.done()):
+        _background_load = loop.run_in_executor(None, load_encoding)
+    return None
+
+
+def _codepoints(text: str) -> np.ndarray:
+    """文本的Unicode码点数组"""
+    return np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+
+
+def _heuristic_costs(codes: np.ndarray) -> np.ndarray:
+    cjk = np.zeros(len(codes), dtype=bool)
+    for low, high in _CJK_RANGES:
+        cjk |= (codes >= low) & (codes <= high)
+    return np.where(cjk, CJK_TOKEN_COST, OTHER_TOKEN_COST)
+
+
+def token_prefix(text: str) -> np.ndarray:
+    """
+    计算token前缀和
+
+    Returns:
+        np.ndarray: 长度为len(text)+1的数组，prefix[i]为text[:i]的token数
+    """
+    prefix = np.zeros(len(text) + 1, dtype=np.float64)
+    if not text:
+        return prefix
+
+    encoding = _get_encoding()
+    if encoding is not None:
+        try:
+            # 每个token计在其起始字符上
+            decoded, offsets = encoding.decode_with_offsets(encoding.encode(text, disallowed_special=()))
+            if len(decoded) == len(text):
+                costs = np.zeros(len(text), dtype=np.float64)
+                np.add.at(costs, np.asarray(offsets, dtype=np.int64), 1.0)
+                np.cumsum(costs, out=prefix[1:])
+                return prefix
+        except Exception as e:
+            logger.debug(f"tokenizer偏移计算失败，使用估算: {str(e)}")
+
+    np.cumsum(_heuristic_costs(_codepoints(text)), out=prefix[1:])
+    return prefix
+
+
+def count_tokens(text: str) -> int:
+    """统计文本token数"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return int(np.ceil(_heuristic_costs(_codepoints(text)).sum()))
+
+
+def sentence_boundaries(text: str) -> np.ndarray:
+    """返回各句末标点之后的位置（升序），可作为切分点"""
+    return np.flatnonzero(np.isin(_codepoints(text), _TERMINATOR_CODES)) + 1
+
+
+def truncate_to_tokens(text: str, max_tokens: int, prefix: Optional[np.ndarray] = None,
+                       min_fill: float = 0.8) -> str:
+    """
+    将文本截断到不超过max_tokens
+
+    在预算的min_fill比例之后存在句子边界时在边界处截断，否则按token位置截断。
+    """
+    if max_tokens <= 0:
+        return ""
+    prefix = token_prefix(text) if prefix is None else prefix
+    if prefix[-1] <= max_tokens:
+        return text
+
+    end = int(np.searchsorted(prefix, max_tokens, side="right")) - 1
+    boundaries = sentence_boundaries(text[:end])
+    if len(boundaries) and prefix[boundaries[-1]] >= max_tokens * min_fill:
+        end = int(boundaries[-1])
+    return text[:end].rstrip()
@@ -0,0 +1,84 @@
+import os
+import uuid
+import hashlib
+import logging
+import aiofiles
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import UploadFile
+
+logger = logging.getLogger(__name__)
+
+
+class UploadTooLargeError(ValueError):
+    """上传文件超过大小限制"""
+
+
+@dataclass
+class SavedUpload:
+    """已保存的上传文件"""
+    path: str
+    size: int
+    sha256: str
+    # 文件不超过内存解析阈值时保留的内容，否则为None
+    content: Optional[bytes] = None
+
+
+async def save_upload(file: UploadFile, dest_path: str, max_bytes: int,
+                      chunk_size: int = 64 * 1024, keep_bytes: int = 0) -> SavedUpload:
+    """
+    分块写入上传文件并同时计算SHA-256
+
+    先写入同目录下的临时文件，完成后原子替换为目标文件；超过max_bytes时立即
+    中止并删除临时文件。不超过keep_bytes的文件内容保留在内存中供直接解析。
+
+    Args:
+        file: 上传文件
+        dest_path: 目标路径
+        max_bytes: 最大字节数
+        chunk_size: 每次读取的字节数
+        keep_bytes: 保留在内存中的最大字节数
+
+    Returns:
+        SavedUpload: 保存结果
+
+    Raises:
+        UploadTooLargeError: 文件超过大小限制
+    """
+    os.makedirs(os.path.dirname(dest_path) or '.', exist_ok=True)
+    tmp_path = f"{dest_path}.{uuid.uuid4().hex}.part"
+    digest = hashlib.sha256()
+    buffer: Optional[bytearray] = bytearray() if keep_bytes > 0 else None
+    size = 0
+
+    try:
+        async with aiofiles.open(tmp_path, 'wb') as f:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"文件超过大小限制（{max_bytes}字节）")
+                digest.update(chunk)
+                await f.write(chunk)
+
+                if buffer is not None:
+                    if size <= keep_bytes:
+                        buffer += chunk
+                    else:
+                        buffer = None
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    return SavedUpload(
+        path=dest_path,
+        size=size,
+        sha256=digest.hexdigest(),
+        content=bytes(buffer) if buffer is not None else None
+    )
@@ -0,0 +1,29 @@
+import argparse
+import asyncio
+import json
+import logging
+from app.services.knowledge_base_service import KnowledgeBaseService
+from app.services.llm_client import llm_client
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+
+
+async def main(verify_hashes: bool):
+    """增量同步知识库"""
+    try:
+        stats = await KnowledgeBaseService().sync(verify_hashes=verify_hashes)
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+    finally:
+        await llm_client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="增量同步知识库到向量库")
+    parser.add_argument(
+        "--verify-hashes",
+        action="store_true",
+        help="对所有文件重新计算内容哈希，而不是依据大小和修改时间跳过"
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.verify_hashes))
@@ -1,10 +1,21 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 import uvicorn
+import asyncio
 import logging
 from app.core.config import settings
-from app.api import resume, interview
+from app.core.metrics import registry as metrics_registry, http_metrics, MetricsMiddleware
+from app.core.tracing import TracingMiddleware, configure_trace_log
+from app.core.profiler import ProfilingMiddleware
+from app.api import resume, interview, knowledge_base
+from app.services.llm_client import llm_client
+from app.services.response_cache import response_cache
+from app.services.embedding_cache import embedding_cache
+from app.services.parse_cache import parse_cache
+from app.services.parse_executor import parse_executor
+from app.utils.document_processor import shutdown_process_pool
+from app.utils.tokenizer import load_encoding
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -28,9 +39,54 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 请求耗时与状态码指标
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware, metrics=http_metrics)
+
+# 请求阶段耗时（Server-Timing响应头与追踪日志）
+if settings.trace_log_path:
+    configure_trace_log(settings.trace_log_path)
+app.add_middleware(
+    TracingMiddleware,
+    server_timing=settings.server_timing_enabled,
+    log_traces=bool(settings.trace_log_path),
+    log_min_duration_ms=settings.trace_log_min_duration_ms
+)
+
+# 按请求开启的采样剖析，仅在配置了令牌时启用
+if settings.profiling_token:
+    logger.warning("已启用按请求采样剖析，请勿在公网环境中开启")
+    app.add_middleware(
+        ProfilingMiddleware,
+        token=settings.profiling_token,
+        interval=settings.profiling_interval_ms / 1000,
+        max_seconds=settings.profiling_max_seconds
+    )
+
 # 注册路由
 app.include_router(resume.router, prefix="/api/v1")
 app.include_router(interview.router, prefix="/api/v1")
+app.include_router(knowledge_base.router, prefix="/api/v1")
+
+# 启动时映射指标文件，在线程池中加载tokenizer编码表（可能需要下载），并开始后台补充面试题池
+@app.on_event("startup")
+async def startup_event():
+    asyncio.get_running_loop().run_in_executor(None, load_encoding)
+    if settings.metrics_enabled:
+        metrics_registry.open(settings.metrics_path)
+    if interview.interview_service.question_pool:
+        interview.interview_service.question_pool.start()
+
+# 关闭时释放LLM连接池、解析执行器并写入未落盘的会话
+@app.on_event("shutdown")
+async def shutdown_event():
+    if interview.interview_service.question_pool:
+        await interview.interview_service.question_pool.stop()
+    await interview.interview_service.session_store.close()
+    await llm_client.close()
+    parse_executor.shutdown()
+    shutdown_process_pool()
+    metrics_registry.close()
 
 # 全局异常处理
 @app.exception_handler(Exception)
@@ -52,6 +108,30 @@ async def health_check():
         "environment": settings.environment
     }
 
+# 缓存统计
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """缓存命中率统计"""
+    return {
+        "llm_responses": response_cache.stats(),
+        "embeddings": embedding_cache.stats(),
+        "parsed_documents": parse_cache.stats(),
+        "llm_coalescing": llm_client.single_flight.stats(),
+        "llm_calls": llm_client.policy.stats(),
+        "question_pool": interview.interview_service.question_pool.stats()
+        if interview.interview_service.question_pool else None
+    }
+
+# Prometheus指标
+if settings.metrics_enabled:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """所有worker汇总后的运行指标（Prometheus文本格式）"""
+        return PlainTextResponse(
+            metrics_registry.render(),
+            media_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+
 # 根路径
 @app.get("/")
 async def root():
@@ -74,10 +154,14 @@ async def api_info():
         "endpoints": {
             "resume": "/api/v1/resume",
             "interview": "/api/v1/interview",
+            "knowledge_base": "/api/v1/knowledge-base",
             "docs": "/docs"
         }
     }
 
+# 所有路由注册完成后按路由预先声明请求指标
+http_metrics.bind(app)
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
@@ -0,0 +1,363 @@
+"""
+DocumentProcessor 热点路径基准测试
+
+对 clean_text、chunk_text、extract_resume_sections 以及 PDF/Word/TXT 提取在生成的语料上
+测量吞吐量（MB/s）、峰值内存和调用结束时仍存活的内存块数，与基线文件比较，
+任一指标退化超过阈值时以非零状态退出。完全离线运行。
+
+CPython 不提供分配次数或累计分配字节数的计数器，tracemalloc 只能观察存活内存，因此
+分配情况以峰值内存（调用期间临时分配的上界）和存活块数（调用结束后未释放的块，含返回值）
+代替，只有峰值内存参与退化判定。
+
+共享机器的整体速度会随负载波动，因此每个用例前后都运行一段固定的参考负载，记录相对
+参考负载的速度（relative_speed），以相对速度判定退化；只有运行环境与基线一致时才同时
+比较绝对吞吐量。疑似退化的用例会重新测量。分块用例的耗时取决于tokenizer，当前tokenizer
+与基线不同时不参与判定；记录基线应在安装了tiktoken的环境中进行。
+
+用法：
+    python benchmarks/bench_document_processor.py                    # 快速档，与基线比较
+    python benchmarks/bench_document_processor.py --profile full     # 含50MB文本、500页PDF等
+    python benchmarks/bench_document_processor.py --update-baseline  # 重新记录基线
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, List, Optional
+
+# 添加项目根目录到Python路径
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.app.utils import tokenizer
+from backend.app.utils.document_processor import DocumentProcessor
+import corpus
+import numpy as np
+
+KB = 1024
+MB = 1024 * 1024
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_CORPUS_DIR = os.path.join(tempfile.gettempdir(), "talentintervuai-bench-corpus")
+
+# 档位：文本大小、PDF页数、Word表格行数
+PROFILES = {
+    "quick": {
+        "text_sizes": [1 * KB, 64 * KB, 1 * MB, 8 * MB],
+        "pdf_pages": [20, 200],
+        "docx_rows": [500],
+        "txt_sizes": [1 * MB],
+    },
+    "full": {
+        "text_sizes": [1 * KB, 64 * KB, 1 * MB, 8 * MB, 50 * MB],
+        "pdf_pages": [20, 200, 500],
+        "docx_rows": [500, 5000],
+        "txt_sizes": [1 * MB, 50 * MB],
+    },
+}
+
+# 耗时取决于tokenizer实现的用例
+TOKENIZER_CASE_PREFIX = "chunk_text["
+
+# 内存差异低于此值时不判定为退化，避免小输入上的噪声
+MEMORY_NOISE_BYTES = 256 * KB
+
+
+@dataclass
+class Case:
+    """一个基准用例"""
+    name: str
+    func: Callable[[], Any]
+    input_bytes: int
+
+
+@dataclass
+class Result:
+    """基准结果"""
+    input_bytes: int
+    seconds: float
+    mb_per_s: float
+    peak_mb: float
+    retained_blocks: int
+    # 参考负载耗时 / 用例耗时
+    relative_speed: float
+
+
+def _size_label(size: int) -> str:
+    return f"{size // MB}MB" if size >= MB else f"{size // KB}KB"
+
+
+def build_cases(profile: str, corpus_dir: str) -> List[Case]:
+    """按档位生成语料并构建用例"""
+    config = PROFILES[profile]
+    processor = DocumentProcessor()
+    # 提取用例不设页数和字节数上限、不使用进程池，测量单进程的完整解析
+    extractor = DocumentProcessor(pdf_max_pages=10 ** 6, pdf_max_text_bytes=1 << 40, pdf_process_workers=0)
+    cases = []
+
+    texts = {("mixed", size): corpus.generate_text(size, "mixed") for size in config["text_sizes"]}
+    texts[("cjk", 1 * MB)] = corpus.generate_text(1 * MB, "cjk")
+    texts[("latin", 1 * MB)] = corpus.generate_text(1 * MB, "latin")
+
+    for (language, size), text in texts.items():
+        label = f"{language}_{_size_label(size)}"
+        input_bytes = len(text.encode("utf-8"))
+        cases.append(Case(f"clean_text[{label}]", lambda t=text: processor.clean_text(t), input_bytes))
+        cases.append(Case(f"chunk_text[{label}]", lambda t=text: processor.chunk_text(t), input_bytes))
+        cases.append(Case(f"extract_resume_sections[{label}]",
+                          lambda t=text: processor.extract_resume_sections(t), input_bytes))
+
+    for pages in config["pdf_pages"]:
+        path = corpus.ensure_file(corpus_dir, f"resume_{pages}p.pdf",
+                                  lambda p, n=pages: open(p, "wb").write(corpus.generate_pdf(n)))
+        cases.append(Case(f"_extract_from_pdf[{pages}p]",
+                          lambda p=path: extractor._extract_from_pdf(p), os.path.getsize(path)))
+
+    for rows in config["docx_rows"]:
+        path = corpus.ensure_file(corpus_dir, f"resume_{rows}rows.docx",
+                                  lambda p, n=rows: corpus.generate_docx(p, n))
+        cases.append(Case(f"_extract_from_docx[{rows}rows]",
+                          lambda p=path: extractor._extract_from_docx(p), os.path.getsize(path)))
+
+    for size in config["txt_sizes"]:
+        path = corpus.ensure_file(
+            corpus_dir, f"resume_{_size_label(size)}.txt",
+            lambda p, n=size: open(p, "w", encoding="utf-8").write(corpus.generate_text(n, "mixed", seed=1))
+        )
+        cases.append(Case(f"_extract_from_txt[{_size_label(size)}]",
+                          lambda p=path: extractor._extract_from_txt(p), os.path.getsize(path)))
+
+    return cases
+
+
+_REFERENCE_TEXT = corpus.generate_text(64 * KB, "mixed", seed=7)
+
+
+def _reference_workload():
+    """固定的参考负载，覆盖正则、字符串和numpy操作"""
+    text = re.sub(r"\s+", " ", _REFERENCE_TEXT)
+    sorted(text.split(" "))
+    np.cumsum(np.frombuffer(_REFERENCE_TEXT.encode("utf-32-le"), dtype=np.uint32))
+
+
+def reference_seconds(repeat: int = 20) -> float:
+    """参考负载的最短耗时"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        _reference_workload()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def measure(case: Case, min_batch_seconds: float = 0.1, batches: int = 7) -> Result:
+    """
+    测量单个用例
+
+    计时：自动确定每批调用次数使一批耗时不少于min_batch_seconds，关闭GC后取各批平均耗时的
+    最小值，减少共享机器上的抖动。
+    内存：单独调用一次并用tracemalloc跟踪，记录峰值和调用结束时仍存活的内存块数（含返回值）；
+    后者不是分配次数，见模块说明。
+    """
+    case.func()  # 预热
+    reference = reference_seconds()
+
+    def run_batch(calls: int) -> float:
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            for _ in range(calls):
+                case.func()
+            return time.perf_counter() - started
+        finally:
+            gc.enable()
+
+    calls = 1
+    while True:
+        elapsed = run_batch(calls)
+        if elapsed >= min_batch_seconds or calls >= 1 << 16:
+            break
+        calls *= 2
+
+    best = elapsed / calls
+    # 单批超过1秒的用例减少重复次数，避免完整档运行过久
+    for _ in range(batches - 1 if elapsed < 1.0 else 2):
+        best = min(best, run_batch(calls) / calls)
+    reference = min(reference, reference_seconds())
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = case.func()
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    retained = sum(stat.count for stat in snapshot.statistics("filename"))
+    del result
+
+    return Result(
+        input_bytes=case.input_bytes,
+        seconds=best,
+        mb_per_s=case.input_bytes / MB / best if best > 0 else float("inf"),
+        peak_mb=peak / MB,
+        retained_blocks=retained,
+        relative_speed=reference / best if best > 0 else float("inf")
+    )
+
+
+def compare(results: Dict[str, Result], baseline: Dict[str, Dict[str, Any]], threshold: float,
+            same_environment: bool = False) -> List[str]:
+    """
+    与基线比较，返回退化说明列表
+
+    相对速度总是参与比较；绝对吞吐量只在运行环境与基线一致（same_environment）时比较，
+    不同机器之间的绝对吞吐量没有可比性。
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result.relative_speed < base["relative_speed"] * (1.0 - threshold):
+            regressions.append(
+                f"{name}: 相对速度 {result.relative_speed:.4g}，基线 {base['relative_speed']:.4g}"
+                f"（{result.mb_per_s:.2f} MB/s，基线记录时 {base['mb_per_s']:.2f} MB/s）"
+            )
+        elif same_environment and result.mb_per_s < base["mb_per_s"] * (1.0 - threshold):
+            regressions.append(f"{name}: 吞吐量 {result.mb_per_s:.2f} MB/s，基线 {base['mb_per_s']:.2f} MB/s")
+        peak_bytes, base_peak_bytes = result.peak_mb * MB, base["peak_mb"] * MB
+        if peak_bytes > base_peak_bytes * (1.0 + threshold) and peak_bytes - base_peak_bytes > MEMORY_NOISE_BYTES:
+            regressions.append(
+                f"{name}: 峰值内存 {result.peak_mb:.2f} MB，基线 {base['peak_mb']:.2f} MB"
+            )
+    return regressions
+
+
+def environment() -> Dict[str, Any]:
+    """运行环境信息，基线在不同环境间不可直接比较"""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "tokenizer": "tiktoken" if tokenizer._get_encoding() is not None else "heuristic",
+    }
+
+
+def comparable_results(baseline: Dict[str, Any], env: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """基线中可与当前环境比较的用例：tokenizer不同时排除分块用例"""
+    results = baseline.get("results", {})
+    if baseline.get("environment", {}).get("tokenizer") == env["tokenizer"]:
+        return results
+    return {name: result for name, result in results.items() if not name.startswith(TOKENIZER_CASE_PREFIX)}
+
+
+def load_baseline(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="DocumentProcessor 热点路径基准测试")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick", help="语料档位")
+    parser.add_argument("--filter", default="", help="只运行名称包含该字符串的用例")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基线文件路径")
+    parser.add_argument("--update-baseline", action="store_true", help="用本次结果更新基线")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="允许的退化比例，相对速度下降或峰值内存增长超过该比例即失败")
+    parser.add_argument("--retries", type=int, default=2,
+                        help="疑似退化的用例重新测量的次数，取最好结果，排除偶发抖动")
+    parser.add_argument("--allow-heuristic-tokenizer", action="store_true",
+                        help="允许在未安装tiktoken的环境中记录基线")
+    parser.add_argument("--output", help="将本次结果写入JSON文件")
+    parser.add_argument("--corpus-dir", default=DEFAULT_CORPUS_DIR, help="生成语料的缓存目录")
+    args = parser.parse_args(argv)
+
+    cases = [case for case in build_cases(args.profile, args.corpus_dir) if args.filter in case.name]
+    baseline = load_baseline(args.baseline)
+    env = environment()
+    if args.update_baseline and env["tokenizer"] != "tiktoken" and not args.allow_heuristic_tokenizer:
+        print("未安装tiktoken，分块用例的耗时与生产环境不符；请安装tiktoken后记录基线，"
+              "或使用 --allow-heuristic-tokenizer", file=sys.stderr)
+        return 2
+    same_environment = bool(baseline) and baseline.get("environment") == env
+    if baseline and not same_environment:
+        print(f"注意：基线记录于不同环境 {baseline.get('environment')}，只比较相对速度和峰值内存",
+              file=sys.stderr)
+    base_results = comparable_results(baseline or {}, env)
+    if baseline and len(base_results) < len(baseline.get("results", {})):
+        print(f"注意：基线使用 {baseline['environment'].get('tokenizer')} tokenizer，分块用例不参与判定",
+              file=sys.stderr)
+
+    results: Dict[str, Result] = {}
+    print(f"{'用例':<42}{'MB/s':>10}{'相对速度':>10}{'基线':>10}{'峰值MB':>10}{'存活块':>10}")
+    for case in cases:
+        result = measure(case)
+        results[case.name] = result
+        base = base_results.get(case.name)
+        base_text = f"{base['relative_speed']:.4g}" if base else "-"
+        print(f"{case.name:<42}{result.mb_per_s:>10.2f}{result.relative_speed:>10.4g}{base_text:>10}"
+              f"{result.peak_mb:>10.2f}{result.retained_blocks:>10}", flush=True)
+
+    if baseline is not None and not args.update_baseline:
+        cases_by_name = {case.name: case for case in cases}
+        for _ in range(args.retries):
+            suspects = {line.split(":")[0]
+                        for line in compare(results, base_results, args.threshold, same_environment)}
+            if not suspects:
+                break
+            print(f"重新测量疑似退化的用例：{', '.join(sorted(suspects))}", file=sys.stderr)
+            for name in suspects:
+                result, retry = results[name], measure(cases_by_name[name])
+                results[name] = Result(
+                    input_bytes=result.input_bytes,
+                    seconds=min(result.seconds, retry.seconds),
+                    mb_per_s=max(result.mb_per_s, retry.mb_per_s),
+                    peak_mb=min(result.peak_mb, retry.peak_mb),
+                    retained_blocks=min(result.retained_blocks, retry.retained_blocks),
+                    relative_speed=max(result.relative_speed, retry.relative_speed)
+                )
+
+    payload = {"environment": env, "results": {name: asdict(result) for name, result in results.items()}}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+
+    if args.update_baseline:
+        # 保留本次未运行的用例（如快速档更新时保留完整档的记录）
+        merged = dict(base_results)
+        merged.update(payload["results"])
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"environment": env, "results": merged}, f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"基线已更新：{args.baseline}")
+        return 0
+
+    if baseline is None:
+        print("未找到基线文件，使用 --update-baseline 记录", file=sys.stderr)
+        return 0
+
+    regressions = compare(results, base_results, args.threshold, same_environment)
+    if regressions:
+        print(f"\n{len(regressions)} 项退化超过 {args.threshold:.0%}：", file=sys.stderr)
+        for line in regressions:
+            print(f"  {line}", file=sys.stderr)
+        return 1
+    print(f"\n无超过 {args.threshold:.0%} 的退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
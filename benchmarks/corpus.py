@@ -0,0 +1,124 @@
+"""
+基准测试语料生成
+
+所有语料由固定随机种子生成，同一参数每次生成的内容相同，生成后缓存在语料目录中。
+"""
+import os
+import random
+from typing import List
+
+# 简历常见内容片段
+CJK_SENTENCES = [
+    "负责核心业务系统的架构设计与性能优化，接口平均延迟降低百分之四十。",
+    "主导推荐系统重构，日均处理请求超过两亿次。",
+    "熟悉分布式系统、微服务治理和高并发场景下的缓存设计。",
+    "带领五人团队完成数据平台迁移，按期上线且无重大故障。",
+    "获得校级一等奖学金，担任学生会技术部部长。",
+    "参与制定团队代码规范和持续集成流程。",
+]
+LATIN_SENTENCES = [
+    "Designed and implemented a streaming pipeline with Kafka and Flink.",
+    "Improved PostgreSQL query latency by 3x through index tuning.",
+    "Built internal tooling in Python, Go and TypeScript.",
+    "Mentored junior engineers and led weekly design reviews.",
+    "Deployed services on Kubernetes with Docker and Helm charts.",
+    "Bachelor of Science in Computer Science, GPA 3.8/4.0.",
+]
+SECTION_HEADERS = ["教育背景", "工作经验", "项目经验", "专业技能", "获奖情况",
+                   "Education", "Experience", "Projects", "Skills"]
+
+
+def generate_text(size: int, language: str = "mixed", seed: int = 0) -> str:
+    """
+    生成约size字节（UTF-8）的简历风格文本
+
+    Args:
+        size: 目标字节数
+        language: mixed（中英混合）、cjk 或 latin
+        seed: 随机种子
+    """
+    rng = random.Random(seed)
+    pools = {
+        "mixed": CJK_SENTENCES + LATIN_SENTENCES,
+        "cjk": CJK_SENTENCES,
+        "latin": LATIN_SENTENCES,
+    }[language]
+
+    parts: List[str] = []
+    written = 0
+    while written < size:
+        if rng.random() < 0.08:
+            line = "\n" + rng.choice(SECTION_HEADERS) + "\n"
+        else:
+            # 夹杂多余空白和特殊字符，覆盖clean_text的各个分支
+            line = rng.choice(pools) + rng.choice(["", "  ", "\t", " ★ "]) + rng.choice(["\n", " ", "\n\n"])
+        parts.append(line)
+        written += len(line.encode("utf-8"))
+    return "".join(parts)
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def generate_pdf(pages: int, lines_per_page: int = 40, seed: int = 0) -> bytes:
+    """
+    生成多页PDF
+
+    使用PDF内置的Helvetica字体，不依赖第三方库，因此页面内容只包含拉丁字符。
+    """
+    rng = random.Random(seed)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for _ in range(pages):
+        lines = " T* ".join(
+            f"({_pdf_escape(rng.choice(LATIN_SENTENCES))}) Tj" for _ in range(lines_per_page)
+        )
+        stream = f"BT /F1 10 Tf 14 TL 50 760 Td {lines} ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def generate_docx(path: str, rows: int, columns: int = 5, paragraphs: int = 50, seed: int = 0):
+    """生成包含若干段落和一个大表格的Word文档"""
+    from docx import Document
+
+    rng = random.Random(seed)
+    pool = CJK_SENTENCES + LATIN_SENTENCES
+    document = Document()
+    for _ in range(paragraphs):
+        document.add_paragraph(rng.choice(pool))
+
+    table = document.add_table(rows=rows, cols=columns)
+    # row.cells每次都会重建整张表的网格，一次取出全部单元格再写入
+    for cell in table._cells:
+        cell.text = rng.choice(pool)[:24]
+    document.save(path)
+
+
+def ensure_file(corpus_dir: str, name: str, build) -> str:
+    """语料文件不存在时调用build(path)生成，返回文件路径"""
+    os.makedirs(corpus_dir, exist_ok=True)
+    path = os.path.join(corpus_dir, name)
+    if not os.path.exists(path):
+        tmp_path = path + ".part"
+        build(tmp_path)
+        os.replace(tmp_path, path)
+    return path
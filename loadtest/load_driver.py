@@ -0,0 +1,276 @@
+"""
+后端压测驱动
+
+以若干虚拟用户并发回放典型流量：上传简历、简历分析（完整、快速、流式）和完整的模拟面试
+（创建会话、逐题作答、评估）。按接口统计请求数、错误率、吞吐量和 p50/p95/p99 延迟。
+
+用法（后端已指向桩LLM服务）：
+    python loadtest/load_driver.py --base-url http://127.0.0.1:8000 --users 20 --duration 60
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+API_PREFIX = "/api/v1"
+
+# 场景权重，可通过 --mix 覆盖
+DEFAULT_MIX = {
+    "upload": 2,
+    "analyze": 3,
+    "analyze_fast": 4,
+    "analyze_stream": 1,
+    "interview": 1,
+}
+
+JOB_TYPES = ["software_engineer", "data_scientist", "product_manager"]
+SKILLS = ["Python", "Java", "Go", "SQL", "Redis", "Kafka", "Docker", "Kubernetes", "机器学习",
+          "数据分析", "微服务", "分布式系统", "React", "需求分析", "A/B测试"]
+JOB_DESCRIPTIONS = [
+    "负责后端服务开发，要求熟悉Python或Go、MySQL、Redis，有分布式系统和微服务经验。",
+    "负责推荐算法研发，要求熟悉机器学习、Python、Spark，有A/B测试和特征工程经验。",
+    "负责B端产品规划，要求具备需求分析、用户研究和数据分析能力，熟悉SQL。",
+]
+ANSWERS = [
+    "我会先明确问题边界，再从监控指标入手定位瓶颈，最后通过压测验证优化效果。",
+    "在上一个项目中我负责缓存层设计，采用多级缓存并通过一致性哈希扩展节点。",
+    "我会与产品确认核心指标，拆分迭代目标，并在每个迭代结束后复盘。",
+]
+
+
+def generate_resume(rng: random.Random) -> str:
+    """生成一份随机简历文本"""
+    skills = rng.sample(SKILLS, rng.randint(4, 8))
+    lines = [
+        "教育背景",
+        f"{rng.choice(['北京大学', '浙江大学', '复旦大学', '中山大学'])} 计算机科学 {rng.choice(['本科', '硕士'])}",
+        "工作经验",
+    ]
+    for year in range(rng.randint(1, 4)):
+        lines.append(f"{2018 + year}-{2019 + year} 某科技公司 工程师，使用{rng.choice(skills)}和{rng.choice(skills)}"
+                     f"负责核心模块开发，性能提升{rng.randint(10, 80)}%")
+    lines += ["项目经验", f"主导{rng.choice(['推荐系统', '支付网关', '数据平台', '搜索服务'])}重构",
+              "专业技能", "、".join(skills)]
+    return "\n".join(lines)
+
+
+@dataclass
+class EndpointStats:
+    """单个接口的统计"""
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    statuses: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+
+class LoadDriver:
+    """按场景权重驱动虚拟用户并收集统计"""
+
+    def __init__(self, base_url: str, users: int, duration: float, mix: Dict[str, float],
+                 timeout: float = 120.0, seed: Optional[int] = None):
+        self.base_url = base_url.rstrip("/")
+        self.users = users
+        self.duration = duration
+        self.mix = {name: weight for name, weight in mix.items() if weight > 0}
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.stats: Dict[str, EndpointStats] = defaultdict(EndpointStats)
+        # 已上传简历的摘要，供分析场景引用
+        self.digests: List[str] = []
+        self.elapsed = 0.0
+
+    def record(self, endpoint: str, started: float, status: Any, ok: bool):
+        stats = self.stats[endpoint]
+        stats.latencies.append((time.perf_counter() - started) * 1000)
+        stats.statuses[str(status)] += 1
+        if not ok:
+            stats.errors += 1
+
+    async def request(self, client: httpx.AsyncClient, method: str, path: str, endpoint: str,
+                      **kwargs) -> Optional[httpx.Response]:
+        """发送请求并以接口模板（而不是实际路径）为键记录结果"""
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, API_PREFIX + path, **kwargs)
+        except httpx.HTTPError as e:
+            self.record(endpoint, started, type(e).__name__, False)
+            return None
+        self.record(endpoint, started, response.status_code, response.status_code < 400)
+        return response
+
+    def _analysis_request(self, rng: random.Random) -> Dict[str, Any]:
+        index = rng.randrange(len(JOB_DESCRIPTIONS))
+        return {
+            "resume_text": "" if self.digests else generate_resume(rng),
+            "target_job": "工程师",
+            "job_description": JOB_DESCRIPTIONS[index],
+            "job_type": JOB_TYPES[index],
+        }
+
+    async def scenario_upload(self, client: httpx.AsyncClient, rng: random.Random):
+        # 部分简历重复上传，覆盖解析缓存命中的路径
+        variant = rng.randint(0, 50)
+        content = generate_resume(random.Random(variant)).encode("utf-8")
+        response = await self.request(
+            client, "POST", "/resume/upload", "POST /resume/upload",
+            files={"file": (f"resume_{variant}.txt", content, "text/plain")}
+        )
+        if response is not None and response.status_code == 200:
+            digest = response.json().get("sha256")
+            if digest and digest not in self.digests:
+                self.digests.append(digest)
+
+    def _analysis_params(self, rng: random.Random, **params) -> Dict[str, Any]:
+        if self.digests:
+            params["digest"] = rng.choice(self.digests)
+        return params
+
+    async def scenario_analyze(self, client: httpx.AsyncClient, rng: random.Random):
+        await self.request(client, "POST", "/resume/analyze", "POST /resume/analyze",
+                           params=self._analysis_params(rng), json=self._analysis_request(rng))
+
+    async def scenario_analyze_fast(self, client: httpx.AsyncClient, rng: random.Random):
+        await self.request(client, "POST", "/resume/analyze", "POST /resume/analyze?mode=fast",
+                           params=self._analysis_params(rng, mode="fast"), json=self._analysis_request(rng))
+
+    async def scenario_analyze_stream(self, client: httpx.AsyncClient, rng: random.Random):
+        endpoint = "POST /resume/analyze/stream"
+        started = time.perf_counter()
+        try:
+            async with client.stream("POST", API_PREFIX + "/resume/analyze/stream",
+                                     params=self._analysis_params(rng),
+                                     json=self._analysis_request(rng)) as response:
+                first_event = True
+                async for line in response.aiter_lines():
+                    if first_event and line.startswith("event:"):
+                        self.record(endpoint + " (first event)", started, response.status_code, True)
+                        first_event = False
+                ok = response.status_code < 400 and not first_event
+                self.record(endpoint, started, response.status_code, ok)
+        except httpx.HTTPError as e:
+            self.record(endpoint, started, type(e).__name__, False)
+
+    async def scenario_interview(self, client: httpx.AsyncClient, rng: random.Random):
+        response = await self.request(
+            client, "POST", "/interview/create-session", "POST /interview/create-session",
+            params={"job_type": rng.choice(JOB_TYPES), "user_background": generate_resume(rng)[:200]}
+        )
+        if response is None or response.status_code != 200:
+            return
+        session_id = response.json()["session_id"]
+
+        for _ in range(response.json().get("total_questions", 0)):
+            question = await self.request(client, "GET", f"/interview/session/{session_id}/current-question",
+                                          "GET /interview/session/{id}/current-question")
+            if question is None or question.status_code != 200:
+                return
+            answer = await self.request(client, "POST", f"/interview/session/{session_id}/submit-answer",
+                                        "POST /interview/session/{id}/submit-answer",
+                                        params={"answer": rng.choice(ANSWERS)})
+            if answer is None or answer.status_code != 200 or answer.json().get("is_completed"):
+                break
+
+        await self.request(client, "POST", f"/interview/session/{session_id}/evaluate",
+                           "POST /interview/session/{id}/evaluate")
+
+    async def user(self, client: httpx.AsyncClient, deadline: float, seed: int):
+        """单个虚拟用户：按权重选择场景直到截止时间"""
+        rng = random.Random(seed)
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        while time.perf_counter() < deadline:
+            scenario = rng.choices(names, weights)[0]
+            await getattr(self, f"scenario_{scenario}")(client, rng)
+
+    async def run(self):
+        limits = httpx.Limits(max_connections=self.users * 2, max_keepalive_connections=self.users * 2)
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=limits) as client:
+            started = time.perf_counter()
+            deadline = started + self.duration
+            await asyncio.gather(*(self.user(client, deadline, self.rng.randrange(1 << 30))
+                                   for _ in range(self.users)))
+            self.elapsed = time.perf_counter() - started
+
+    def report(self) -> Dict[str, Any]:
+        """按接口汇总统计"""
+        endpoints = {}
+        for endpoint, stats in sorted(self.stats.items()):
+            latencies = np.array(stats.latencies)
+            count = len(latencies)
+            endpoints[endpoint] = {
+                "requests": count,
+                "errors": stats.errors,
+                "error_rate": stats.errors / count if count else 0.0,
+                "throughput_rps": count / self.elapsed if self.elapsed else 0.0,
+                "p50_ms": float(np.percentile(latencies, 50)) if count else 0.0,
+                "p95_ms": float(np.percentile(latencies, 95)) if count else 0.0,
+                "p99_ms": float(np.percentile(latencies, 99)) if count else 0.0,
+                "max_ms": float(latencies.max()) if count else 0.0,
+                "statuses": dict(stats.statuses),
+            }
+        # 首个事件的记录不是独立请求，不计入总数
+        requests = {name: data for name, data in endpoints.items() if not name.endswith("(first event)")}
+        total = sum(data["requests"] for data in requests.values())
+        errors = sum(data["errors"] for data in requests.values())
+        return {
+            "duration_s": self.elapsed,
+            "users": self.users,
+            "total_requests": total,
+            "total_errors": errors,
+            "error_rate": errors / total if total else 0.0,
+            "throughput_rps": total / self.elapsed if self.elapsed else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"\n{'接口':<52}{'请求数':>8}{'错误率':>8}{'RPS':>8}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for endpoint, data in report["endpoints"].items():
+        print(f"{endpoint:<52}{data['requests']:>8}{data['error_rate']:>8.1%}{data['throughput_rps']:>8.2f}"
+              f"{data['p50_ms']:>9.0f}{data['p95_ms']:>9.0f}{data['p99_ms']:>9.0f}")
+    print(f"\n共 {report['total_requests']} 个请求，{report['users']} 个并发用户，耗时 {report['duration_s']:.1f}s，"
+          f"吞吐量 {report['throughput_rps']:.2f} req/s，错误率 {report['error_rate']:.2%}（延迟单位：毫秒）")
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """解析 "upload=2,analyze=3" 形式的场景权重"""
+    mix = dict(DEFAULT_MIX)
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, _, weight = item.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"未知场景: {name}，可选: {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight)
+    return mix
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="后端压测驱动")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="后端地址")
+    parser.add_argument("--users", type=int, default=10, help="并发虚拟用户数")
+    parser.add_argument("--duration", type=float, default=30.0, help="压测时长（秒）")
+    parser.add_argument("--mix", type=parse_mix, default=dict(DEFAULT_MIX),
+                        help=f"场景权重，如 analyze_fast=5,interview=0，可选场景: {', '.join(DEFAULT_MIX)}")
+    parser.add_argument("--timeout", type=float, default=120.0, help="单个请求超时（秒）")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    parser.add_argument("--output", help="将统计结果写入JSON文件")
+    args = parser.parse_args(argv)
+
+    driver = LoadDriver(args.base_url, args.users, args.duration, args.mix, args.timeout, args.seed)
+    asyncio.run(driver.run())
+    report = driver.report()
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0 if report["total_requests"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
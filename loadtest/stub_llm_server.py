@@ -0,0 +1,269 @@
+"""
+本地桩LLM服务
+
+实现后端用到的 OpenAI 兼容接口（/v1/chat/completions，含流式，以及 /v1/embeddings），
+按提示词类型返回固定的合法JSON，延迟和生成速度按可配置的分布采样，并可按比例注入失败。
+用于压测时替代真实模型，不消耗API额度。
+
+用法：
+    python loadtest/stub_llm_server.py --port 9000 --latency-ms 800 --tokens-per-second 40
+    # 后端指向桩服务
+    OPENAI_BASE_URL=http://127.0.0.1:9000/v1 OPENAI_API_KEY=stub uvicorn main:app
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+@dataclass
+class StubConfig:
+    """桩服务配置"""
+    # 首个token延迟（毫秒），按对数正态分布采样：中位数与对数标准差
+    latency_ms: float = 800.0
+    latency_sigma: float = 0.5
+    # 生成速度（token/秒），按对数正态分布采样
+    tokens_per_second: float = 40.0
+    token_rate_sigma: float = 0.3
+    # 向量化接口延迟（毫秒）
+    embedding_latency_ms: float = 50.0
+    embedding_dim: int = 1536
+    # 失败比例及失败时随机使用的状态码
+    failure_rate: float = 0.0
+    failure_statuses: List[int] = field(default_factory=lambda: [429, 500, 503])
+    seed: Optional[int] = None
+
+
+ANALYSIS_RESULT = {
+    "overall_score": 78,
+    "section_scores": {"education": 80, "experience": 75, "skills": 82, "projects": 70, "achievements": 60},
+    "strengths": ["技术栈与岗位要求高度匹配", "有大规模系统的实践经验"],
+    "weaknesses": ["项目成果缺少量化指标"],
+    "suggestions": ["为每个项目补充可量化的业务结果", "突出与岗位相关的核心技能"]
+}
+
+EVALUATION_RESULT = {
+    "overall_score": 7.5,
+    "category_scores": {"技术深度": 7, "表达清晰度": 8, "问题分析": 7.5},
+    "feedback": ["回答结构清晰，覆盖了主要知识点"],
+    "improvement_suggestions": ["结合具体项目数据说明效果"],
+    "strengths": ["思路清晰"],
+    "areas_for_improvement": ["细节可以更深入"]
+}
+
+QUESTION_TEMPLATES = [
+    ("请介绍一个你主导的项目，以及其中最大的技术挑战。", "项目经验", "medium"),
+    ("如何设计一个高并发的缓存系统？", "系统设计", "hard"),
+    ("请解释你最熟悉的数据结构及其适用场景。", "基础知识", "easy"),
+    ("遇到线上故障时你的排查思路是什么？", "问题解决", "medium"),
+    ("你如何与产品和设计团队协作推进需求？", "团队协作", "easy"),
+]
+
+
+def _question_list(count: int) -> List[Dict[str, str]]:
+    return [
+        {"question": question, "category": category, "difficulty": difficulty, "context": ""}
+        for question, category, difficulty in (QUESTION_TEMPLATES[i % len(QUESTION_TEMPLATES)] for i in range(count))
+    ]
+
+
+def canned_content(messages: List[Dict[str, Any]]) -> str:
+    """按系统提示词判断调用类型，返回对应的固定JSON文本"""
+    system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+    prompt = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+
+    if "简历分析" in system:
+        return json.dumps(ANALYSIS_RESULT, ensure_ascii=False)
+    if "面试评估" in system:
+        return json.dumps(EVALUATION_RESULT, ensure_ascii=False)
+    if "面试官" in system:
+        if "改写" in prompt:
+            # 个性化改写：原样返回题目，保持数量和顺序
+            match = re.search(r"原问题：(.*?)\n\n", prompt, re.S)
+            if match:
+                return match.group(1)
+        match = re.search(r"生成(\d+)个面试问题", prompt)
+        return json.dumps(_question_list(int(match.group(1)) if match else 5), ensure_ascii=False)
+    return "{}"
+
+
+def split_tokens(text: str) -> List[str]:
+    """按约4个ASCII字符或1个CJK字符切分，近似模型token"""
+    return re.findall(r"[\x00-\x7f]{1,4}|[^\x00-\x7f]", text)
+
+
+def pseudo_embedding(text: str, dim: int) -> np.ndarray:
+    """由文本哈希生成的确定性单位向量，相同文本得到相同向量"""
+    seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def create_app(config: Optional[StubConfig] = None) -> FastAPI:
+    """创建桩服务应用"""
+    config = config or StubConfig()
+    rng = random.Random(config.seed)
+    app = FastAPI(title="Stub LLM Server")
+    app.state.config = config
+    app.state.stats = {"chat": 0, "chat_stream": 0, "embeddings": 0, "failures": 0}
+
+    def sample_latency() -> float:
+        return rng.lognormvariate(math.log(max(config.latency_ms, 1e-3)), config.latency_sigma) / 1000
+
+    def sample_token_interval() -> float:
+        rate = rng.lognormvariate(math.log(max(config.tokens_per_second, 1e-3)), config.token_rate_sigma)
+        return 1.0 / rate
+
+    def maybe_fail() -> Optional[JSONResponse]:
+        if config.failure_rate <= 0 or rng.random() >= config.failure_rate:
+            return None
+        app.state.stats["failures"] += 1
+        status = rng.choice(config.failure_statuses)
+        error_type = "rate_limit_error" if status == 429 else "server_error"
+        return JSONResponse(
+            status_code=status,
+            content={"error": {"message": f"stub injected failure ({status})", "type": error_type,
+                               "param": None, "code": None}}
+        )
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        failure = maybe_fail()
+        if failure is not None:
+            await asyncio.sleep(sample_latency() / 4)
+            return failure
+
+        messages = body.get("messages", [])
+        tokens = split_tokens(canned_content(messages))
+        max_tokens = body.get("max_tokens")
+        if max_tokens:
+            tokens = tokens[:max_tokens]
+        model = body.get("model", "stub")
+        prompt_tokens = sum(len(split_tokens(str(m.get("content", "")))) for m in messages)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        if body.get("stream"):
+            app.state.stats["chat_stream"] += 1
+            return StreamingResponse(
+                _stream_chunks(completion_id, created, model, tokens),
+                media_type="text/event-stream"
+            )
+
+        app.state.stats["chat"] += 1
+        interval = sample_token_interval()
+        await asyncio.sleep(sample_latency() + interval * len(tokens))
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens)},
+                "finish_reason": "stop" if not max_tokens or len(tokens) < max_tokens else "length"
+            }],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                      "total_tokens": prompt_tokens + len(tokens)}
+        }
+
+    async def _stream_chunks(completion_id: str, created: int, model: str,
+                             tokens: List[str]) -> AsyncIterator[bytes]:
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> bytes:
+            payload = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8")
+
+        interval = sample_token_interval()
+        await asyncio.sleep(sample_latency())
+        yield chunk({"role": "assistant", "content": ""})
+        for token in tokens:
+            yield chunk({"content": token})
+            await asyncio.sleep(interval)
+        yield chunk({}, "stop")
+        yield b"data: [DONE]\n\n"
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        failure = maybe_fail()
+        if failure is not None:
+            return failure
+
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        app.state.stats["embeddings"] += 1
+        await asyncio.sleep(rng.lognormvariate(math.log(max(config.embedding_latency_ms, 1e-3)),
+                                               config.latency_sigma) / 1000)
+
+        base64_format = body.get("encoding_format") == "base64"
+        data = []
+        for index, text in enumerate(inputs):
+            vector = pseudo_embedding(str(text), config.embedding_dim)
+            embedding = base64.b64encode(vector.tobytes()).decode() if base64_format else vector.tolist()
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+        token_count = sum(len(split_tokens(str(text))) for text in inputs)
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "stub"),
+            "usage": {"prompt_tokens": token_count, "total_tokens": token_count}
+        }
+
+    @app.get("/stats")
+    async def stats():
+        """桩服务收到的调用次数"""
+        return app.state.stats
+
+    return app
+
+
+def parse_args(argv: Optional[List[str]] = None) -> Tuple[argparse.Namespace, StubConfig]:
+    parser = argparse.ArgumentParser(description="压测用的本地桩LLM服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="首个token延迟中位数（毫秒）")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="延迟对数正态分布的标准差")
+    parser.add_argument("--tokens-per-second", type=float, default=40.0, help="生成速度中位数")
+    parser.add_argument("--token-rate-sigma", type=float, default=0.3, help="生成速度对数正态分布的标准差")
+    parser.add_argument("--embedding-latency-ms", type=float, default=50.0, help="向量化延迟中位数（毫秒）")
+    parser.add_argument("--embedding-dim", type=int, default=1536)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="注入失败的比例（0-1）")
+    parser.add_argument("--failure-statuses", default="429,500,503", help="失败时使用的状态码，逗号分隔")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+    config = StubConfig(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        tokens_per_second=args.tokens_per_second,
+        token_rate_sigma=args.token_rate_sigma,
+        embedding_latency_ms=args.embedding_latency_ms,
+        embedding_dim=args.embedding_dim,
+        failure_rate=args.failure_rate,
+        failure_statuses=[int(status) for status in args.failure_statuses.split(",") if status.strip()],
+        seed=args.seed
+    )
+    return args, config
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    args, config = parse_args()
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
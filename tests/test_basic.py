@@ -41,7 +41,7 @@ class TestDocumentProcessor:
         """测试文本清理"""
         dirty_text = "  这是一个  测试文本  \n\n  包含多余空格  "
         cleaned = self.processor.clean_text(dirty_text)
-        assert cleaned == "这是一个 测试文本 包含多余空格"
+        assert cleaned == "这是一个 测试文本\n包含多余空格"
     
     def test_chunk_text(self):
         """测试文本分块"""
@@ -76,6 +76,8 @@ class TestDocumentProcessor:
         assert 'skills' in sections
         assert 'projects' in sections
         assert 'achievements' in sections
+        assert sections['education'] == ["北京大学 计算机科学 本科"]
+        assert sections['projects'] == ["推荐系统开发"]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,241 @@
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+import openai
+import pytest
+from openai import AsyncOpenAI
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from backend.app.services.call_policy import (
+    CallPolicy, CircuitBreaker, LLMCallError, LLMCircuitOpenError, LLMDeadlineExceeded, LLMUpstreamError
+)
+from backend.app.services.llm_client import LLMClient
+from backend.app.services.response_cache import ResponseCache
+from backend.app.services.single_flight import SingleFlight
+from loadtest.stub_llm_server import StubConfig, create_app
+
+REQUEST = httpx.Request("POST", "http://stub/v1/chat/completions")
+
+
+def status_error(status: int, headers=None) -> openai.APIStatusError:
+    response = httpx.Response(status, request=REQUEST, headers=headers)
+    return openai.APIStatusError(f"status {status}", response=response, body=None)
+
+
+def flaky(failures, result="ok"):
+    """依次抛出failures中的异常，之后返回result；返回 (函数, 调用次数列表)"""
+    calls = []
+
+    async def fn(timeout):
+        calls.append(timeout)
+        if len(calls) <= len(failures):
+            raise failures[len(calls) - 1]
+        return result
+
+    return fn, calls
+
+
+class TestCallPolicy:
+    """测试截止时间、重试与对冲"""
+
+    def test_retries_retryable_errors(self):
+        """测试429、5xx和连接错误会重试，并遵循Retry-After"""
+        policy = CallPolicy(default_deadline=5, max_retries=3, base_delay=0.001, max_delay=0.05)
+        fn, calls = flaky([status_error(503), status_error(429, {"retry-after": "0.01"}),
+                           openai.APIConnectionError(request=REQUEST)])
+        started = time.perf_counter()
+        assert asyncio.run(policy.call("analyze_resume", fn)) == "ok"
+        assert len(calls) == 4 and time.perf_counter() - started >= 0.01
+        assert policy.stats()["retry"] == 3
+
+    def test_non_retryable_and_exhausted_errors(self):
+        """测试400立即失败，重试次数用尽后抛出LLMUpstreamError并保留原始异常"""
+        policy = CallPolicy(default_deadline=5, max_retries=1, base_delay=0.001)
+        fn, calls = flaky([status_error(400)])
+        with pytest.raises(LLMUpstreamError) as error:
+            asyncio.run(policy.call("analyze_resume", fn))
+        assert len(calls) == 1 and isinstance(error.value.__cause__, openai.APIStatusError)
+
+        fn, calls = flaky([status_error(500)] * 3)
+        with pytest.raises(LLMUpstreamError):
+            asyncio.run(policy.call("analyze_resume", fn))
+        assert len(calls) == 2
+
+    def test_deadline_bounds_total_time(self):
+        """测试上游不返回时在截止时间内失败，单次请求超时不超过剩余时间"""
+        policy = CallPolicy(default_deadline=60, deadlines={"evaluate_interview_answer": 0.1},
+                            max_retries=5, base_delay=0.001)
+
+        async def hang(timeout):
+            await asyncio.sleep(10)
+
+        started = time.perf_counter()
+        with pytest.raises(LLMDeadlineExceeded):
+            asyncio.run(policy.call("evaluate_interview_answer", hang))
+        assert time.perf_counter() - started < 0.5
+
+    def test_hedged_request_wins_over_slow_primary(self):
+        """测试请求超过近期延迟百分位后发出对冲请求，先返回者胜出，另一个被取消"""
+        policy = CallPolicy(default_deadline=5, hedge_enabled=True, hedge_percentile=95,
+                            hedge_min_delay=0.01, hedge_min_samples=5)
+        for _ in range(10):
+            policy.latency.record("analyze_resume", 0.01)
+        started = []
+        cancelled = []
+
+        async def request(timeout):
+            started.append(timeout)
+            try:
+                await asyncio.sleep(1.0 if len(started) == 1 else 0.01)
+            except asyncio.CancelledError:
+                cancelled.append(len(started))
+                raise
+            return f"attempt-{len(started)}"
+
+        begin = time.perf_counter()
+        assert asyncio.run(policy.call("analyze_resume", request)) == "attempt-2"
+        assert time.perf_counter() - begin < 0.5
+        assert cancelled and policy.stats()["hedge"] == 1 and policy.stats()["hedge_win"] == 1
+
+
+class TestCircuitBreaker:
+    """测试熔断"""
+
+    def test_opens_fails_fast_and_recovers(self):
+        """测试连续失败后直接拒绝，冷却结束后放行一个探测请求，成功后恢复"""
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+        policy = CallPolicy(default_deadline=5, max_retries=0, breaker=breaker)
+        fn, calls = flaky([status_error(502), status_error(502)])
+
+        with pytest.raises(LLMUpstreamError):
+            asyncio.run(policy.call("analyze_resume", fn))
+        # 第二次失败达到阈值，本次调用即以熔断失败，之后的调用不再请求上游
+        for _ in range(2):
+            with pytest.raises(LLMCircuitOpenError) as error:
+                asyncio.run(policy.call("analyze_resume", fn))
+        assert len(calls) == 2 and error.value.retry_after == 10
+        assert breaker.state == CircuitBreaker.OPEN
+
+        now[0] = 10.0
+        probe = breaker.before_call()
+        with pytest.raises(LLMCircuitOpenError):
+            breaker.before_call()
+        breaker.release(probe)
+        assert asyncio.run(policy.call("analyze_resume", fn)) == "ok"
+        assert breaker.state == CircuitBreaker.CLOSED and policy.stats()["circuit_open"] == 2
+
+    def test_only_the_probe_ends_half_open(self):
+        """测试进入半开前放行的调用失败不释放探测名额、不重新熔断，只有探测调用的结果生效"""
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        assert breaker.before_call() is None
+        breaker.record_failure()
+        now[0] = 10.0
+        probe = breaker.before_call()
+        assert probe is not None and breaker.state == CircuitBreaker.HALF_OPEN
+
+        # 熔断前放行的调用此时才失败或被取消
+        breaker.record_failure()
+        breaker.release()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        with pytest.raises(LLMCircuitOpenError):
+            breaker.before_call()
+
+        breaker.record_failure(probe)
+        assert breaker.state == CircuitBreaker.OPEN
+
+    def test_non_retryable_errors_are_not_recorded(self):
+        """测试400既不重置连续失败次数，也不关闭半开的熔断，只释放探测名额"""
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+        policy = CallPolicy(default_deadline=5, max_retries=0, breaker=breaker)
+        fn, _ = flaky([status_error(502), status_error(400), status_error(502)])
+        for _ in range(2):
+            with pytest.raises(LLMUpstreamError):
+                asyncio.run(policy.call("analyze_resume", fn))
+        assert breaker.failures == 1
+        with pytest.raises(LLMCircuitOpenError):
+            asyncio.run(policy.call("analyze_resume", fn))
+        assert breaker.state == CircuitBreaker.OPEN
+
+        now[0] = 10.0
+        fn, calls = flaky([status_error(400)])
+        with pytest.raises(LLMUpstreamError):
+            asyncio.run(policy.call("analyze_resume", fn))
+        assert breaker.state == CircuitBreaker.HALF_OPEN and breaker.failures == 2
+        assert asyncio.run(policy.call("analyze_resume", fn)) == "ok"
+        assert len(calls) == 2 and breaker.state == CircuitBreaker.CLOSED
+
+    def test_failures_counted_per_call_and_per_kind(self):
+        """测试一次调用的多次重试只计一次失败，向量化失败不会熔断对话调用"""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+        embedding_breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+        policy = CallPolicy(default_deadline=5, max_retries=3, base_delay=0.001,
+                            breaker=breaker, embedding_breaker=embedding_breaker)
+
+        fn, calls = flaky([status_error(503)] * 4)
+        with pytest.raises(LLMUpstreamError):
+            asyncio.run(policy.call("analyze_resume", fn))
+        assert len(calls) == 4 and breaker.failures == 1 and breaker.state == CircuitBreaker.CLOSED
+
+        for _ in range(2):
+            fn, _ = flaky([openai.APIConnectionError(request=REQUEST)] * 4)
+            with pytest.raises(LLMCallError):
+                asyncio.run(policy.call("embedding", fn))
+        assert embedding_breaker.state == CircuitBreaker.OPEN
+        fn, _ = flaky([])
+        assert asyncio.run(policy.call("analyze_resume", fn)) == "ok"
+        assert policy.stats()["circuits"]["chat"]["state"] == CircuitBreaker.CLOSED
+
+
+class TestLLMClientPolicy:
+    """测试LLM客户端经由调用策略访问桩服务"""
+
+    def make_client(self, tmp_path, **stub_config):
+        app = create_app(StubConfig(seed=1, latency_ms=5, tokens_per_second=1e5, **stub_config))
+        http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://stub")
+        client = LLMClient(
+            cache=ResponseCache(str(tmp_path / "responses.sqlite3")),
+            single_flight=SingleFlight(),
+            policy=CallPolicy(default_deadline=5, max_retries=4, base_delay=0.001, max_delay=0.01,
+                              breaker=CircuitBreaker(failure_threshold=3, reset_timeout=30))
+        )
+        client._client = AsyncOpenAI(api_key="stub", base_url="http://stub/v1",
+                                     http_client=http_client, max_retries=0)
+        return client, app
+
+    def test_injected_failures_are_retried(self, tmp_path):
+        """测试桩服务按比例注入的失败被重试掩盖"""
+        client, app = self.make_client(tmp_path, failure_rate=0.3)
+        messages = [{"role": "user", "content": "生成5个面试问题"}]
+
+        async def run():
+            return [await client.chat(messages, max_tokens=100, temperature=0.7) for _ in range(10)]
+
+        assert all(asyncio.run(run()))
+        assert app.state.stats["failures"] > 0
+        assert client.policy.stats()["retry"] == app.state.stats["failures"]
+
+    def test_unhealthy_upstream_trips_breaker(self, tmp_path):
+        """测试上游持续失败时熔断，后续调用不再请求上游"""
+        client, app = self.make_client(tmp_path, failure_rate=1.0, failure_statuses=[500])
+        messages = [{"role": "user", "content": "评估面试回答"}]
+
+        async def call():
+            return await client.chat(messages, max_tokens=100, temperature=0.3)
+
+        # 每次调用重试4次后失败，第3次失败的调用触发熔断，之后不再请求上游
+        for _ in range(2):
+            with pytest.raises(LLMUpstreamError):
+                asyncio.run(call())
+        for _ in range(2):
+            with pytest.raises(LLMCircuitOpenError):
+                asyncio.run(call())
+        assert app.state.stats["failures"] == 15
@@ -0,0 +1,123 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.app.utils import document_processor
+from backend.app.utils.document_processor import DocumentProcessor
+from backend.app.utils.tokenizer import count_tokens
+
+
+def make_pdf(pages):
+    """生成每页包含一行ASCII文本的最小PDF"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (len(objects))
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+class TestPDFExtraction:
+    """测试PDF文本提取"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.processor = DocumentProcessor()
+        self.pages = [f"Page {i} text" for i in range(6)]
+
+    def test_iter_pdf_pages_stops_at_caps(self, tmp_path):
+        """测试达到页数或字节数上限时停止"""
+        path = tmp_path / "resume.pdf"
+        path.write_bytes(make_pdf(self.pages))
+
+        pages = list(self.processor.iter_pdf_pages(str(path), max_pages=3))
+        assert [page_num for page_num, _ in pages] == [0, 1, 2]
+        assert "Page 2 text" in pages[2][1]
+
+        pages = list(self.processor.iter_pdf_pages(str(path), max_bytes=15))
+        assert len(pages) == 2
+        assert sum(len(text.encode()) for _, text in pages) == 15
+
+    def test_parallel_extraction_matches_sequential(self, tmp_path):
+        """测试进程池并行提取与顺序提取结果一致"""
+        path = tmp_path / "resume.pdf"
+        path.write_bytes(make_pdf(self.pages))
+        sequential = self.processor.extract_text(str(path))
+
+        processor = DocumentProcessor(pdf_parallel_min_pages=4, pdf_process_workers=2)
+        try:
+            parallel = processor.extract_text(str(path))
+        finally:
+            document_processor.shutdown_process_pool()
+
+        assert parallel == sequential
+        assert len(sequential[1]) == 6
+        assert sequential[1][0].startswith("第1页: Page 0 text")
+
+    def test_extract_text_from_bytes_matches_file(self, tmp_path):
+        """测试从内存内容提取与从文件提取结果一致"""
+        for filename, content in [("resume.pdf", make_pdf(self.pages)),
+                                  ("resume.txt", "教育背景\r\n北京大学\n\n技能\nPython".encode())]:
+            path = tmp_path / filename
+            path.write_bytes(content)
+            assert self.processor.extract_text_from_bytes(content, filename) == \
+                self.processor.extract_text(str(path))
+
+
+class TestDocxExtraction:
+    """测试Word文档提取"""
+
+    def test_table_rows_match_row_cells(self, tmp_path):
+        """测试表格按行提取的结果与row.cells一致（含合并单元格）"""
+        from docx import Document
+
+        document = Document()
+        document.add_paragraph("个人简历")
+        table = document.add_table(rows=3, cols=3)
+        for i, row in enumerate(table.rows):
+            for j, cell in enumerate(row.cells):
+                cell.text = f"r{i}c{j}"
+        table.cell(0, 0).merge(table.cell(0, 1))
+        table.cell(1, 2).merge(table.cell(2, 2))
+        path = tmp_path / "resume.docx"
+        document.save(str(path))
+
+        expected = [" | ".join(cell.text.strip() for cell in row.cells) for row in Document(str(path)).tables[0].rows]
+        full_text, chunks = DocumentProcessor()._extract_from_docx(str(path))
+        assert chunks == ["个人简历"] + expected
+        assert full_text == "\n".join(chunks)
+
+
+class TestTokenChunker:
+    """测试按token分块"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.processor = DocumentProcessor()
+
+    def test_chunks_respect_token_budget_and_cjk_boundaries(self):
+        """测试分块不超过token预算，并在中文句末标点处切分"""
+        text = "负责后端服务的设计与开发。使用Python构建高并发系统！参与数据平台建设？" * 50
+        chunks = self.processor.chunk_text(text, chunk_size=64, overlap=8)
+        assert len(chunks) > 1
+        assert all(count_tokens(chunk) <= 64 for chunk in chunks)
+        assert all(chunk[-1] in "。！？" for chunk in chunks[:-1])
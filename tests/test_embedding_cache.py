@@ -0,0 +1,53 @@
+import asyncio
+import sys
+import os
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from backend.app.services.embedding_cache import EmbeddingCache
+from backend.app.services.embedding_service import EmbeddingService
+
+
+class FakeLLMClient:
+    """模拟LLM客户端，记录每次向量化请求"""
+
+    def __init__(self):
+        self.requests = []
+
+    async def embed(self, texts, timeout=None):
+        self.requests.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+class TestEmbeddingCache:
+    """测试向量缓存"""
+
+    def test_only_misses_are_embedded(self, tmp_path):
+        """测试一次批量查询，只为未命中且去重后的文本调用接口"""
+        client = FakeLLMClient()
+        cache = EmbeddingCache(str(tmp_path / "emb.sqlite3"))
+        service = EmbeddingService(client, cache)
+
+        asyncio.run(service.embed(["Python", "Java"]))
+        vectors = asyncio.run(service.embed(["Python", "Go", "  Go ", "Java"]))
+
+        assert client.requests == [["Python", "Java"], ["Go"]]
+        assert vectors.shape == (4, 2)
+        assert vectors[1].tolist() == vectors[2].tolist()
+        assert cache.stats()["memory_hits"] == 2
+
+    def test_disk_tier_shared_between_instances(self, tmp_path):
+        """测试磁盘缓存在不同进程（实例）间共享"""
+        path = str(tmp_path / "emb.sqlite3")
+        first = EmbeddingCache(path)
+        asyncio.run(first.put_many("model", ["机器学习"], np.array([[0.1, 0.2]], dtype=np.float32)))
+
+        second = EmbeddingCache(path)
+        result = asyncio.run(second.get_many("model", ["机器学习", "深度学习"]))
+        assert result[0].tolist() == np.array([0.1, 0.2], dtype=np.float32).tolist()
+        assert result[1] is None
+        assert asyncio.run(second.get_many("other-model", ["机器学习"])) == [None]
+        assert second.stats()["disk_hits"] == 1
@@ -0,0 +1,278 @@
+import asyncio
+import threading
+import time
+import pytest
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from backend.app.models.schemas import JobType
+from backend.app.services.interview_service import InterviewService
+from backend.app.services.session_store import InMemorySessionStore, SQLiteSessionStore
+from backend.app.services.question_pool import QuestionPool
+from backend.app.services.call_policy import LLMCallError, LLMUpstreamError
+
+
+class FakeRAGService:
+    """模拟RAG服务，记录评估调用次数"""
+
+    def __init__(self):
+        self.evaluate_calls = 0
+        self.generate_calls = 0
+
+    async def generate_interview_questions(self, job_type, user_background, num_questions=5):
+        self.generate_calls += 1
+        return [{"question": f"问题{i}", "category": "general", "difficulty": "medium"}
+                for i in range(3)]
+
+    async def personalize_interview_questions(self, job_type, user_background, questions):
+        await asyncio.sleep(0.01)
+        return [dict(q, question=f"{user_background}-{q['question']}") for q in questions]
+
+    async def evaluate_interview_answer(self, question, answer, job_type):
+        self.evaluate_calls += 1
+        await asyncio.sleep(0.01)
+        return {"overall_score": 60 + len(answer)}
+
+
+class FlakyRAGService(FakeRAGService):
+    """首次评估时模型服务不可用的RAG服务"""
+
+    async def evaluate_interview_answer(self, question, answer, job_type):
+        if self.evaluate_calls == 0:
+            self.evaluate_calls += 1
+            raise LLMUpstreamError("模型调用重试2次后仍失败")
+        return await super().evaluate_interview_answer(question, answer, job_type)
+
+
+class TestInterviewService:
+    """测试面试服务"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.service = InterviewService()
+        self.service.rag_service = FakeRAGService()
+
+    def test_answers_evaluated_in_background(self):
+        """测试提交回答后在后台评估，评估接口只汇总结果"""
+        async def run():
+            session = await self.service.create_interview_session(JobType.SOFTWARE_ENGINEER, "背景")
+            await self.service.submit_answer(session.session_id, "a")
+            await self.service.submit_answer(session.session_id, "bb")
+            assert self.service.rag_service.evaluate_calls == 0
+
+            await asyncio.sleep(0.05)
+            assert self.service.rag_service.evaluate_calls == 2
+
+            result = await self.service.evaluate_interview(session.session_id)
+            assert self.service.rag_service.evaluate_calls == 2
+            return result
+
+        result = asyncio.run(run())
+        assert result["answered_questions"] == 2
+        assert result["overall_score"] == pytest.approx(61.5)
+
+    def test_evaluate_waits_for_running_evaluations(self):
+        """测试评估接口等待仍在进行中的评估"""
+        async def run():
+            session = await self.service.create_interview_session(JobType.SOFTWARE_ENGINEER, "背景")
+            await self.service.submit_answer(session.session_id, "abc")
+            return await self.service.evaluate_interview(session.session_id)
+
+        result = asyncio.run(run())
+        assert result["evaluations"] == [{"overall_score": 63}]
+        assert self.service.rag_service.evaluate_calls == 1
+
+    def test_transient_failure_is_reevaluated(self):
+        """测试模型服务暂不可用时评估不保存为零分，下次评估重新调用并得到结果"""
+        self.service.rag_service = FlakyRAGService()
+
+        async def run():
+            session = await self.service.create_interview_session(JobType.SOFTWARE_ENGINEER, "背景")
+            await self.service.submit_answer(session.session_id, "abc")
+            with pytest.raises(LLMCallError):
+                await self.service.evaluate_interview(session.session_id)
+            assert self.service.session_store.get_evaluations(session.session_id) == {}
+
+            events = [event async for event, _ in self.service.evaluate_interview_stream(session.session_id)]
+            return events, await self.service.evaluate_interview(session.session_id)
+
+        events, result = asyncio.run(run())
+        assert events == ["evaluation", "result"]
+        assert result["evaluations"] == [{"overall_score": 63}]
+        assert self.service.rag_service.evaluate_calls == 2
+
+
+class TestQuestionPool:
+    """测试面试题池"""
+
+    def test_session_uses_pooled_questions(self):
+        """测试启动时不预生成，首次请求后在后台补充到高水位，之后不再实时生成"""
+        rag = FakeRAGService()
+        service = InterviewService()
+        service.rag_service = rag
+        service.question_pool = QuestionPool(rag, low_watermark=2, high_watermark=2)
+
+        async def run():
+            service.question_pool.start()
+            await asyncio.sleep(0.01)
+            assert rag.generate_calls == 0
+
+            await service.create_interview_session(JobType.SOFTWARE_ENGINEER, "")
+            await asyncio.sleep(0.01)
+            sizes = service.question_pool.stats()["sizes"]
+            assert sizes["software_engineer"] == 2 and sizes["data_scientist"] == 0
+            calls = rag.generate_calls
+
+            session = await service.create_interview_session(JobType.SOFTWARE_ENGINEER, "")
+            assert rag.generate_calls == calls
+            await asyncio.sleep(0.01)
+            assert service.question_pool.stats()["sizes"]["software_engineer"] == 2
+            await service.question_pool.stop()
+            return session
+
+        session = asyncio.run(run())
+        assert [q.question for q in session.questions] == ["问题0", "问题1", "问题2"]
+
+    def test_personalization_only_replaces_unseen_questions(self):
+        """测试个性化只替换当前问题之后的题目"""
+        rag = FakeRAGService()
+        service = InterviewService()
+        service.rag_service = rag
+        service.question_pool = QuestionPool(rag)
+        service.question_pool._pools[JobType.SOFTWARE_ENGINEER].append(
+            [{"question": f"问题{i}"} for i in range(3)]
+        )
+
+        async def run():
+            session = await service.create_interview_session(JobType.SOFTWARE_ENGINEER, "后端")
+            await service.submit_answer(session.session_id, "a")
+            await asyncio.sleep(0.05)
+            return service.get_session(session.session_id)
+
+        session = asyncio.run(run())
+        assert [q.question for q in session.questions] == ["问题0", "问题1", "后端-问题2"]
+
+
+class TestSQLiteSessionStore:
+    """测试SQLite会话存储"""
+
+    def test_session_shared_between_workers(self, tmp_path):
+        """测试一个worker写入的会话和评估对另一个worker可见"""
+        path = str(tmp_path / "sessions.sqlite3")
+        worker_a = InterviewService(SQLiteSessionStore(path))
+        worker_a.rag_service = FakeRAGService()
+        worker_b = InterviewService(SQLiteSessionStore(path))
+        worker_b.rag_service = FakeRAGService()
+
+        async def run():
+            session = await worker_a.create_interview_session(JobType.DATA_SCIENTIST, "背景")
+            result = await worker_b.submit_answer(session.session_id, "ab")
+            assert result["success"]
+            assert worker_a.get_current_question(session.session_id).question == "问题1"
+
+            # worker_b的后台评估完成后，worker_a直接复用其结果
+            await asyncio.sleep(0.05)
+            evaluation = await worker_a.evaluate_interview(session.session_id)
+            await worker_a.session_store.close()
+            await worker_b.session_store.close()
+            return evaluation
+
+        evaluation = asyncio.run(run())
+        assert evaluation["answered_questions"] == 1
+        assert evaluation["overall_score"] == 62
+        assert worker_a.rag_service.evaluate_calls + worker_b.rag_service.evaluate_calls == 1
+
+    def test_personalization_does_not_overwrite_other_workers(self, tmp_path):
+        """测试个性化结果不覆盖其他worker提交的回答，已展示的题目不被替换"""
+        path = str(tmp_path / "sessions.sqlite3")
+        store_a, store_b = SQLiteSessionStore(path), SQLiteSessionStore(path)
+        worker_b = InterviewService(store_b)
+        worker_b.rag_service = FakeRAGService()
+
+        async def run():
+            session = await worker_b.create_interview_session(JobType.DATA_SCIENTIST, "背景")
+            session_id = session.session_id
+            questions = [q.copy(update={"question": f"个性化{i}"}) for i, q in enumerate(session.questions)]
+
+            # worker_a读到当前问题为0后，worker_b先提交了回答：下一题已展示，不再替换
+            await worker_b.submit_answer(session_id, "a")
+            await store_a.save_personalized_questions(session_id, 1, questions[1:])
+            data = store_a.get(session_id)
+            assert [q.question for q in data['session'].questions] == ["问题0", "问题1", "问题2"]
+
+            # 题目尚未展示时替换生效，之后提交回答保存整个会话也不会丢失
+            await store_a.save_personalized_questions(session_id, 2, questions[2:])
+            result = await worker_b.submit_answer(session_id, "bc")
+            assert result["next_question"].question == "个性化2"
+            data = store_a.get(session_id)
+            await store_a.close()
+            await store_b.close()
+            return data
+
+        data = asyncio.run(run())
+        assert data['current_question'] == 2 and len(data['answers']) == 2
+        assert [q.question for q in data['session'].questions] == ["问题0", "问题1", "个性化2"]
+
+    def test_reads_do_not_wait_for_write_transaction(self, tmp_path):
+        """测试写事务进行中读取不等待写锁"""
+        path = str(tmp_path / "sessions.sqlite3")
+        store = SQLiteSessionStore(path)
+        service = InterviewService(store)
+        service.rag_service = FakeRAGService()
+
+        def slow_write(started: threading.Event):
+            with store._lock, store.conn:
+                store.conn.execute("UPDATE sessions SET updated_at = 0")
+                started.set()
+                time.sleep(1.0)
+
+        async def run():
+            session = await service.create_interview_session(JobType.DATA_SCIENTIST, "背景")
+            started = threading.Event()
+            writer = threading.Thread(target=slow_write, args=(started,))
+            writer.start()
+            started.wait()
+            began = time.perf_counter()
+            data = store.get(session.session_id)
+            assert store.count() == 1 and store.get_evaluations(session.session_id) == {}
+            elapsed = time.perf_counter() - began
+            writer.join()
+            await store.close()
+            return data, elapsed
+
+        data, elapsed = asyncio.run(run())
+        assert data['current_question'] == 0 and elapsed < 0.5
+
+    @pytest.mark.parametrize("backend", ["memory", "sqlite"])
+    def test_expired_sessions_are_purged(self, tmp_path, backend):
+        """测试超过session_ttl未更新的会话及其评估结果在写入时被清理"""
+        if backend == "sqlite":
+            store = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"), session_ttl=3600)
+        else:
+            store = InMemorySessionStore(session_ttl=3600)
+        service = InterviewService(store)
+        service.rag_service = FakeRAGService()
+
+        async def run():
+            old = await service.create_interview_session(JobType.DATA_SCIENTIST, "背景")
+            await store.save_evaluation(old.session_id, 0, {"score": 60})
+            # 将旧会话的更新时间推到过期之前，并让下一次写入触发清理
+            if backend == "sqlite":
+                with store._lock, store.conn:
+                    store.conn.execute("UPDATE sessions SET updated_at = 0")
+            else:
+                store._updated_at[old.session_id] = 0
+            store._last_purge = 0
+            new = await service.create_interview_session(JobType.DATA_SCIENTIST, "背景")
+            result = (store.get(old.session_id), store.get_evaluations(old.session_id),
+                      store.get(new.session_id) is not None, store.count())
+            await store.close()
+            return result
+
+        old_data, old_evaluations, new_exists, count = asyncio.run(run())
+        assert old_data is None and old_evaluations == {}
+        assert new_exists and count == 1
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from backend.app.utils.json_parser import (
+    IncrementalJSONParser, extract_json, repair_json, parse_model_output, parse_model_list
+)
+from backend.app.models.schemas import ResumeAnalysisResponse, InterviewQuestion, ResumeSection
+from backend.app.services.rag_service import RAGService
+
+
+class TestIncrementalJSONParser:
+    """测试增量JSON解析"""
+
+    def test_partial_fields_only_contain_complete_values(self):
+        """测试流式输出过程中只返回已完整生成的值"""
+        parser = IncrementalJSONParser()
+        assert parser.feed('{"overall_score": 8') == {}
+        assert parser.feed('5, "strengths": ["技术') == {"overall_score": 85, "strengths": []}
+        assert parser.feed('扎实", "项') == {"overall_score": 85, "strengths": ["技术扎实"]}
+
+    def test_final_value_matches_json_loads(self):
+        """测试逐字符输入后的结果与完整解析一致"""
+        data = {"a": [1, {"b": 'x"y'}], "c": None, "d": True, "e": "中文"}
+        text = json.dumps(data, ensure_ascii=False)
+        parser = IncrementalJSONParser()
+        for char in text:
+            parser.feed(char)
+        assert parser.value == data
+
+    def test_reparse_is_throttled_for_long_output(self):
+        """测试长输出逐字符输入时只重新解析对数次，结果仍与完整解析一致"""
+        data = {"suggestions": [f"建议{i}：补充量化的项目成果" for i in range(1000)]}
+        text = json.dumps(data, ensure_ascii=False)
+        parser = IncrementalJSONParser()
+        parses = []
+        complete = parser._complete
+        parser._complete = lambda: parses.append(1) or complete()
+        for char in text:
+            parser.feed(char)
+        assert parser.value == data
+        count = len(parses)
+        assert count < 150
+        parser.feed('\n以上')
+        assert len(parses) == count and parser.value == data
+
+    def test_leading_text_is_skipped(self):
+        """测试跳过JSON前的说明文字"""
+        parser = IncrementalJSONParser()
+        assert parser.feed('分析结果如下：{"overall_score": 70}') == {"overall_score": 70}
+
+    def test_fence_and_trailing_text_are_ignored(self):
+        """测试代码块标记和JSON之后的文字不影响已闭合的结果，expect跳过说明中的方括号"""
+        parser = IncrementalJSONParser(expect=dict)
+        parser.feed('参考[1]：```json\n{"overall_score": 7')
+        assert parser.feed('0}\n```\n以上') == {"overall_score": 70}
+
+
+class TestExtractJSON:
+    """测试从模型输出中提取JSON"""
+
+    def test_fences_and_surrounding_prose(self):
+        """测试代码块、开头说明文字和结尾多余文字"""
+        assert extract_json('```json\n{"a": 1}\n```') == {"a": 1}
+        assert extract_json('好的，结果如下：\n{"a": [1]}\n希望对你有帮助') == {"a": [1]}
+        assert extract_json('参考{见附录}后给出：{"a": 2}', dict) == {"a": 2}
+        assert extract_json('说明[1]：{"a": 3}', dict) == {"a": 3}
+        assert extract_json('没有JSON') is None
+
+    def test_non_standard_syntax(self):
+        """测试单引号、末尾逗号和Python字面量"""
+        text = "{'a': 'it\\'s \"ok\"', 'b': [1, 2,], 'c': True, 'd': None,}"
+        assert json.loads(repair_json(text)) == {"a": "it's \"ok\"", "b": [1, 2], "c": True, "d": None}
+        assert extract_json(text) == {"a": "it's \"ok\"", "b": [1, 2], "c": True, "d": None}
+
+    def test_truncated_output_keeps_complete_values(self):
+        """测试截断的输出只保留已完整生成的值，不会误取内层对象"""
+        assert extract_json('{"a": 1, "b": ["x", "y') == {"a": 1, "b": ["x"]}
+        assert extract_json('```json\n{"a": {"b": 1}, "c": "tru') == {"a": {"b": 1}}
+
+
+class TestSchemaValidation:
+    """测试按pydantic模型校验模型输出"""
+
+    def test_invalid_fields_and_entries_are_dropped(self):
+        """测试不合法的字段和元素被单独丢弃，其余字段保留并转换类型"""
+        text = (
+            '```json\n{"overall_score": "85", "section_scores": {"education": 80, "教育": 70, "skills": "高"},'
+            ' "strengths": ["扎实", {}], "weaknesses": "无", "suggestions": ["量化成果",]}\n```'
+        )
+        result = parse_model_output(text, ResumeAnalysisResponse,
+                                    exclude=("keywords_match", "missing_keywords"), required=("overall_score",))
+        assert result == {
+            "overall_score": 85.0,
+            "section_scores": {ResumeSection.EDUCATION: 80.0},
+            "strengths": ["扎实"],
+            "suggestions": ["量化成果"]
+        }
+        assert parse_model_output('{"strengths": []}', ResumeAnalysisResponse,
+                                  required=("overall_score",)) is None
+
+    def test_question_list_shapes(self):
+        """测试包在对象中的数组和字符串元素，缺少问题的元素被丢弃"""
+        text = '{"questions": ["问题一", {"question": "问题二", "category": "技术"}, {"category": "x"}]}'
+        assert parse_model_list(text, InterviewQuestion, required=("question",)) == [
+            {"question": "问题一"}, {"question": "问题二", "category": "技术"}
+        ]
+        assert parse_model_list('无法生成', InterviewQuestion) is None
+
+
+class FakeLLM:
+    """返回固定内容的LLM客户端，记录被删除的缓存"""
+
+    def __init__(self, content):
+        self.content = content
+        self.invalidated = 0
+
+    async def chat(self, *args, **kwargs):
+        return self.content
+
+    async def invalidate(self, *args, **kwargs):
+        self.invalidated += 1
+
+
+class EmptyStore:
+    count = 0
+
+
+class TestRAGParsing:
+    """测试RAG服务容忍不规范的模型输出"""
+
+    def test_fenced_evaluation_is_not_wasted(self):
+        """测试带代码块和说明文字的评估结果被正常解析，不删除缓存"""
+        llm = FakeLLM('评估如下：\n```json\n{"overall_score": 7.5, "feedback": ["结构清晰"],}\n```')
+        service = RAGService(client=llm, store=EmptyStore())
+        result = asyncio.run(service.evaluate_interview_answer("问题", "回答", "software_engineer"))
+        assert result == {"overall_score": 7.5, "feedback": ["结构清晰"]}
+        assert llm.invalidated == 0
+
+    def test_unparseable_analysis_is_invalidated(self):
+        """测试缺少总体评分的分析结果视为解析失败并删除缓存"""
+        llm = FakeLLM('抱歉，无法完成分析')
+        service = RAGService(client=llm, store=EmptyStore())
+        result = asyncio.run(service.analyze_resume("简历", "岗位描述", "software_engineer"))
+        assert result == {"error": "解析失败"} and llm.invalidated == 1
@@ -0,0 +1,69 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.app.models.schemas import JobType
+from backend.app.services.keyword_engine import KeywordEngine, KeywordIndex
+
+
+class TestKeywordEngine:
+    """测试本地关键词匹配"""
+
+    def test_extract_synonyms_and_word_boundaries(self):
+        """测试同义词归一和ASCII词边界"""
+        engine = KeywordEngine()
+        terms = engine.extract("熟悉JavaScript和Golang，使用K8S部署；Spring Boot开发，google搜索")
+        assert terms["JavaScript"] == 1
+        assert terms["Go"] == 1
+        assert terms["Kubernetes"] == 1
+        assert terms["Spring"] == 1
+        assert "Java" not in terms
+
+    def test_match_required_skills(self):
+        """测试岗位技能命中与缺失"""
+        engine = KeywordEngine()
+        match = engine.match("项目经验：Python、Redis缓存", "要求熟悉Python、MySQL和Redis",
+                             JobType.SOFTWARE_ENGINEER)
+        assert match.matched == ["Python", "Redis"]
+        assert match.missing == ["MySQL"]
+
+    def test_default_requirements_without_description(self):
+        """测试未提供岗位描述时使用岗位核心技能"""
+        engine = KeywordEngine()
+        match = engine.match("熟练使用Figma", "", JobType.UI_UX_DESIGNER)
+        assert match.matched == ["Figma"]
+        assert "Sketch" in match.missing
+
+    def test_other_job_types_and_plain_words_are_ignored(self):
+        """测试只识别本岗位技能，go、react作普通英文单词时不算技能"""
+        engine = KeywordEngine()
+        required = engine.required_skills("负责市场营销，要求有go-to-market经验，能react快速", JobType.MARKETING)
+        assert required == ["市场营销"]
+        assert "Python" not in engine.required_skills("熟悉Python和Redis", JobType.MARKETING)
+        assert "Go" not in engine.extract("Willing to go the extra mile")
+        assert "R" not in engine.extract("负责R&D团队管理", JobType.DATA_SCIENTIST)
+
+        terms = engine.extract("熟悉Go、React，掌握R语言", JobType.SOFTWARE_ENGINEER)
+        assert "Go" in terms and "React" in terms and "R" not in terms
+
+
+class TestKeywordIndex:
+    """测试技能倒排索引"""
+
+    def test_bm25_prefers_rare_skills(self):
+        """测试BM25按IDF加权并归一化"""
+        index = KeywordIndex()
+        index.add("a", {"Python": 1}, 100)
+        index.add("b", {"Python": 1, "Rust": 1}, 100)
+        index.add("c", {"Python": 2}, 100)
+        assert index.idf("Rust") > index.idf("Python")
+
+        scores = index.bm25(["Python", "Rust"], ["a", "b", "c"])
+        assert scores.argmax() == 1
+        assert 0 < scores.max() <= 1
+
+        index.remove("b")
+        assert "b" not in index
+        assert index.bm25(["Rust"], ["a", "c"]).tolist() == [0, 0]
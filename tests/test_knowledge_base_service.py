@@ -0,0 +1,93 @@
+import asyncio
+import sys
+import os
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from backend.app.api import knowledge_base as knowledge_base_api
+from backend.app.services.call_policy import LLMCircuitOpenError
+from backend.app.services.knowledge_base_service import KnowledgeBaseService, KnowledgeBaseSyncInProgressError
+from backend.app.services.vector_store import VectorStore
+
+
+class FakeEmbeddingService:
+    """模拟向量化服务，记录被向量化的文本"""
+
+    def __init__(self):
+        self.embedded = []
+
+    async def embed(self, texts):
+        self.embedded.extend(texts)
+        return np.array([[len(t), 1.0, 0.5] for t in texts], dtype=np.float32)
+
+
+class TestKnowledgeBaseService:
+    """测试知识库增量同步"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.embeddings = FakeEmbeddingService()
+
+    def _service(self, tmp_path):
+        kb_path = tmp_path / "kb"
+        kb_path.mkdir(exist_ok=True)
+        store = VectorStore(str(tmp_path / "db"))
+        return kb_path, KnowledgeBaseService(store, self.embeddings, str(kb_path))
+
+    def test_incremental_sync(self, tmp_path):
+        """测试只重新处理新增、修改和删除的文件"""
+        kb_path, service = self._service(tmp_path)
+        (kb_path / "a.txt").write_text("算法基础知识", encoding="utf-8")
+        (kb_path / "b.txt").write_text("系统设计知识", encoding="utf-8")
+
+        stats = asyncio.run(service.sync())
+        assert stats["added"] == 2
+        assert service.vector_store.count == 2
+
+        stats = asyncio.run(service.sync())
+        assert stats["unchanged"] == 2
+        assert len(self.embeddings.embedded) == 2
+
+        (kb_path / "a.txt").write_text("更新后的算法知识", encoding="utf-8")
+        os.remove(kb_path / "b.txt")
+        stats = asyncio.run(service.sync())
+        assert stats["updated"] == 1
+        assert stats["deleted"] == 1
+        assert self.embeddings.embedded[-1] == "更新后的算法知识"
+        assert service.vector_store.count == 1
+
+    def test_touched_file_with_same_content_is_skipped(self, tmp_path):
+        """测试修改时间变化但内容未变的文件不会重新向量化"""
+        kb_path, service = self._service(tmp_path)
+        path = kb_path / "a.txt"
+        path.write_text("数据库索引", encoding="utf-8")
+        asyncio.run(service.sync())
+
+        os.utime(path, ns=(0, 0))
+        stats = asyncio.run(service.sync())
+        assert stats["unchanged"] == 1
+        assert len(self.embeddings.embedded) == 1
+
+    def test_sync_errors_map_to_status_codes(self, tmp_path, monkeypatch):
+        """测试同步进行中返回409，向量化服务不可用返回503和Retry-After"""
+        _, service = self._service(tmp_path)
+        monkeypatch.setattr(knowledge_base_api, "knowledge_base_service", service)
+
+        with service._sync_lock():
+            with pytest.raises(HTTPException) as error:
+                asyncio.run(knowledge_base_api.sync_knowledge_base())
+        assert error.value.status_code == 409
+
+        async def unavailable(texts):
+            raise LLMCircuitOpenError("向量化服务熔断中", retry_after=12)
+
+        (tmp_path / "kb" / "a.txt").write_text("面试题：什么是微服务？", encoding="utf-8")
+        monkeypatch.setattr(self.embeddings, "embed", unavailable)
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(knowledge_base_api.sync_knowledge_base())
+        assert error.value.status_code == 503 and error.value.headers["Retry-After"] == "12"
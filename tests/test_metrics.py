@@ -0,0 +1,118 @@
+import asyncio
+import os
+import sys
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from backend.app.core.metrics import (
+    MetricsRegistry, HTTPMetrics, MetricsMiddleware, timed
+)
+
+
+def sample(text: str, name: str) -> float:
+    """从导出文本中取某个样本的值"""
+    for line in text.splitlines():
+        if line.startswith(name + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"未找到样本 {name}")
+
+
+class TestMetricsRegistry:
+    """测试指标注册表"""
+
+    def test_histogram_buckets_are_cumulative(self):
+        """测试直方图按桶累计并导出总和与次数"""
+        registry = MetricsRegistry()
+        histogram = registry.histogram("latency_seconds", "耗时", (0.1, 1.0), ("method",), [("a",), ("b",)])
+        child = histogram.labels("a")
+        for value in (0.05, 0.1, 0.5, 3.0):
+            child.observe(value)
+
+        text = registry.render()
+        assert sample(text, 'latency_seconds_bucket{method="a",le="0.1"}') == 2
+        assert sample(text, 'latency_seconds_bucket{method="a",le="1"}') == 3
+        assert sample(text, 'latency_seconds_bucket{method="a",le="+Inf"}') == 4
+        assert sample(text, 'latency_seconds_count{method="a"}') == 4
+        assert sample(text, 'latency_seconds_sum{method="a"}') == pytest.approx(3.65)
+        assert sample(text, 'latency_seconds_count{method="b"}') == 0
+
+    def test_undeclared_labels_are_rejected(self):
+        """测试未预先声明的标签组合会报错"""
+        registry = MetricsRegistry()
+        counter = registry.counter("calls_total", "调用次数", ("kind",), [("x",)])
+        with pytest.raises(ValueError):
+            counter.labels("y")
+
+    def test_aggregates_across_process_files(self, tmp_path):
+        """测试汇总目录中所有进程的文件，已退出进程的文件合并进归档"""
+        def build():
+            registry = MetricsRegistry()
+            return registry, registry.counter("calls_total", "调用次数")
+
+        first, first_counter = build()
+        first_counter.labels().inc(2)
+        first.open(str(tmp_path))
+        first.close()
+        # 伪造一个已退出进程的文件
+        os.rename(tmp_path / f"metrics-{os.getpid()}.db", tmp_path / "metrics-999999999.db")
+
+        second, second_counter = build()
+        second.open(str(tmp_path))
+        second_counter.labels().inc(3)
+        assert sample(second.render(), "calls_total") == 5
+        assert not (tmp_path / "metrics-999999999.db").exists()
+        assert (tmp_path / "metrics-archive.db").exists()
+
+        with pytest.raises(RuntimeError):
+            second.counter("late_total", "映射后声明")
+        second.close()
+
+    def test_timed_async_generator(self):
+        """测试异步生成器的耗时在迭代结束后记录"""
+        registry = MetricsRegistry()
+        histogram = registry.histogram("stream_seconds", "耗时", (1.0,))
+
+        @timed(histogram.labels())
+        async def stream():
+            yield 1
+            yield 2
+
+        async def consume():
+            return [item async for item in stream()]
+
+        assert asyncio.run(consume()) == [1, 2]
+        assert histogram.labels().count() == 1
+
+
+class TestHTTPMetrics:
+    """测试按路由模板统计请求"""
+
+    def test_records_route_template_and_status(self):
+        """测试请求按路由模板和状态码类别计数，未匹配的路由单独计数"""
+        registry = MetricsRegistry()
+        http_metrics = HTTPMetrics(registry)
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware, metrics=http_metrics)
+
+        @app.get("/items/{item_id}")
+        async def get_item(item_id: int):
+            return {"id": item_id}
+
+        http_metrics.bind(app)
+        client = TestClient(app)
+        client.get("/items/1")
+        client.get("/items/2")
+        client.get("/items/abc")
+        client.get("/missing")
+
+        text = registry.render()
+        assert sample(text, 'http_requests_total{route="/items/{item_id}",method="GET",status="2xx"}') == 2
+        assert sample(text, 'http_requests_total{route="/items/{item_id}",method="GET",status="4xx"}') == 1
+        assert sample(text, 'http_requests_total{route="<unmatched>",method="*",status="4xx"}') == 1
+        assert sample(text, 'http_request_duration_seconds_count{route="/items/{item_id}",method="GET"}') == 3
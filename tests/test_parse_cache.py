@@ -0,0 +1,48 @@
+import hashlib
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from backend.app.services.parse_cache import ParseCache
+
+
+class TestParseCache:
+    """测试解析结果缓存"""
+
+    def test_result_survives_restart(self, tmp_path):
+        """测试解析结果写入磁盘后可被新实例读取"""
+        digest = hashlib.sha256(b"resume").hexdigest()
+        result = {"success": True, "full_text": "教育背景", "sections": {"education": ["北京大学"]}}
+        ParseCache(str(tmp_path)).put(digest, result)
+
+        cache = ParseCache(str(tmp_path))
+        assert cache.get(digest) == result
+        assert cache.get(digest) == result
+        assert cache.stats()["disk_hits"] == 1
+        assert cache.stats()["hits"] == 1
+
+    def test_invalid_digest_is_ignored(self, tmp_path):
+        """测试非法摘要不会访问缓存目录之外的文件"""
+        cache = ParseCache(str(tmp_path))
+        assert cache.get("../" + "0" * 62) is None
+
+    def test_digest_reused_until_file_changes(self, tmp_path, monkeypatch):
+        """测试文件未变化时复用摘要，变化后重新计算"""
+        path = tmp_path / "resume.txt"
+        path.write_bytes(b"v1")
+        cache = ParseCache(str(tmp_path / "cache"))
+        calls = []
+        original = ParseCache.hash_file
+        monkeypatch.setattr(ParseCache, "hash_file",
+                            staticmethod(lambda p: calls.append(p) or original(p)))
+
+        first = cache.digest_for_path(str(path))
+        assert cache.digest_for_path(str(path)) == first
+        assert len(calls) == 1
+
+        path.write_bytes(b"v2-changed")
+        assert cache.digest_for_path(str(path)) == hashlib.sha256(b"v2-changed").hexdigest()
+        assert len(calls) == 2
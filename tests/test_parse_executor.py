@@ -0,0 +1,44 @@
+import time
+import asyncio
+import pytest
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from backend.app.services.parse_executor import ParseExecutor, ParseQueueFullError
+
+
+class TestParseExecutor:
+    """测试文档解析执行器"""
+
+    def test_rejects_when_queue_full(self):
+        """测试排队任务达到上限时立即拒绝"""
+        executor = ParseExecutor(max_workers=1, max_queue=1)
+
+        async def run():
+            tasks = [asyncio.ensure_future(executor.run(time.sleep, 0.05)) for _ in range(2)]
+            await asyncio.sleep(0)
+            assert executor.queue_depth == 1
+            with pytest.raises(ParseQueueFullError):
+                await executor.run(time.sleep, 0)
+            await asyncio.gather(*tasks)
+
+        asyncio.run(run())
+        executor.shutdown()
+        stats = executor.stats()
+        assert stats["completed"] == 2
+        assert stats["rejected"] == 1
+        assert stats["in_flight"] == 0
+        assert stats["wait_seconds_max"] >= 0.04
+        assert stats["parse_seconds_max"] >= 0.04
+
+    def test_process_mode_returns_result(self):
+        """测试进程池模式执行模块级函数"""
+        executor = ParseExecutor(mode="process", max_workers=1, max_queue=1)
+        try:
+            assert asyncio.run(executor.run(sorted, [3, 1, 2])) == [1, 2, 3]
+        finally:
+            executor.shutdown()
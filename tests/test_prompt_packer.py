@@ -0,0 +1,98 @@
+import asyncio
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.app.utils.prompt_packer import PromptPacker
+from backend.app.utils import tokenizer
+from backend.app.utils.tokenizer import count_tokens
+
+
+class TestPromptPacker:
+    """测试提示词token预算"""
+
+    def test_short_fields_are_unchanged(self):
+        """测试未超出预算时字段和参考资料保持原样"""
+        packer = PromptPacker(budget=1000)
+        fields, context = packer.pack("简历：{resume_text}", {"resume_text": "北京大学"}, ["资料一", "资料二"])
+        assert fields == {"resume_text": "北京大学"}
+        assert context == ["资料一", "资料二"]
+
+    def test_long_fields_fit_budget(self):
+        """测试超出预算时按权重截断，短字段让出的余量分给长字段"""
+        template = "岗位描述：{job_description}\n简历内容：{resume_text}\n{context}"
+        resume = "负责后端服务的设计与开发。" * 200
+        jd = "熟悉Python。"
+        packer = PromptPacker(budget=300, context_share=0.2)
+        fields, context = packer.pack(
+            template, {"resume_text": resume, "job_description": jd},
+            ["参考资料" * 5, "参考资料" * 50], weights={"resume_text": 2.0}
+        )
+
+        assert fields["job_description"] == jd
+        assert fields["resume_text"].endswith("。")
+        assert context == ["参考资料" * 5]
+        total = count_tokens(template) + sum(count_tokens(v) for v in fields.values()) \
+            + sum(count_tokens(c) for c in context)
+        assert total <= 300
+        assert count_tokens(fields["resume_text"]) > 200
+
+
+class FakeEncoding:
+    """按空格切分的编码表"""
+
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+
+class FakeTiktoken:
+    """前几次加载失败（模拟离线）的tiktoken"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+
+    def get_encoding(self, name):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise OSError("network unreachable")
+        return FakeEncoding()
+
+
+class TestTokenizerLoading:
+    """测试tokenizer编码表加载"""
+
+    def setup_method(self):
+        """每个用例从未加载状态开始"""
+        self.saved = (tokenizer.tiktoken, tokenizer._encoding, tokenizer._encoding_failed_at,
+                      tokenizer._background_load)
+        tokenizer._encoding = tokenizer._encoding_failed_at = tokenizer._background_load = None
+
+    def teardown_method(self):
+        (tokenizer.tiktoken, tokenizer._encoding, tokenizer._encoding_failed_at,
+         tokenizer._background_load) = self.saved
+
+    def test_offline_falls_back_and_retries_later(self):
+        """测试加载失败时使用估算，重试间隔内不再加载，之后重试成功"""
+        fake = tokenizer.tiktoken = FakeTiktoken(failures=1)
+        assert count_tokens("a b c d e f g h") == 4
+        assert count_tokens("a b c d e f g h") == 4
+        assert fake.calls == 1
+
+        tokenizer._encoding_failed_at -= tokenizer.ENCODING_RETRY_INTERVAL
+        assert count_tokens("a b c d e f g h") == 8
+        assert fake.calls == 2
+
+    def test_event_loop_does_not_load(self):
+        """测试事件循环中不阻塞加载，编码表在线程池中加载完成后生效"""
+        fake = tokenizer.tiktoken = FakeTiktoken()
+
+        async def run():
+            first = count_tokens("a b c d e f g h")
+            await tokenizer._background_load
+            return first, count_tokens("a b c d e f g h")
+
+        assert asyncio.run(run()) == (4, 8)
+        assert fake.calls == 1
@@ -0,0 +1,138 @@
+import asyncio
+import sys
+import os
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from backend.app.core.config import settings
+from backend.app.models.schemas import JobType, ResumeRankRequest, ResumeAnalysisResponse
+from backend.app.services import parse_cache as parse_cache_module
+from backend.app.services.ranking_service import RankingService
+from backend.app.services.resume_service import ResumeService
+
+VOCABULARY = ["python", "sql", "java", "设计", "销售"]
+
+
+class FakeEmbeddingService:
+    """按词表计数生成向量"""
+
+    def __init__(self):
+        self.embedded = 0
+
+    async def embed(self, texts):
+        self.embedded += len(texts)
+        return np.array([[text.lower().count(word) + 0.01 for word in VOCABULARY] for text in texts],
+                        dtype=np.float32)
+
+    async def embed_query(self, text):
+        return (await self.embed([text]))[0]
+
+
+class FakeRAGService:
+    """模拟RAG服务"""
+
+    def __init__(self):
+        self.embedding_service = FakeEmbeddingService()
+
+
+class FakeResumeService(ResumeService):
+    """不调用模型的简历服务"""
+
+    def __init__(self):
+        super().__init__()
+        self.rag_service = FakeRAGService()
+        self.analyzed = []
+
+    async def analyze_resume(self, request, use_cache=True):
+        self.analyzed.append(request.resume_text)
+        return self._create_error_response("skipped")
+
+
+class TestRankingService:
+    """测试简历排序"""
+
+    def test_rank_scores_locally_and_analyzes_shortlist(self, tmp_path, monkeypatch):
+        """测试本地打分排序，只对前几名深度分析，岗位描述只预处理一次"""
+        uploads = tmp_path / "uploads"
+        uploads.mkdir()
+        (uploads / "a.txt").write_text("技能\nPython SQL python", encoding="utf-8")
+        (uploads / "b.txt").write_text("技能\nJava 设计", encoding="utf-8")
+        (uploads / "c.txt").write_text("技能\nPython", encoding="utf-8")
+        monkeypatch.setattr(settings, "uploads_path", str(uploads))
+        monkeypatch.setattr(parse_cache_module.parse_cache, "cache_dir", str(tmp_path / "cache"))
+
+        resume_service = FakeResumeService()
+        service = RankingService(resume_service)
+        request = ResumeRankRequest(job_description="需要 Python 和 SQL", job_type=JobType.DATA_SCIENTIST,
+                                    top_k=2, deep_analysis=1)
+
+        result = asyncio.run(service.rank(request))
+        assert result.total_candidates == 3
+        assert [c.filename for c in result.candidates] == ["a.txt", "c.txt"]
+        assert result.candidates[0].matched_skills == ["Python", "SQL"]
+        assert result.candidates[1].skill_coverage == 0.5
+        assert result.candidates[0].keyword_score > result.candidates[1].keyword_score > 0
+        assert isinstance(result.candidates[0].analysis, ResumeAnalysisResponse)
+        assert result.candidates[1].analysis is None
+        assert len(resume_service.analyzed) == 1
+
+        # 第二次排序复用岗位预处理结果和已有简历向量
+        embedded = resume_service.rag_service.embedding_service.embedded
+        asyncio.run(service.rank(request))
+        assert service.stats()["job_profiles"] == 1
+        assert service.stats()["indexed"] == 3
+        assert resume_service.rag_service.embedding_service.embedded == embedded
+
+    def test_failed_job_embedding_is_retried(self):
+        """测试岗位描述向量化失败时不缓存，下次排序重新向量化"""
+        service = RankingService(FakeResumeService())
+        embedding_service = service.rag_service.embedding_service
+        embed = embedding_service.embed
+
+        async def unavailable(texts):
+            raise RuntimeError("embedding unavailable")
+
+        embedding_service.embed = unavailable
+        profile = asyncio.run(service.prepare_job("需要 Python 和 SQL", JobType.DATA_SCIENTIST.value))
+        assert profile.vector is None and set(profile.skills) == {"Python", "SQL"}
+        assert service.stats()["job_profiles"] == 0
+
+        embedding_service.embed = embed
+        profile = asyncio.run(service.prepare_job("需要 Python 和 SQL", JobType.DATA_SCIENTIST.value))
+        assert profile.vector is not None
+        assert service.stats()["job_profiles"] == 1
+
+    def test_scores_fall_back_to_skills_and_isolate_failures(self, tmp_path, monkeypatch):
+        """测试向量不可用时按技能评分，单个候选人深度分析异常不影响排序，排序索引不影响简历分析"""
+        uploads = tmp_path / "uploads"
+        uploads.mkdir()
+        (uploads / "a.txt").write_text("技能\nPython SQL", encoding="utf-8")
+        (uploads / "b.txt").write_text("技能\nPython", encoding="utf-8")
+        monkeypatch.setattr(settings, "uploads_path", str(uploads))
+        monkeypatch.setattr(parse_cache_module.parse_cache, "cache_dir", str(tmp_path / "cache"))
+
+        resume_service = FakeResumeService()
+        service = RankingService(resume_service)
+        embedding_service = service.rag_service.embedding_service
+
+        async def unavailable(texts):
+            raise RuntimeError("embedding unavailable")
+
+        async def broken(request, use_cache=True):
+            raise ValueError("unexpected")
+
+        embedding_service.embed = unavailable
+        resume_service.analyze_resume = broken
+        request = ResumeRankRequest(job_description="需要 Python 和 SQL", job_type=JobType.DATA_SCIENTIST,
+                                    top_k=2, deep_analysis=2)
+        result = asyncio.run(service.rank(request))
+        assert [c.filename for c in result.candidates] == ["a.txt", "b.txt"]
+        assert result.candidates[1].score > 0
+        assert all(c.analysis is None for c in result.candidates)
+
+        assert len(service.index) == 2
+        assert service.keyword_engine.required_skills("SQL，Python，Python", JobType.DATA_SCIENTIST) == \
+            ["Python", "SQL"]
@@ -0,0 +1,57 @@
+import asyncio
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from backend.app.services.response_cache import ResponseCache
+
+
+class TestResponseCache:
+    """测试LLM响应缓存"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.messages = [{"role": "user", "content": "分析简历"}]
+
+    def test_key_depends_on_sampling_params(self):
+        """测试缓存键包含采样参数"""
+        key = ResponseCache.make_key("gpt", self.messages, temperature=0.3, max_tokens=100)
+        assert key == ResponseCache.make_key("gpt", self.messages, max_tokens=100, temperature=0.3)
+        assert key != ResponseCache.make_key("gpt", self.messages, temperature=0.7, max_tokens=100)
+
+    def test_disk_tier_and_ttl(self, tmp_path):
+        """测试磁盘缓存共享和TTL过期"""
+        path = str(tmp_path / "responses.sqlite3")
+        cache = ResponseCache(path)
+        other = ResponseCache(path)
+
+        async def run():
+            await cache.put("k1", '{"overall_score": 80}')
+            await cache.put("k2", "短期", ttl=0)
+            assert await other.get("k1") == '{"overall_score": 80}'
+            assert await other.get("k2") is None
+            assert other.stats()["disk_hits"] == 1
+            assert await other.get("k1") == '{"overall_score": 80}'
+            assert other.stats()["memory_hits"] == 1
+            await cache.delete("k1")
+            assert await ResponseCache(path).get("k1") is None
+
+        asyncio.run(run())
+
+    def test_disk_size_eviction(self, tmp_path):
+        """测试超过磁盘容量时淘汰最旧的条目"""
+        cache = ResponseCache(str(tmp_path / "responses.sqlite3"), disk_bytes=64 * 1024)
+
+        async def run():
+            for i in range(40):
+                await cache.put(f"k{i}", os.urandom(32 * 1024).hex())
+                await asyncio.sleep(0.001)
+
+        asyncio.run(run())
+
+        total = cache.conn.execute("SELECT SUM(size) FROM responses").fetchone()[0]
+        assert total <= 64 * 1024 + 1024 * 1024
+        assert cache.stats()["evictions"] > 0
@@ -0,0 +1,105 @@
+import asyncio
+import time
+import sys
+import os
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from backend.app.models.schemas import JobType, ResumeAnalysisRequest, ResumeSection
+from backend.app.services.resume_service import ResumeService
+
+RESUME = """教育背景
+北京大学 计算机科学 本科
+工作经验
+字节跳动 后端工程师，使用Python和Redis开发服务
+项目经验
+推荐系统开发，使用MySQL存储
+专业技能
+Python、Docker"""
+
+
+class FakeEmbeddingService:
+    """返回固定向量的向量化服务"""
+
+    def __init__(self, fail=False, delay=0.0):
+        self.fail = fail
+        self.delay = delay
+        self.completed = 0
+
+    async def embed(self, texts):
+        await asyncio.sleep(self.delay)
+        self.completed += 1
+        if self.fail:
+            raise RuntimeError("embedding unavailable")
+        return np.array([[1.0, 0.0], [0.6, 0.8]], dtype=np.float32)
+
+
+class FakeRAGService:
+    """禁止调用对话模型的RAG服务"""
+
+    def __init__(self, fail=False, delay=0.0):
+        self.embedding_service = FakeEmbeddingService(fail, delay)
+
+    async def analyze_resume(self, *args, **kwargs):
+        raise AssertionError("fast mode must not call the chat model")
+
+
+def make_service(fail=False, delay=0.0):
+    service = ResumeService()
+    service.rag_service = FakeRAGService(fail, delay)
+    return service
+
+
+class TestFastAnalysis:
+    """测试快速评分模式"""
+
+    def test_fast_mode_scores_locally(self):
+        """测试快速评分由本地信号得出"""
+        request = ResumeAnalysisRequest(resume_text=RESUME, target_job="后端工程师",
+                                        job_description="熟悉Python、Redis、Kafka",
+                                        job_type=JobType.SOFTWARE_ENGINEER)
+        result = asyncio.run(make_service().analyze_resume_fast(request))
+
+        assert sorted(result.keywords_match) == ["Python", "Redis"]
+        assert result.missing_keywords == ["Kafka"]
+        assert set(result.section_scores) == set(ResumeSection)
+        assert result.section_scores[ResumeSection.EDUCATION] == 100.0
+        assert result.section_scores[ResumeSection.ACHIEVEMENTS] == 0.0
+        assert 0 < result.overall_score < 100
+        assert result.strengths == [] and result.suggestions == []
+
+    def test_fast_mode_without_embeddings(self):
+        """测试向量化失败时按其余信号评分"""
+        request = ResumeAnalysisRequest(resume_text=RESUME, target_job="后端工程师",
+                                        job_description="熟悉Python",
+                                        job_type=JobType.SOFTWARE_ENGINEER)
+        with_embedding = asyncio.run(make_service().analyze_resume_fast(request))
+        without_embedding = asyncio.run(make_service(fail=True).analyze_resume_fast(request))
+
+        assert without_embedding.overall_score > 0
+        assert without_embedding.overall_score != with_embedding.overall_score
+        assert without_embedding.section_scores == with_embedding.section_scores
+
+    def test_slow_embedding_does_not_block(self):
+        """测试向量化慢时不等待，忽略相似度并在后台完成向量化"""
+        request = ResumeAnalysisRequest(resume_text=RESUME, target_job="后端工程师",
+                                        job_description="熟悉Python",
+                                        job_type=JobType.SOFTWARE_ENGINEER)
+        without_embedding = asyncio.run(make_service(fail=True).analyze_resume_fast(request))
+        service = make_service(delay=0.5)
+
+        async def run():
+            started = time.perf_counter()
+            result = await service.analyze_resume_fast(request)
+            elapsed = time.perf_counter() - started
+            assert len(service._background_embeddings) == 1
+            await asyncio.gather(*service._background_embeddings)
+            return result, elapsed
+
+        result, elapsed = asyncio.run(run())
+        assert elapsed < 0.3
+        assert result.overall_score == without_embedding.overall_score
+        assert service.rag_service.embedding_service.completed == 1
@@ -0,0 +1,48 @@
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from backend.app.services.resume_service import parse_resume_document
+from backend.app.utils.document_processor import DocumentProcessor
+from backend.app.utils.section_parser import AhoCorasick, SectionParser
+
+
+class TestAhoCorasick:
+    """测试多模式匹配自动机"""
+
+    def test_finds_overlapping_matches(self):
+        """测试找出重叠和嵌套的匹配，并忽略ASCII大小写"""
+        automaton = AhoCorasick([("he", 1), ("she", 2), ("hers", 3), ("Python", 4)])
+        matches = sorted(automaton.finditer("ushers use PYTHON"))
+        assert matches == [(1, 4, 2), (2, 4, 1), (2, 6, 3), (11, 17, 4)]
+
+    def test_offsets_relative_to_text(self):
+        """测试在子区间内查找时偏移相对于整个文本"""
+        automaton = AhoCorasick([("技能", "skills")])
+        assert list(automaton.finditer("专业技能：技能", 3, 7)) == [(5, 7, "skills")]
+
+
+class TestSectionParser:
+    """测试简历章节切分"""
+
+    def test_spans_point_into_cleaned_text(self):
+        """测试章节以偏移量返回，且清理后仍能识别章节"""
+        text = "张三\n\n  Education  \n北京大学   本科\n\n项目经验\n推荐系统开发\n负责技术方案设计与实现，使用Python完成召回与排序模块\n"
+        result = parse_resume_document(DocumentProcessor(), "resume.txt", content=text.encode("utf-8"))
+        cleaned, spans = result["full_text"], result["section_spans"]
+
+        assert [section for section, _, _ in spans] == ["education", "projects"]
+        assert cleaned[spans[0][1]:spans[0][2]] == "北京大学 本科"
+        assert cleaned[spans[1][1]:spans[1][2]].endswith("排序模块")
+        assert result["sections"]["education"] == ["北京大学 本科"]
+
+    def test_long_lines_are_not_headers(self):
+        """测试包含关键词的正文长行不会被当作章节标题"""
+        parser = SectionParser(max_header_length=10)
+        text = "技能\nPython\n熟悉多种技术栈并负责过多个项目的整体架构设计"
+        sections = parser.materialize(text, parser.segment(text))
+        assert sections["skills"] == ["Python", "熟悉多种技术栈并负责过多个项目的整体架构设计"]
+        assert sections["projects"] == []
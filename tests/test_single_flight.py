@@ -0,0 +1,151 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+from openai import AsyncOpenAI
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from backend.app.services.single_flight import SingleFlight
+from backend.app.services.llm_client import LLMClient
+from backend.app.services.response_cache import ResponseCache
+from loadtest.stub_llm_server import StubConfig, create_app
+
+MESSAGES = [
+    {"role": "system", "content": "你是简历分析专家"},
+    {"role": "user", "content": "分析简历与岗位匹配度"}
+]
+
+
+def make_llm_client(tmp_path, **stub_config):
+    """连接桩服务的LLM客户端，返回 (客户端, 桩服务应用)"""
+    app = create_app(StubConfig(seed=0, latency_ms=50, tokens_per_second=1e5, **stub_config))
+    http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://stub")
+    client = LLMClient(
+        cache=ResponseCache(str(tmp_path / "responses.sqlite3")),
+        single_flight=SingleFlight(str(tmp_path / "inflight.lock"))
+    )
+    client._client = AsyncOpenAI(api_key="stub", base_url="http://stub/v1",
+                                 http_client=http_client, max_retries=0)
+    return client, app
+
+
+class TestSingleFlight:
+    """测试合并相同的并发调用"""
+
+    def test_concurrent_calls_share_one_result(self):
+        """测试相同键的并发调用只执行一次"""
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return len(calls)
+
+        async def run():
+            flight = SingleFlight()
+            results = await asyncio.gather(*(flight.do("k", fetch) for _ in range(5)))
+            other = await flight.do("other", fetch)
+            return flight, results, other
+
+        flight, results, other = asyncio.run(run())
+        assert results == [1] * 5 and other == 2
+        stats = flight.stats()
+        assert stats["coalesced"] == 4 and stats["saved"] == 4 and stats["in_flight"] == 0
+
+    def test_cancelled_caller_does_not_cancel_others(self):
+        """测试某个调用方取消后，其余调用方仍得到结果"""
+        async def fetch():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        async def run():
+            flight = SingleFlight()
+            first = asyncio.ensure_future(flight.do("k", fetch))
+            second = asyncio.ensure_future(flight.do("k", fetch))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        assert asyncio.run(run()) == "done"
+
+    def test_stream_late_joiner_replays_parts(self):
+        """测试中途加入的流式调用方从头回放已生成的片段"""
+        upstream_calls = []
+
+        async def generate():
+            upstream_calls.append(1)
+            for part in ("a", "b", "c"):
+                yield part
+                await asyncio.sleep(0.01)
+
+        async def consume(flight, delay):
+            await asyncio.sleep(delay)
+            return "".join([part async for part in flight.stream("k", generate)])
+
+        async def run():
+            flight = SingleFlight()
+            return await asyncio.gather(consume(flight, 0), consume(flight, 0.015))
+
+        assert asyncio.run(run()) == ["abc", "abc"]
+        assert len(upstream_calls) == 1
+
+
+class TestLLMClientCoalescing:
+    """测试LLM客户端合并重复调用"""
+
+    def test_duplicate_completions_hit_upstream_once(self, tmp_path):
+        """测试相同提示词（空白不同）的并发调用只请求一次上游，不合并的调用各自请求"""
+        client, app = make_llm_client(tmp_path)
+        spaced = [dict(message, content=message["content"] + "  ") for message in MESSAGES]
+
+        async def run():
+            coalesced = await asyncio.gather(*(
+                client.chat(messages, max_tokens=100, temperature=0.3, coalesce=True)
+                for messages in (MESSAGES, spaced, MESSAGES)
+            ))
+            independent = await asyncio.gather(*(
+                client.chat(MESSAGES, max_tokens=100, temperature=0.3) for _ in range(2)
+            ))
+            return coalesced, independent
+
+        coalesced, independent = asyncio.run(run())
+        assert len(set(coalesced)) == 1 and set(independent) == set(coalesced)
+        assert app.state.stats["chat"] == 3
+        assert client.single_flight.stats()["coalesced"] == 2
+
+    def test_waits_for_other_worker_and_reuses_cache(self, tmp_path):
+        """测试另一个进程持有相同调用的锁时，等待其完成后复用共享缓存"""
+        client, app = make_llm_client(tmp_path)
+        key = client.flight_key(MESSAGES, 100, 0.3)
+        cache_key = client.cache_key(MESSAGES, 100, 0.3)
+        ready = tmp_path / "ready"
+        # 模拟另一个worker：持有锁期间把结果写入共享缓存
+        script = (
+            "import asyncio, fcntl, os, sys, time\n"
+            f"sys.path.insert(0, {os.path.join(os.path.dirname(__file__), '..')!r})\n"
+            "from backend.app.services.response_cache import ResponseCache\n"
+            f"fd = os.open({str(tmp_path / 'inflight.lock')!r}, os.O_RDWR | os.O_CREAT)\n"
+            f"fcntl.lockf(fd, fcntl.LOCK_EX, 1, {int(key[:12], 16)})\n"
+            f"open({str(ready)!r}, 'w').close()\n"
+            "time.sleep(0.3)\n"
+            f"asyncio.run(ResponseCache({str(tmp_path / 'responses.sqlite3')!r}).put({cache_key!r}, '来自其他worker'))\n"
+        )
+        worker = subprocess.Popen([sys.executable, "-c", script],
+                                  env={**os.environ, "OPENAI_API_KEY": "test-key"})
+        deadline = time.time() + 10
+        while not ready.exists() and time.time() < deadline:
+            time.sleep(0.01)
+
+        result = asyncio.run(client.chat(MESSAGES, max_tokens=100, temperature=0.3, use_cache=True))
+        worker.wait()
+
+        assert result == "来自其他worker"
+        assert app.state.stats["chat"] == 0
+        stats = client.single_flight.stats()
+        assert stats["cross_worker_saved"] == 1 and stats["saved"] == 1
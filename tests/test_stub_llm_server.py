@@ -0,0 +1,86 @@
+import asyncio
+import json
+import sys
+import os
+
+import httpx
+import pytest
+from openai import AsyncOpenAI, APIStatusError
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from loadtest.stub_llm_server import StubConfig, create_app
+
+
+def make_client(**config):
+    """通过ASGI传输直接连接桩服务的OpenAI客户端"""
+    config.setdefault("latency_ms", 0.01)
+    config.setdefault("embedding_latency_ms", 0.01)
+    config.setdefault("tokens_per_second", 1e6)
+    app = create_app(StubConfig(seed=0, **config))
+    http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://stub")
+    return AsyncOpenAI(api_key="stub", base_url="http://stub/v1", http_client=http_client, max_retries=0)
+
+
+ANALYSIS_MESSAGES = [
+    {"role": "system", "content": "你是简历分析专家"},
+    {"role": "user", "content": "分析简历与岗位匹配度"}
+]
+
+
+class TestStubLLMServer:
+    """测试桩LLM服务的接口兼容性"""
+
+    def test_chat_and_stream_return_same_json(self):
+        """测试普通和流式聊天补全返回相同的合法JSON"""
+        async def run():
+            client = make_client()
+            response = await client.chat.completions.create(model="stub", messages=ANALYSIS_MESSAGES)
+            stream = await client.chat.completions.create(model="stub", messages=ANALYSIS_MESSAGES, stream=True)
+            parts = [chunk.choices[0].delta.content or "" async for chunk in stream if chunk.choices]
+            return response.choices[0].message.content, "".join(parts)
+
+        content, streamed = asyncio.run(run())
+        assert content == streamed
+        assert json.loads(content)["overall_score"] == 78
+
+    def test_question_count_and_personalization(self):
+        """测试按提示词生成指定数量的问题，改写时原样返回"""
+        async def run():
+            client = make_client()
+            generated = await client.chat.completions.create(model="stub", messages=[
+                {"role": "system", "content": "你是专业面试官"},
+                {"role": "user", "content": "生成3个面试问题：\n\n岗位类型：sales"}
+            ])
+            questions = generated.choices[0].message.content
+            personalized = await client.chat.completions.create(model="stub", messages=[
+                {"role": "system", "content": "你是专业面试官"},
+                {"role": "user", "content": f"根据候选人背景改写以下面试问题：\n\n原问题：{questions}\n\n保持问题数量"}
+            ])
+            return questions, personalized.choices[0].message.content
+
+        questions, personalized = asyncio.run(run())
+        assert len(json.loads(questions)) == 3
+        assert personalized == questions
+
+    def test_embeddings_are_deterministic(self):
+        """测试相同文本得到相同的单位向量"""
+        async def run():
+            client = make_client(embedding_dim=8)
+            return await client.embeddings.create(model="stub", input=["a", "b", "a"])
+
+        response = asyncio.run(run())
+        vectors = [item.embedding for item in response.data]
+        assert len(vectors) == 3 and len(vectors[0]) == 8
+        assert vectors[0] == vectors[2] != vectors[1]
+
+    def test_injected_failures(self):
+        """测试按失败比例返回错误状态码"""
+        async def run():
+            client = make_client(failure_rate=1.0, failure_statuses=[503])
+            await client.chat.completions.create(model="stub", messages=ANALYSIS_MESSAGES)
+
+        with pytest.raises(APIStatusError) as exc_info:
+            asyncio.run(run())
+        assert exc_info.value.status_code == 503
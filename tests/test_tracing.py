@@ -0,0 +1,110 @@
+import json
+import logging
+import os
+import sys
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from backend.app.core.tracing import TracingMiddleware, span, record_span, current_trace
+from backend.app.core.profiler import ProfilingMiddleware, SamplingProfiler
+
+
+def make_app(**middleware_options) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware, **middleware_options)
+
+    @app.get("/work")
+    async def work():
+        with span("prompt"):
+            time.sleep(0.002)
+        record_span("extract_text", 0.005)
+        record_span("extract_text", 0.001)
+        return {"ok": True}
+
+    return app
+
+
+def busy_loop(seconds: float) -> int:
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += 1
+    return total
+
+
+class TestTracing:
+    """测试请求阶段耗时"""
+
+    def test_server_timing_header(self):
+        """测试阶段按名称合并后写入Server-Timing响应头"""
+        response = TestClient(make_app()).get("/work")
+        entries = dict(
+            entry.split(";dur=") for entry in response.headers["server-timing"].split(", ")
+        )
+        assert set(entries) == {"prompt", "extract_text", "total"}
+        assert float(entries["prompt"]) >= 2.0
+        assert float(entries["extract_text"]) == 6.0
+        assert float(entries["total"]) >= float(entries["prompt"])
+
+    def test_span_outside_request_is_noop(self):
+        """测试没有进行中的请求时span和record_span不做任何事"""
+        assert current_trace() is None
+        with span("clean_text"):
+            pass
+        record_span("clean_text", 0.1)
+        assert current_trace() is None
+
+    def test_trace_log(self, caplog):
+        """测试追踪日志按阶段记录，并按最小耗时过滤"""
+        with caplog.at_level(logging.INFO, logger="app.trace"):
+            client = TestClient(make_app(server_timing=False, log_traces=True))
+            response = client.get("/work")
+            TestClient(make_app(log_traces=True, log_min_duration_ms=60000)).get("/work")
+
+        assert "server-timing" not in response.headers
+        entries = [json.loads(record.getMessage()) for record in caplog.records if record.name == "app.trace"]
+        assert len(entries) == 1
+        assert entries[0]["route"] == "/work" and entries[0]["status"] == 200
+        assert [s["name"] for s in entries[0]["spans"]] == ["prompt", "extract_text", "extract_text"]
+
+
+class TestProfiler:
+    """测试按请求采样剖析"""
+
+    def test_sampler_collects_folded_stacks(self):
+        """测试采样结果为 "栈 次数" 格式且包含正在执行的函数"""
+        profiler = SamplingProfiler(interval=0.001)
+        profiler.start()
+        busy_loop(0.05)
+        profiler.stop()
+
+        folded = profiler.folded()
+        assert profiler.samples > 0
+        assert "busy_loop (test_tracing.py" in folded
+        for line in folded.splitlines():
+            stack, count = line.rsplit(" ", 1)
+            assert int(count) > 0 and ";" in stack
+
+    def test_profiling_requires_token(self):
+        """测试令牌一致时返回折叠栈，否则正常处理请求"""
+        app = FastAPI()
+        app.add_middleware(ProfilingMiddleware, token="secret", interval=0.001)
+
+        @app.get("/busy")
+        def busy():
+            return {"iterations": busy_loop(0.05)}
+
+        client = TestClient(app)
+        normal = client.get("/busy", headers={"X-Profile-Token": "wrong"})
+        assert "iterations" in normal.json()
+
+        profiled = client.get("/busy", headers={"X-Profile-Token": "secret"})
+        assert profiled.headers["x-profile-original-status"] == "200"
+        assert int(profiled.headers["x-profile-samples"]) > 0
+        assert "busy (test_tracing.py" in profiled.text
@@ -0,0 +1,44 @@
+import io
+import asyncio
+import hashlib
+import pytest
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi import UploadFile
+from backend.app.utils.upload import save_upload, UploadTooLargeError
+
+
+def make_upload(content: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename="resume.txt")
+
+
+class TestSaveUpload:
+    """测试分块保存上传文件"""
+
+    def test_hash_and_inline_content(self, tmp_path):
+        """测试分块写入时计算哈希，小文件内容保留在内存中"""
+        content = "教育背景\n北京大学".encode() * 10
+        dest = str(tmp_path / "resume.txt")
+        saved = asyncio.run(save_upload(make_upload(content), dest, max_bytes=1024,
+                                        chunk_size=7, keep_bytes=1024))
+
+        assert saved.size == len(content)
+        assert saved.sha256 == hashlib.sha256(content).hexdigest()
+        assert saved.content == content
+        with open(dest, 'rb') as f:
+            assert f.read() == content
+
+        saved = asyncio.run(save_upload(make_upload(content), dest, max_bytes=1024,
+                                        chunk_size=7, keep_bytes=10))
+        assert saved.content is None
+
+    def test_oversized_upload_is_rejected(self, tmp_path):
+        """测试超过大小限制时中止且不留下文件"""
+        dest = str(tmp_path / "resume.txt")
+        with pytest.raises(UploadTooLargeError):
+            asyncio.run(save_upload(make_upload(b"x" * 100), dest, max_bytes=50, chunk_size=16))
+        assert os.listdir(tmp_path) == []
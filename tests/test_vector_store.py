@@ -0,0 +1,72 @@
+import pytest
+import sys
+import os
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from backend.app.services.vector_store import VectorStore
+
+
+class TestVectorStore:
+    """测试内存映射向量库"""
+
+    def setup_method(self):
+        """测试前准备"""
+        rng = np.random.default_rng(42)
+        self.vectors = rng.normal(size=(6, 8)).astype(np.float32)
+
+    def test_search_returns_nearest_chunks(self, tmp_path):
+        """测试top-k余弦检索"""
+        store = VectorStore(str(tmp_path))
+        store.add("a.txt", [f"块{i}" for i in range(6)], self.vectors)
+
+        results = store.search(self.vectors[3], top_k=2)
+        assert results[0].text == "块3"
+        assert results[0].score == pytest.approx(1.0, abs=1e-5)
+        assert results[0].source == "a.txt"
+        assert len(results) == 2
+
+    def test_other_instance_sees_updates(self, tmp_path):
+        """测试其他进程（实例）通过manifest感知追加和删除"""
+        writer = VectorStore(str(tmp_path))
+        reader = VectorStore(str(tmp_path))
+        writer.add("a.txt", ["a0", "a1"], self.vectors[:2])
+        writer.add("b.txt", ["b0"], self.vectors[2:3])
+        assert reader.count == 3
+
+        assert writer.delete_source("a.txt") == 2
+        assert reader.count == 1
+        assert [r.text for r in reader.search(self.vectors[0], top_k=5)] == ["b0"]
+
+    def test_tombstones_hidden_before_manifest_update(self, tmp_path):
+        """测试墓碑位已写入、manifest尚未更新时读者也不返回已删除的块"""
+        writer = VectorStore(str(tmp_path))
+        reader = VectorStore(str(tmp_path))
+        writer.add("a.txt", ["a0", "a1"], self.vectors[:2])
+        writer.add("b.txt", ["b0"], self.vectors[2:3])
+        assert reader.count == 3
+
+        # 模拟delete_source写入墓碑位之后、写入manifest之前的读取
+        write_manifest = writer._write_manifest
+        writer._write_manifest = lambda: None
+        writer.delete_source("a.txt")
+        assert reader.count == 3
+        assert [r.text for r in reader.search(self.vectors[0], top_k=5)] == ["b0"]
+
+        write_manifest()
+        assert reader.count == 1
+
+    def test_compact_drops_deleted_rows(self, tmp_path):
+        """测试压缩后只保留有效行"""
+        store = VectorStore(str(tmp_path))
+        store.add("a.txt", ["a0", "a1"], self.vectors[:2])
+        store.add("b.txt", ["b0"], self.vectors[2:3])
+        store.delete_source("a.txt")
+        store.compact()
+
+        reopened = VectorStore(str(tmp_path))
+        assert reopened.count == 1
+        assert reopened.search(self.vectors[2], top_k=1)[0].text == "b0"